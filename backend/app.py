@@ -1,22 +1,27 @@
-import pandas as pd
-import jwt
-from flask_bcrypt import check_password_hash
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import and_, or_
-from db_models.models import db, TeamSelection, Player
-from flask import Flask, request, jsonify
+from dotenv import load_dotenv
+# Before the services import, since they read their settings from the environment at import time
+load_dotenv()
+from db_models.models import db
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from services import azure_services as azs, google_services as gos
 import logger as log
-from services.google_services import get_google_sheet, get_data_from_sheet
 from services import scores_service as scs, game_service as gs, teams_service as ts, fields_service as fs
-import datetime
+from services import matchday_cache as mdc, etag_service as ets
+from services import standings_service as sts, search_service as srs, photo_service as phs, image_service as ims
+from services import log_service as lgs, metrics_service as mts, matchday_service as mds, serialization as szs
+from services import compression_service as cps, auth_service as aus, job_service as jbs, rating_service as rts
+from services.dates import parse_date
 import sys
 import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'services'))
 app = Flask(__name__)
+app.json = szs.JSONProvider(app)
+log.register_request_logging(app)
+mts.register_request_metrics(app)
+cps.register_response_compression(app)
+jbs.register_job_workers(app)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
 app.config['SQLALCHEMY_COMMIT_ON_TEARDOWN'] = True
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
@@ -24,17 +29,28 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "max_overflow": 20,
     "pool_timeout": 30,
     "pool_recycle": 1800,
+    "poolclass": mts.TimedQueuePool,
 }
 
 db.init_app(app)
 
-with app.app_context():
-    db.create_all()
+# Schema creation is `python commands.py init-db`; set CREATE_SCHEMA_ON_START to do it here instead
+if os.getenv('CREATE_SCHEMA_ON_START', '').lower() in ('1', 'true', 'yes'):
+    with app.app_context():
+        db.create_all()
 
 CORS(app, origins=['https://badatsoccer.onrender.com', "http://localhost:3000",
-                   'https://www.bad-at-soccer.in', 'https://bad-at-soccer.in'])
+                   'https://www.bad-at-soccer.in', 'https://bad-at-soccer.in'],
+     expose_headers=['ETag', 'X-Total-Count', 'X-Page', 'X-Page-Size', 'X-Has-More', 'X-Next-Cursor',
+                     'X-Snapshot-Id', 'X-Snapshot-Created-At'])
 CONTAINER_NAME = 'player-photo'
-JWT_SECRET_KEY = os.getenv('SECRET_KEY')
+TEAM_SELECTION_SHEET_ID = '1BL1KkNbhp4cn8WrFByKYUId0Xm10eMqncMdtAMLqkgA'
+PLAYER_PHOTOS_FOLDER_ID = '1VhVxbMnRgsP44sQGSrIETabD4eBhkfLV'
+LOG_VIEW_LINES = 1000
+
+
+def arg_flag(name):
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
 
 
 @app.route('/')
@@ -43,17 +59,57 @@ def home():
     return jsonify(message)
 
 
+@app.route('/metrics')
+def metrics():
+    gauges = [
+        ('log_records_dropped', 'Log records dropped because the log queue was full.', log.DroppingQueueHandler.dropped),
+        ('matchday_cache_hits', 'Matchday snapshot cache hits.', mdc.matchday_cache.hits),
+        ('matchday_cache_misses', 'Matchday snapshot cache misses.', mdc.matchday_cache.misses),
+        ('compressed_cache_hits', 'Responses served from the compressed body cache.', cps.compressed_cache.hits),
+        ('compressed_cache_misses', 'Responses compressed on the request path.', cps.compressed_cache.misses),
+        ('compressed_cache_bytes', 'Bytes held in the compressed body cache.', cps.compressed_cache.size),
+        ('auth_token_cache_hits', 'Access tokens verified from the decoded token cache.', aus.token_cache.hits),
+        ('auth_token_cache_misses', 'Access tokens whose signature was verified.', aus.token_cache.misses),
+    ]
+    return Response(mts.render(db.engine, gauges), content_type=mts.CONTENT_TYPE)
+
+
 @app.route('/log')
+@aus.login_required('admin')
 def logs():
-    with open(f'{log.LOGS_DIR}/{log.LOG_NAME}', 'r') as log_file:
-        log_contents = log_file.read()
-    return jsonify({"log_data": log_contents, "log_name": log.LOG_NAME})
+    lines = request.args.get('lines', LOG_VIEW_LINES, type=int)
+    return jsonify({"log_data": lgs.tail_text(lines), "log_name": log.current_log_name()})
+
+
+@app.route('/logs')
+@aus.login_required('admin')
+def query_logs():
+    return lgs.query_logs()
+
+
+@app.route('/logs/files')
+@aus.login_required('admin')
+def list_log_files():
+    return lgs.list_log_files()
+
+
+@app.route('/logs/stream')
+@aus.login_required('admin', stream=True)
+def follow_logs():
+    return lgs.follow_logs()
+
+
+@app.route('/logs/stream/token', methods=['POST'])
+@aus.login_required('admin')
+def logs_stream_token():
+    return aus.stream_token()
 
 
 @app.route('/logs/clear', methods=['POST'])
+@aus.login_required('admin')
 def clear_log():
     try:
-        with open(os.path.join(f'{log.LOGS_DIR}', secure_filename(log.LOG_NAME)), 'w'):
+        with open(os.path.join(f'{log.LOGS_DIR}', secure_filename(log.current_log_name())), 'w'):
             pass
         message = {"success": True, "message": "Log file cleared"}
         log.log_message(request, message.get('message'), 200)
@@ -65,164 +121,153 @@ def clear_log():
         return jsonify({"error": str(e)}), 500
 
 
-def parse_date(date_str):
-    for fmt in ('%d/%m/%Y', '%Y-%m-%d'):  # Handle multiple date formats
-        try:
-            return datetime.datetime.strptime(date_str, fmt).date()
-        except ValueError:
-            continue
-    raise ValueError(f"Date '{date_str}' does not match any known formats")
+# The Google, pandas and Azure integrations are only needed by these jobs, so they are imported on first use
+def run_sheet_import(params, progress):
+    from services import google_services as gos, sheet_import_service as sis
+
+    chunk_size = params['chunk_size'] or sis.CHUNK_SIZE
+    progress(0, None, 'Fetching sheet')
+    sheet = gos.get_google_sheet(params['sheet_id'])
+    if params['mode'] == 'incremental':
+        return sis.sync_team_selection(sheet, params['sheet_id'], delete_missing=params['delete_missing'],
+                                       force=params['force'], chunk_size=chunk_size, progress=progress)
+
+    sheet_data = gos.get_data_from_sheet(sheet, 'A', 'L')
+    return {"results": sis.import_team_selection(sheet_data, chunk_size=chunk_size, progress=progress)}
+
+
+def run_photo_transfer(params, progress):
+    from services import google_services as gos
+
+    report = gos.transfer_files(params['folder_id'], container_name=params['container_name'], progress=progress)
+    phs.invalidate(params['container_name'])
+    log.logger.info(f"Players images updated successfully! {report['summary']}")
+    return report
+
+
+def analytics():
+    # pandas and pyarrow load with the first report or export, not at startup
+    from services import analytics_service
+
+    return analytics_service
+
+
+def run_analytics_snapshot(params, progress):
+    return analytics().export_snapshot(progress=progress)
+
+
+jbs.register('sheet_import', run_sheet_import)
+jbs.register('photo_transfer', run_photo_transfer)
+jbs.register('analytics_snapshot', run_analytics_snapshot)
 
 
 @app.route('/insert_team_selection_sheet_data')
 def insert_team_selection_sheet_data():
-    try:
-        sheet_id = "1BL1KkNbhp4cn8WrFByKYUId0Xm10eMqncMdtAMLqkgA"
-        sheet = get_google_sheet(sheet_id)
-        sheet_data = get_data_from_sheet(sheet, 'A', 'L')
-
-        sheet_data['date'] = sheet_data['date'].apply(lambda x: parse_date(x))
-
-        unique_pairs = sheet_data[['date', 'player_name']].drop_duplicates()
-
-        existing_records = db.session.query(TeamSelection.date, TeamSelection.player_name).filter(
-            or_(*[
-                and_(TeamSelection.date == row['date'], TeamSelection.player_name == row['player_name'])
-                for _, row in unique_pairs.iterrows()
-            ])
-        ).all()
-
-        existing_pairs = {(record[0], record[1]) for record in existing_records}
-
-        results = []
-
-        for i, row in sheet_data.iterrows():
-            if row.drop(['date', 'player_name']).apply(lambda x: pd.isna(x) or x == '').any():
-                results.append({
-                    "row": i + 2,
-                    "status": "skipped",
-                    "message": "Row contains empty values except for date and player_name"
-                })
-                continue
-
-            date_field = row['date']
-            player_name_field = row['player_name']
-
-            if (date_field, player_name_field) in existing_pairs:
-                try:
-                    team_selection = db.session.query(TeamSelection).filter(
-                        and_(
-                            TeamSelection.date == date_field,
-                            TeamSelection.player_name == player_name_field
-                        )
-                    ).first()
-
-                    for key, value in row.items():
-                        if key not in ['date', 'player_name']:
-                            setattr(team_selection, key, value)
-
-                    db.session.commit()
-                    results.append({
-                        "row": i + 2,
-                        "status": "updated",
-                        "message": "Row updated successfully"
-                    })
-                except Exception as update_error:
-                    results.append({
-                        "row": i + 2,
-                        "status": "failed",
-                        "message": f"Update error: {update_error}"
-                    })
-            else:
-                try:
-                    new_record = TeamSelection(
-                        **{key: row[key] for key in row.keys()}
-                    )
-                    db.session.add(new_record)
-                    db.session.commit()
-                    results.append({
-                        "row": i + 2,
-                        "status": "success",
-                        "message": "Row inserted successfully"
-                    })
-                except Exception as insert_error:
-                    results.append({
-                        "row": i + 2,
-                        "status": "failed",
-                        "message": f"Insertion error: {insert_error}"
-                    })
-
-        return jsonify({"message": "Sheet processed successfully", "results": results}), 200
+    params = {
+        "sheet_id": TEAM_SELECTION_SHEET_ID,
+        "mode": 'incremental' if request.args.get('mode') == 'incremental' else 'full',
+        "delete_missing": arg_flag('delete_missing'),
+        "force": arg_flag('force'),
+        "chunk_size": request.args.get('chunk_size', type=int),
+    }
+    # Any import of the sheet, full or incremental, coalesces with one already queued or running
+    return jbs.enqueue_response('sheet_import', params, key=f'sheet_import:{TEAM_SELECTION_SHEET_ID}',
+                                message='Sheet import queued')
 
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+
+@app.route('/jobs')
+def list_jobs():
+    return jbs.list_jobs()
+
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    return jbs.get_job(job_id)
 
 
 @app.route('/search_players_by_name')
+@ets.conditional(date_arg='date')
 def search_players_by_name():
     try:
         search_text = request.args.get('query', '')
-        date = request.args.get('date')
+        date = parse_date(request.args.get('date'))
 
-        results = TeamSelection.query.filter(
-            TeamSelection.date == date,
-            TeamSelection.player_name.ilike(f'%{search_text}%')
-        ).all()
+        limit = srs.search_limit(request.args.get('limit'))
 
-        data = [player.to_dict() for player in results]
-        return jsonify(data), 200
+        data = mdc.get_snapshot(date).search(search_text, limit)
+        return szs.list_response(data, mdc.TEAM_SELECTION_FIELDS.names)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 
+@app.route('/search_players')
+def search_players():
+    return srs.search_players()
+
+
 @app.route('/get_images_from_azure')
 def get_images_from_azure():
-    blob_list = []
-    container_client = azs.connect_to_azure_storage('player-photo')
-    blob_items = container_client.list_blobs()
-    for blob in blob_items:
-        blob_item = container_client.get_blob_client(blob=blob.name)
-        blob_list.append({'player_url': blob_item.url, 'player_name': blob.name})
-    return jsonify(blob_list), 200
+    return phs.get_images_from_azure(CONTAINER_NAME)
+
+
+@app.route('/player_photo')
+def player_photo():
+    return ims.player_photo(CONTAINER_NAME)
 
 
 @app.route('/get_all_fields')
+@ets.conditional(date_arg='date')
 def get_all_fields():
     return fs.get_all_fields()
 
 
 @app.route('/get_field')
+@ets.conditional(date_arg='date', field_arg='field_auto')
 def get_field():
     return fs.get_field_by_date_and_team()
 
 
 @app.route('/get_teams_by_field_and_date')
+@ets.conditional(date_arg='date', field_arg='field_auto')
 def get_teams_by_field_and_date():
     return ts.get_teams_by_field_and_date()
 
 
 @app.route('/get_all_players')
+@ets.conditional(date_arg='date', field_arg='field')
 def get_all_players():
     return ts.get_all_players()
 
 
 @app.route('/get_team')
+@ets.conditional(date_arg='date', field_arg='field_auto')
 def get_team():
     return ts.get_team()
 
 
+@app.route('/matchday')
+@ets.conditional(date_arg='date', field_arg='field')
+def matchday():
+    return mds.get_matchday()
+
+
 @app.route('/add_score', methods=['POST'])
 def add_score():
     return scs.add_score(log)
 
 
+@app.route('/add_scores', methods=['POST'])
+def add_scores():
+    return scs.add_scores()
+
+
 @app.route('/get_score_by_id')
 def get_score_by_id():
     return scs.get_score_by_id()
 
 
 @app.route('/get_scores_by_field_and_date')
+@ets.conditional(date_arg='entered_date', field_arg='field')
 def get_scores_by_field_and_date():
     return scs.get_scores_by_field_and_date()
 
@@ -237,58 +282,87 @@ def update_score():
     return scs.update_score()
 
 
+@app.route('/balance_teams', methods=['POST'])
+def balance_teams():
+    # NumPy is only needed here, so it stays out of the startup path
+    from services import balance_service as bls
+
+    return bls.balance_teams()
+
+
 @app.route('/get_games_dates')
+@ets.conditional()
 def get_games_dates():
     return gs.get_games_dates()
 
 
 @app.route('/get_games_statistics_by_team_and_date')
+@ets.conditional(date_arg='entered_date', field_arg='field')
 def get_games_statistics_by_team_and_date():
     return gs.get_games_statistics_by_team_and_date()
 
 
+@app.route('/get_standings')
+def get_standings():
+    return sts.get_standings()
+
+
+@app.route('/player_ratings')
+def player_ratings():
+    return rts.get_player_ratings()
+
+
 @app.route('/update_players_images')
 def update_players_images():
-    gos.transfer_files('1VhVxbMnRgsP44sQGSrIETabD4eBhkfLV', container_name=CONTAINER_NAME)
-    log.logger.info('Players images updated successfully!'), 200
-    return jsonify('Players images updated successfully!'), 200
+    params = {"folder_id": PLAYER_PHOTOS_FOLDER_ID, "container_name": CONTAINER_NAME}
+    return jbs.enqueue_response('photo_transfer', params, key=f'photo_transfer:{CONTAINER_NAME}',
+                                message='Players images update queued')
+
+
+@app.route('/analytics/snapshot', methods=['POST'])
+def export_analytics_snapshot():
+    return jbs.enqueue_response('analytics_snapshot', {}, message='Analytics snapshot export queued')
+
+
+@app.route('/analytics/snapshot')
+def analytics_snapshot():
+    return analytics().get_snapshot_manifest()
+
+
+@app.route('/analytics/win_rates')
+def analytics_win_rates():
+    return analytics().get_win_rates()
+
+
+@app.route('/analytics/attendance')
+def analytics_attendance():
+    return analytics().get_attendance()
+
+
+@app.route('/analytics/attribute_trends')
+def analytics_attribute_trends():
+    return analytics().get_attribute_trends()
 
 
 @app.route('/login', methods=['POST'])
 def login():
-    data = request.get_json()
-    email = data['gmail']
-    password = data['password']
+    return aus.login()
 
-    try:
-        user = Player.query.filter_by(gmail=email).first()
-        if user and check_password_hash(user.password, password):
-            # Create JWT payload
-            payload = {
-                'id': user.id,
-                'gmail': user.gmail,
-                'roles': [user.type],
-                'player_name': user.player_name,
-                'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)  # Token expiry
-            }
-            # Generate the token
-            token = jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
-
-            return jsonify({
-                'token': token,
-                'data': {
-                    'id': user.id,
-                    'gmail': user.gmail,
-                    'roles': [user.type],
-                    'player_name': user.player_name
-                },
-                'status_code': 200,
-                'message': 'Login successful!'
-            }), 200
-        else:
-            return jsonify({"message": "Invalid credentials!"}), 401
-    except SQLAlchemyError as e:
-        return jsonify({"message": str(e)}), 500
+
+@app.route('/refresh', methods=['POST'])
+def refresh():
+    return aus.refresh()
+
+
+@app.route('/logout', methods=['POST'])
+def logout():
+    return aus.logout()
+
+
+@app.route('/me')
+@aus.login_required()
+def me():
+    return jsonify(g.user), 200
 
 
 if __name__ == '__main__':
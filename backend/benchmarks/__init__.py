@@ -0,0 +1,3 @@
+"""Benchmark harness: run from backend/ with `python -m benchmarks run --output results.json`
+(or `python -m benchmarks startup` for cold-start timings), then
+`python -m benchmarks compare baseline.json results.json` to flag regressions."""
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+DEFAULT_DATABASE = os.path.join(tempfile.gettempdir(), 'badatsoccer-benchmark.db')
+SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), 'badatsoccer-benchmark-snapshots')
+CONTAINER_NAME = 'player-photo'
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    if args.database_url is None:
+        # The throwaway default database is always rebuilt from scratch
+        if os.path.exists(DEFAULT_DATABASE):
+            os.remove(DEFAULT_DATABASE)
+        args.database_url = f'sqlite:///{DEFAULT_DATABASE}'
+        args.reset = True
+    # app reads DATABASE_URL and SECRET_KEY at import time
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-not-for-production')
+    # Jobs are drained inline so their timings cover the whole run
+    os.environ['JOB_WORKERS'] = '0'
+    os.environ.setdefault('ANALYTICS_SNAPSHOT_DIR', SNAPSHOT_DIR)
+
+    import app as app_module
+    from benchmarks import runner
+    from benchmarks.seed import SeedConfig, seed
+    from db_models.models import db
+
+    config = SeedConfig(seasons=args.seasons, matchdays=args.matchdays, fields=args.fields,
+                        teams_per_field=args.teams_per_field, players_per_team=args.players_per_team,
+                        games_per_field=args.games_per_field, player_pool=args.player_pool, seed=args.seed)
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dialect": None,
+            "seed": config.as_dict(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "cold_caches": args.cold,
+            "accept_encoding": args.accept_encoding,
+        },
+        "routes": {},
+        "jobs": {},
+    }
+
+    with app_module.app.app_context():
+        results["meta"]["dialect"] = db.engine.dialect.name
+        db.create_all()
+        print(f'Seeding {db.engine.url.render_as_string(hide_password=True)} ...')
+        data = seed(config, reset=args.reset)
+        results["meta"]["counts"] = data["counts"]
+        print(f"Seeded {data['counts']}")
+
+        runner.seed_photo_container(CONTAINER_NAME, args.photos)
+        # The analytics routes answer from a snapshot of the data just seeded
+        app_module.analytics().export_snapshot()
+        if not args.skip_routes:
+            uncovered = runner.uncovered_routes(app_module.app, runner.route_cases(data, args.photos))
+            if uncovered:
+                print(f'Routes without a benchmark case: {", ".join(uncovered)}')
+            results["routes"] = runner.run_routes(app_module.app, data, args.iterations, args.warmup, args.photos,
+                                                  only=args.only, cold=args.cold, container_name=CONTAINER_NAME,
+                                                  accept_encoding=args.accept_encoding)
+        if not args.skip_jobs:
+            results["jobs"] = runner.run_jobs(app_module, data, args.job_iterations, args.photos,
+                                              args.photo_size, CONTAINER_NAME)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'Results written to {args.output}')
+
+
+def startup(args):
+    from benchmarks.startup import run_startup
+
+    database_url = args.database_url or f'sqlite:///{DEFAULT_DATABASE}'
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "startup": run_startup(args.iterations, database_url),
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'Results written to {args.output}')
+
+
+def compare(args):
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+
+    regressions = []
+    print(f"{'benchmark':<52}{'baseline':>12}{'candidate':>12}{'change':>9}")
+    for section in ('routes', 'jobs', 'startup'):
+        for name, result in candidate.get(section, {}).items():
+            before = baseline.get(section, {}).get(name, {}).get(args.metric)
+            after = result.get(args.metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            regressed = change > args.threshold and after - before > args.min_delta_ms
+            marker = '  <-- regression' if regressed else ''
+            print(f'{name:<52}{before:>12.3f}{after:>12.3f}{change:>+9.1%}{marker}')
+            if regressed:
+                regressions.append(name)
+
+    if regressions:
+        print(f'{len(regressions)} regression(s) in {args.metric} above {args.threshold:.0%}')
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the Bad at Soccer API')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Seed synthetic data and time every route and job')
+    run_parser.add_argument('--database-url',
+                            help=f'SQLAlchemy URL (default: a fresh SQLite file at {DEFAULT_DATABASE})')
+    run_parser.add_argument('--reset', action='store_true', help='Delete existing rows in --database-url first')
+    run_parser.add_argument('--seasons', type=int, default=2)
+    run_parser.add_argument('--matchdays', type=int, default=30, help='Matchdays per season')
+    run_parser.add_argument('--fields', type=int, default=3)
+    run_parser.add_argument('--teams-per-field', type=int, default=3)
+    run_parser.add_argument('--players-per-team', type=int, default=6)
+    run_parser.add_argument('--games-per-field', type=int, default=6)
+    run_parser.add_argument('--player-pool', type=int, help='Distinct players (default: 1.5x a matchday)')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--iterations', type=int, default=200, help='Timed requests per route')
+    run_parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per route')
+    run_parser.add_argument('--cold', action='store_true', help='Clear in-process caches before every request')
+    run_parser.add_argument('--only', help='Regex selecting route benchmarks by name')
+    run_parser.add_argument('--accept-encoding', help='Accept-Encoding header to send, e.g. "br, gzip"')
+    run_parser.add_argument('--job-iterations', type=int, default=3)
+    run_parser.add_argument('--photos', type=int, default=50, help='Fake Drive photos to transfer')
+    run_parser.add_argument('--photo-size', type=int, default=640, help='Fake photo width/height in pixels')
+    run_parser.add_argument('--skip-routes', action='store_true')
+    run_parser.add_argument('--skip-jobs', action='store_true')
+    run_parser.add_argument('--output', help='Write results as JSON to this file')
+
+    startup_parser = subparsers.add_parser('startup', help='Time importing the app and serving its first request')
+    startup_parser.add_argument('--database-url', help=f'SQLAlchemy URL (default: sqlite:///{DEFAULT_DATABASE})')
+    startup_parser.add_argument('--iterations', type=int, default=10, help='Fresh interpreters to start')
+    startup_parser.add_argument('--output', help='Write results as JSON to this file')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files and flag regressions')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--metric', default='p95_ms', choices=['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative slowdown')
+    compare_parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                                help='Ignore slowdowns smaller than this many milliseconds')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'startup':
+        startup(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""In-memory stand-ins for gspread, Google Drive and Azure Blob Storage."""
+import hashlib
+import io
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from PIL import Image
+
+SHEET_COLUMNS = ['player_name', 'team', 'stamina', 'technique', 'ball_leader', 'aggression', 'tournament',
+                 'version', 'tournament_to_pick', 'team_to_pick', 'field_auto', 'date']
+
+
+class FakeSpreadsheet:
+    def __init__(self, revision='1'):
+        self.revision = revision
+
+    def get_lastUpdateTime(self):
+        return self.revision
+
+
+class FakeWorksheet:
+    """Answers sheet.get('A:L') the way gspread does: a header row followed by string rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.spreadsheet = FakeSpreadsheet()
+
+    def get(self, range_str):
+        return [SHEET_COLUMNS] + self.rows
+
+
+def sheet_rows(selections):
+    """Sheet rows (dates as DD/MM/YYYY strings) from seeded team_selection records."""
+    return [[selection['player_name'], selection['team'], str(selection['stamina']), str(selection['technique']),
+             str(selection['ball_leader']), str(selection['aggression']), selection['tournament'],
+             selection['version'], selection['tournament_to_pick'], selection['team_to_pick'],
+             selection['field_auto'], selection['date'].strftime('%d/%m/%Y')] for selection in selections]
+
+
+class FakeRequest:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def execute(self):
+        return self.callback()
+
+
+class FakeDriveService:
+    """Paged files().list and get_media over in-memory files."""
+
+    def __init__(self, files, page_size=100):
+        self.items = files
+        self.page_size = page_size
+
+    def files(self):
+        return self
+
+    def list(self, q=None, fields=None, pageSize=None, pageToken=None):
+        start = int(pageToken or 0)
+
+        def page():
+            items = [{key: value for key, value in item.items() if key != 'data'}
+                     for item in self.items[start:start + self.page_size]]
+            result = {'files': items}
+            if start + self.page_size < len(self.items):
+                result['nextPageToken'] = str(start + self.page_size)
+            return result
+        return FakeRequest(page)
+
+    def get_media(self, fileId):
+        return next(item['data'] for item in self.items if item['id'] == fileId)
+
+
+class FakeMediaIoBaseDownload:
+    def __init__(self, fd, request, chunksize=1024 * 1024):
+        self.fd = fd
+        self.data = request
+        self.position = 0
+        self.chunksize = chunksize
+
+    def next_chunk(self, num_retries=0):
+        self.fd.write(self.data[self.position:self.position + self.chunksize])
+        self.position += self.chunksize
+        return None, self.position >= len(self.data)
+
+
+def jpeg_bytes(size, sigma):
+    output = io.BytesIO()
+    Image.effect_noise((size, size), sigma).convert('RGB').save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+def drive_files(count, image_size=640):
+    """Noise JPEGs, which compress about as badly as real photos and decode for the variant step."""
+    files = []
+    for index in range(count):
+        data = jpeg_bytes(image_size, 40 + index % 20)
+        files.append({'id': f'file-{index}', 'name': f'Player {index:04d}', 'mimeType': 'image/jpeg',
+                      'md5Checksum': hashlib.md5(data).hexdigest(), 'modifiedTime': '2024-01-01T00:00:00Z',
+                      'size': str(len(data)), 'data': data})
+    return files
+
+
+class FakeBlob:
+    def __init__(self, name, data, content_settings=None, metadata=None):
+        self.name = name
+        self.data = data
+        self.size = len(data)
+        self.etag = f'"0x{hashlib.md5(data).hexdigest()[:16]}"'
+        self.last_modified = datetime.now(timezone.utc)
+        self.metadata = metadata or {}
+        self.content_settings = content_settings or SimpleNamespace(content_md5=None)
+
+
+class FakeBlobClient:
+    def __init__(self, container, name):
+        self.container = container
+        self.blob_name = name
+        self.url = f'{container.url}/{name}'
+
+    def exists(self):
+        return self.blob_name in self.container.blobs
+
+    def get_blob_properties(self):
+        if self.blob_name not in self.container.blobs:
+            raise LookupError(self.blob_name)
+        return self.container.blobs[self.blob_name]
+
+    def upload_blob(self, data, overwrite=True, content_settings=None, metadata=None, **kwargs):
+        data = data.read() if hasattr(data, 'read') else bytes(data)
+        self.container.blobs[self.blob_name] = FakeBlob(self.blob_name, data, content_settings, metadata)
+
+    def stage_block(self, block_id, data):
+        self.container.staged.setdefault(self.blob_name, {})[block_id] = bytes(data)
+
+    def commit_block_list(self, blocks, content_settings=None, metadata=None, **kwargs):
+        staged = self.container.staged.pop(self.blob_name, {})
+        data = b''.join(staged[block.id] for block in blocks)
+        self.container.blobs[self.blob_name] = FakeBlob(self.blob_name, data, content_settings, metadata)
+
+    def download_blob(self):
+        data = self.container.blobs[self.blob_name].data
+        return SimpleNamespace(readall=lambda: data, readinto=lambda stream: stream.write(data))
+
+
+class FakeContainerClient:
+    def __init__(self, name):
+        self.url = f'https://benchmark.blob.core.windows.net/{name}'
+        self.blobs = {}
+        self.staged = {}
+
+    def exists(self):
+        return True
+
+    def create_container(self):
+        pass
+
+    def list_blobs(self, name_starts_with=None, include=None):
+        return [blob for name, blob in sorted(self.blobs.items())
+                if name_starts_with is None or name.startswith(name_starts_with)]
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self, blob)
+
+
+class FakeBlobServiceClient:
+    def __init__(self):
+        self.containers = {}
+
+    def get_container_client(self, name):
+        return self.containers.setdefault(name, FakeContainerClient(name))
+
+
+def seed_photos(container_client, count, variant_name, sizes):
+    """Originals plus every derived variant, so photo routes never fall through to rendering."""
+    for index in range(count):
+        name = f'Player {index:04d}.jpg'
+        container_client.get_blob_client(name).upload_blob(jpeg_bytes(64, 40))
+        for size in sizes:
+            container_client.get_blob_client(variant_name(name, size)).upload_blob(b'RIFF')
@@ -0,0 +1,272 @@
+"""Drive the Flask app's routes and the import/transfer jobs, and summarize their timings."""
+import math
+import re
+import time
+from collections import Counter, namedtuple
+
+from sqlalchemy import select
+
+from benchmarks import fakes
+from benchmarks.seed import ADMIN_GMAIL, ADMIN_PASSWORD
+from db_models.models import db, Player, Score
+from services import auth_service, azure_services, compression_service, google_services, image_service, job_service
+from services import matchday_cache, photo_service, search_service
+
+# request(index) returns (url, json body or None[, headers]) for the index-th timed call
+Case = namedtuple('Case', ['name', 'method', 'request'])
+
+ADDED_BY = 'benchmark-add'
+EXCLUDED_ROUTES = {
+    '/logs/stream': 'long-lived server-sent-events stream',
+    '/logs/clear': 'truncates the live log file',
+    '/insert_team_selection_sheet_data': 'measured as a job with a fake sheet',
+    '/update_players_images': 'measured as a job with fake Drive and Azure clients',
+    '/jobs/<job_id>': 'measured with the jobs',
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))]
+
+
+def summarize(samples, statuses=None):
+    values = sorted(samples)
+    total = sum(values)
+    summary = {
+        "count": len(values),
+        "mean_ms": round(total / len(values) * 1000, 3) if values else None,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3) if values else None,
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3) if values else None,
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3) if values else None,
+        "max_ms": round(values[-1] * 1000, 3) if values else None,
+        "throughput_per_s": round(len(values) / total, 2) if total else None,
+    }
+    if statuses is not None:
+        summary["statuses"] = dict(statuses)
+    return summary
+
+
+def clear_caches(container_name):
+    matchday_cache.invalidate()
+    search_service.player_directory.index = None
+    photo_service.invalidate(container_name)
+    compression_service.compressed_cache.clear()
+    auth_service.token_cache.clear()
+
+
+def route_cases(data, photos):
+    dates = [day.isoformat() for day in data["dates"]]
+    fields, teams = data["fields"], data["teams"]
+    players = data["players"]
+
+    def pick(values, index):
+        return values[index % len(values)]
+
+    def date_field(index):
+        return f'date={pick(dates, index)}&field_auto={pick(fields, index // len(dates))}'
+
+    def score_ids():
+        return db.session.execute(select(Score.score_id).where(Score.entered_by != ADDED_BY)
+                                  .order_by(Score.score_id)).scalars().all()
+
+    def added_score_ids():
+        return db.session.execute(select(Score.score_id).where(Score.entered_by == ADDED_BY)
+                                  .order_by(Score.score_id)).scalars().all()
+
+    ids = score_ids()
+
+    def new_score(index):
+        return {"team_a": 'blue', "score_a": index % 5, "team_b": 'orange', "score_b": (index + 2) % 5,
+                "entered_by": ADDED_BY, "entered_date": pick(dates, index), "entered_time": '21:30',
+                "field": pick(fields, index)}
+
+    def delete_added(index):
+        added = added_score_ids()
+        return (f'/delete_score?score_id={added[0]}' if added else '/delete_score?score_id=0'), None
+
+    admin = db.session.execute(select(*auth_service.ACCOUNT_COLUMNS).where(Player.gmail == ADMIN_GMAIL)).first()
+    access_token = auth_service.issue_access_token(admin)
+    admin_headers = {'Authorization': f'Bearer {access_token}'}
+
+    def refresh_token():
+        # Issued outside the timed request, as /login would have done
+        token = auth_service.issue_refresh_token(admin.player_id)
+        db.session.commit()
+        return {"refresh_token": token}
+
+    return [
+        Case('GET /', 'GET', lambda i: ('/', None)),
+        Case('GET /get_games_dates', 'GET', lambda i: ('/get_games_dates', None)),
+        Case('GET /get_all_fields', 'GET', lambda i: (f'/get_all_fields?date={pick(dates, i)}', None)),
+        Case('GET /get_field', 'GET', lambda i: (f'/get_field?{date_field(i)}', None)),
+        Case('GET /get_teams_by_field_and_date', 'GET',
+             lambda i: (f'/get_teams_by_field_and_date?{date_field(i)}', None)),
+        Case('GET /get_all_players', 'GET',
+             lambda i: (f'/get_all_players?date={pick(dates, i)}&field={pick(fields, i)}', None)),
+        Case('GET /get_team', 'GET', lambda i: (f'/get_team?{date_field(i)}&team_to_pick={pick(teams, i)}', None)),
+        Case('GET /search_players_by_name', 'GET',
+             lambda i: (f'/search_players_by_name?date={pick(dates, i)}&query={pick(players, i)[:3]}', None)),
+        Case('GET /search_players', 'GET', lambda i: (f'/search_players?query={pick(players, i * 7)[:4]}', None)),
+        Case('GET /matchday', 'GET', lambda i: (f'/matchday?date={pick(dates, i)}', None)),
+        Case('GET /matchday?field', 'GET', lambda i: (f'/matchday?date={pick(dates, i)}&field={pick(fields, i)}', None)),
+        Case('GET /get_scores_by_field_and_date', 'GET',
+             lambda i: (f'/get_scores_by_field_and_date?entered_date={pick(dates, i)}&field={pick(fields, i)}',
+                        None)),
+        Case('GET /get_games_statistics_by_team_and_date', 'GET',
+             lambda i: (f'/get_games_statistics_by_team_and_date?entered_date={pick(dates, i)}'
+                        f'&field={pick(fields, i)}', None)),
+        Case('GET /get_standings', 'GET', lambda i: ('/get_standings', None)),
+        Case('GET /get_standings?entered_date', 'GET',
+             lambda i: (f'/get_standings?entered_date={pick(dates, i)}&field={pick(fields, i)}', None)),
+        Case('GET /player_ratings', 'GET', lambda i: ('/player_ratings?limit=50', None)),
+        Case('GET /get_score_by_id', 'GET', lambda i: (f'/get_score_by_id?score_id={pick(ids, i)}', None)),
+        Case('POST /add_score', 'POST', lambda i: ('/add_score', new_score(i))),
+        Case('POST /add_scores', 'POST', lambda i: ('/add_scores', [
+            dict(new_score(i * 10 + entry), idempotency_key=f'benchmark-{i // 2}-{entry}') for entry in range(10)])),
+        Case('PATCH /update_score', 'PATCH',
+             lambda i: (f'/update_score?score_id={pick(ids, i)}', {"score_a": i % 5, "score_b": (i + 1) % 5})),
+        Case('DELETE /delete_score', 'DELETE', delete_added),
+        Case('GET /get_images_from_azure', 'GET', lambda i: ('/get_images_from_azure', None)),
+        Case('GET /get_images_from_azure?page', 'GET',
+             lambda i: (f'/get_images_from_azure?page={i % 5 + 1}&page_size=20', None)),
+        Case('GET /player_photo', 'GET', lambda i: (f'/player_photo?name=Player {i % photos:04d}.jpg&size=256', None)),
+        Case('GET /metrics', 'GET', lambda i: ('/metrics', None)),
+        Case('GET /log', 'GET', lambda i: ('/log?lines=200', None, admin_headers)),
+        Case('GET /logs?tail', 'GET', lambda i: ('/logs?tail=100', None, admin_headers)),
+        Case('GET /logs/files', 'GET', lambda i: ('/logs/files', None, admin_headers)),
+        Case('POST /logs/stream/token', 'POST', lambda i: ('/logs/stream/token', None, admin_headers)),
+        Case('GET /jobs', 'GET', lambda i: ('/jobs', None)),
+        Case('GET /analytics/snapshot', 'GET', lambda i: ('/analytics/snapshot', None)),
+        Case('GET /analytics/win_rates', 'GET', lambda i: ('/analytics/win_rates?by=player_name,field', None)),
+        Case('GET /analytics/attendance', 'GET', lambda i: ('/analytics/attendance', None)),
+        Case('GET /analytics/attribute_trends', 'GET',
+             lambda i: (f'/analytics/attribute_trends?by=month&field={pick(fields, i)}', None)),
+        Case('POST /balance_teams', 'POST',
+             lambda i: ('/balance_teams', {"date": pick(dates, i), "field_auto": pick(fields, i), "seed": i})),
+        Case('POST /login', 'POST', lambda i: ('/login', {"gmail": ADMIN_GMAIL, "password": ADMIN_PASSWORD})),
+        Case('POST /refresh', 'POST', lambda i: ('/refresh', refresh_token())),
+        Case('POST /logout', 'POST', lambda i: ('/logout', refresh_token())),
+        Case('GET /me', 'GET', lambda i: ('/me', None, admin_headers)),
+    ]
+
+
+def uncovered_routes(app, cases):
+    """Routes in the app that neither a case nor EXCLUDED_ROUTES accounts for."""
+    covered = {case.name.split(' ', 1)[1].split('?')[0] for case in cases} | set(EXCLUDED_ROUTES)
+    return sorted(rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != 'static'
+                  and rule.rule not in covered)
+
+
+def run_case(client, case, iterations, warmup, cold=False, container_name=None, headers=None):
+    samples, statuses, sizes = [], Counter(), []
+    for index in range(warmup + iterations):
+        url, body, *extra = case.request(index)
+        request_headers = dict(headers or {}, **(extra[0] if extra else {}))
+        if cold:
+            clear_caches(container_name)
+        started = time.perf_counter()
+        response = client.open(url, method=case.method, json=body, headers=request_headers)
+        elapsed = time.perf_counter() - started
+        response.close()
+        if index >= warmup:
+            samples.append(elapsed)
+            statuses[response.status_code] += 1
+            sizes.append(response.content_length or 0)
+    return dict(summarize(samples, statuses), mean_bytes=round(sum(sizes) / len(sizes)) if sizes else None)
+
+
+def run_routes(app, data, iterations, warmup, photos, only=None, cold=False, container_name=None, progress=print,
+               accept_encoding=None):
+    client = app.test_client()
+    cases = [case for case in route_cases(data, photos) if only is None or re.search(only, case.name)]
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else None
+    results = {}
+    for case in cases:
+        # bcrypt is deliberately slow, so login gets a fraction of the iterations
+        count = max(iterations // 10, 5) if case.name == 'POST /login' else iterations
+        results[case.name] = run_case(client, case, count, min(warmup, count), cold, container_name, headers)
+        progress(f"{case.name:<48} p50 {results[case.name]['p50_ms']:>9} ms  "
+                 f"p95 {results[case.name]['p95_ms']:>9} ms  p99 {results[case.name]['p99_ms']:>9} ms")
+    return results
+
+
+def install_fakes(worksheet, drive_service):
+    google_services.get_google_sheet = lambda sheet_id: worksheet
+    google_services.create_drive_service = lambda: drive_service
+    google_services.MediaIoBaseDownload = fakes.FakeMediaIoBaseDownload
+    google_services._drive_services.__dict__.clear()
+
+
+def seed_photo_container(container_name, count):
+    service = fakes.FakeBlobServiceClient()
+    azure_services.set_blob_service(service)
+    fakes.seed_photos(service.get_container_client(container_name), count,
+                      image_service.variant_name, image_service.VARIANT_SIZES)
+    return service
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def run_jobs(app_module, data, iterations, photos, photo_size, container_name, progress=print):
+    client = app_module.app.test_client()
+    worksheet = fakes.FakeWorksheet(fakes.sheet_rows(data["selections"]))
+    drive_service = fakes.FakeDriveService(fakes.drive_files(photos, photo_size))
+    install_fakes(worksheet, drive_service)
+    results = {}
+
+    def record(name, samples, **extra):
+        results[name] = dict(summarize(samples), **extra)
+        progress(f"{name:<48} p50 {results[name]['p50_ms']:>9} ms  max {results[name]['max_ms']:>9} ms")
+
+    job_ids = []
+
+    def run_job(url, method='GET'):
+        # Enqueue through the route, then drain the queue the way a worker would
+        response = client.open(url, method=method)
+        job_ids.append(response.get_json()['job_id'])
+        job_service.run_pending()
+
+    def sheet_import(query=''):
+        run_job(f'/insert_team_selection_sheet_data{query}')
+
+    samples = [timed(sheet_import) for _ in range(iterations)]
+    record('sheet import (full upsert)', samples, rows=len(worksheet.rows))
+
+    samples = []
+    for revision in range(iterations):
+        # A new revision makes the sync diff every row against its stored fingerprint
+        worksheet.spreadsheet.revision = f'benchmark-{time.time()}-{revision}'
+        samples.append(timed(lambda: sheet_import('?mode=incremental')))
+    record('sheet sync (new revision)', samples, rows=len(worksheet.rows))
+
+    samples = [timed(lambda: sheet_import('?mode=incremental')) for _ in range(iterations)]
+    record('sheet sync (same revision)', samples, rows=len(worksheet.rows))
+
+    cold, warm = [], []
+    for _ in range(iterations):
+        azure_services.set_blob_service(fakes.FakeBlobServiceClient())
+        cold.append(timed(lambda: run_job('/update_players_images')))
+        warm.append(timed(lambda: run_job('/update_players_images')))
+    megabytes = sum(len(item['data']) for item in drive_service.items) / 1e6
+    record('transfer_files (all new)', cold, files=photos, megabytes=round(megabytes, 2))
+    record('transfer_files (all unchanged)', warm, files=photos)
+
+    samples = [timed(lambda: run_job('/analytics/snapshot', 'POST')) for _ in range(iterations)]
+    tables = client.get('/analytics/snapshot').get_json()['tables']
+    record('analytics snapshot export', samples, **{f'{name}_rows': table['rows'] for name, table in tables.items()})
+
+    statuses = Counter()
+    samples = []
+    for job_id in job_ids:
+        started = time.perf_counter()
+        response = client.get(f'/jobs/{job_id}')
+        samples.append(time.perf_counter() - started)
+        statuses[response.get_json()['status']] += 1
+    record('GET /jobs/<job_id>', samples, statuses=dict(statuses))
+    return results
@@ -0,0 +1,151 @@
+"""Deterministic synthetic league data written through db_models.models."""
+import random
+from datetime import date, time, timedelta
+
+from flask_bcrypt import generate_password_hash
+from sqlalchemy import delete, func, insert, select
+
+from db_models.models import (db, Player, PlayerRating, RatingChange, Score, Standing, TeamSelection,
+                              TeamSelectionFingerprint, SheetSyncState)
+from services import etag_service, matchday_cache, rating_service, search_service, standings_service
+
+TEAMS = ['Blue Team', 'Orange Team', 'Green Team', 'Blue Metal Team']
+FIRST_NAMES = ['Avi', 'Dan', 'Yossi', 'Omer', 'Noam', 'Itay', 'Gil', 'Roni', 'Tal', 'Eran', 'Amit', 'Ido']
+LAST_NAMES = ['Cohen', 'Levi', 'Mizrahi', 'Peretz', 'Biton', 'Friedman', 'Ariel', 'Katz', 'Azulay', 'Dahan']
+HEBREW_NAMES = ['אבי', 'דן', 'יוסי', 'עומר', 'נועם', 'איתי', 'גיל', 'רוני', 'טל', 'ערן', 'עמית', 'עידו']
+ADMIN_GMAIL = 'benchmark.admin@example.com'
+ADMIN_PASSWORD = 'benchmark'
+SEASON_START = date(2021, 9, 4)
+INSERT_BATCH = 2000
+
+MODELS = (RatingChange, PlayerRating, Standing, Score, TeamSelectionFingerprint, SheetSyncState, TeamSelection, Player)
+
+
+class SeedConfig:
+    def __init__(self, seasons=2, matchdays=30, fields=3, teams_per_field=3, players_per_team=6,
+                 games_per_field=6, player_pool=None, seed=42):
+        self.seasons = seasons
+        self.matchdays = matchdays
+        self.fields = fields
+        self.teams_per_field = min(teams_per_field, len(TEAMS))
+        self.players_per_team = players_per_team
+        self.games_per_field = games_per_field
+        per_matchday = fields * self.teams_per_field * players_per_team
+        self.player_pool = max(player_pool or int(per_matchday * 1.5), per_matchday)
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def player_name(index):
+    last_name = LAST_NAMES[index // len(FIRST_NAMES) % len(LAST_NAMES)]
+    return f'{FIRST_NAMES[index % len(FIRST_NAMES)]} {last_name} {index:04d}'
+
+
+def matchday_dates(config):
+    return [SEASON_START + timedelta(days=365 * season + 7 * matchday)
+            for season in range(config.seasons) for matchday in range(config.matchdays)]
+
+
+def build_players(config, generator):
+    return [{
+        "player_name": player_name(index),
+        "heb": f'{HEBREW_NAMES[index % len(HEBREW_NAMES)]} {index:04d}',
+        "tournament": 'League',
+        "type": 'player',
+        "rating": round(generator.uniform(4, 9), 1),
+        "gmail": f'player{index:04d}@example.com',
+        "phone_number": f'05{generator.randrange(10 ** 8):08d}',
+    } for index in range(config.player_pool)]
+
+
+def build_admin():
+    return {"player_name": 'Benchmark Admin', "heb": 'מנהל', "tournament": 'League', "type": 'admin',
+            "gmail": ADMIN_GMAIL, "password": generate_password_hash(ADMIN_PASSWORD).decode()}
+
+
+def build_selections(config, generator, dates):
+    selections = []
+    for day in dates:
+        names = generator.sample(range(config.player_pool), config.fields * config.teams_per_field
+                                 * config.players_per_team)
+        position = 0
+        for field in range(1, config.fields + 1):
+            for team in TEAMS[:config.teams_per_field]:
+                for index in names[position:position + config.players_per_team]:
+                    selections.append({
+                        "player_name": player_name(index), "team": team, "stamina": generator.randint(1, 10),
+                        "technique": generator.randint(1, 10), "ball_leader": generator.randint(1, 10),
+                        "aggression": generator.randint(1, 10), "tournament": 'League', "version": 'v1',
+                        "tournament_to_pick": 'League', "team_to_pick": team, "field_auto": f'Field {field}',
+                        "date": day,
+                    })
+                position += config.players_per_team
+    return selections
+
+
+def build_scores(config, generator, dates):
+    labels = [matchday_cache.team_label(team) for team in TEAMS[:config.teams_per_field]]
+    pairs = [(a, b) for position, a in enumerate(labels) for b in labels[position + 1:]]
+    scores = []
+    for day in dates:
+        for field in range(1, config.fields + 1):
+            for game in range(config.games_per_field):
+                team_a, team_b = pairs[game % len(pairs)]
+                scores.append({
+                    "team_a": team_a, "score_a": generator.randint(0, 4), "team_b": team_b,
+                    "score_b": generator.randint(0, 4), "entered_by": 'benchmark', "entered_date": day,
+                    "entered_time": time(18 + game * 8 // 60 % 6, game * 8 % 60), "field": f'Field {field}',
+                })
+    return scores
+
+
+def insert_batches(model, records):
+    for start in range(0, len(records), INSERT_BATCH):
+        db.session.execute(insert(model), records[start:start + INSERT_BATCH])
+
+
+def has_data():
+    return any(db.session.execute(select(func.count()).select_from(model)).scalar() for model in MODELS)
+
+
+def reset_caches():
+    matchday_cache.invalidate()
+    search_service.player_directory.index = None
+    etag_service.bump()
+    db.session.commit()
+
+
+def seed(config, reset=False):
+    """Fill an empty database (or, with reset=True, wipe and refill it) and return what was written."""
+    if has_data():
+        if not reset:
+            raise RuntimeError('The database already has data; pass reset=True (--reset) to replace it')
+        for model in MODELS:
+            db.session.execute(delete(model))
+
+    generator = random.Random(config.seed)
+    dates = matchday_dates(config)
+    players = build_players(config, generator)
+    selections = build_selections(config, generator, dates)
+    scores = build_scores(config, generator, dates)
+
+    insert_batches(Player, players)
+    insert_batches(Player, [build_admin()])
+    insert_batches(TeamSelection, selections)
+    insert_batches(Score, scores)
+    db.session.commit()
+    standings = standings_service.rebuild_standings()
+    rated_players, _ = rating_service.rebuild_ratings()
+    reset_caches()
+
+    return {
+        "dates": dates,
+        "fields": [f'Field {field}' for field in range(1, config.fields + 1)],
+        "teams": TEAMS[:config.teams_per_field],
+        "players": [player["player_name"] for player in players],
+        "selections": selections,
+        "counts": {"players": len(players) + 1, "team_selection": len(selections), "scores": len(scores),
+                   "standings": standings, "player_ratings": rated_players},
+    }
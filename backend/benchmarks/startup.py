@@ -0,0 +1,50 @@
+"""Cold-start timings of the API process, each sample taken in a fresh interpreter."""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.runner import summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Integrations that only the admin jobs, team balancing and analytics need; none of them should be imported to serve the first request
+INTEGRATION_MODULES = ('numpy', 'pandas', 'pyarrow', 'gspread', 'googleapiclient', 'google.oauth2',
+                       'azure.storage.blob', 'PIL.Image')
+
+PROBE = f'''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({{"import_s": imported - started, "first_request_s": served - imported,
+                  "status": response.status_code,
+                  "integrations": [name for name in {INTEGRATION_MODULES!r} if name in sys.modules]}}))
+'''
+
+
+def probe(env):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env, capture_output=True,
+                               text=True, check=True)
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    sample["process_s"] = time.perf_counter() - started
+    return sample
+
+
+def run_startup(iterations, database_url, progress=print):
+    env = dict(os.environ, DATABASE_URL=database_url, JOB_WORKERS='0')
+    env.setdefault('SECRET_KEY', 'benchmark-secret-key-not-for-production')
+    samples = [probe(env) for _ in range(iterations)]
+
+    results = {}
+    for name, key in (('import app', 'import_s'), ('first request', 'first_request_s'),
+                      ('process start to first response', 'process_s')):
+        results[name] = summarize([sample[key] for sample in samples])
+        progress(f"{name:<48} p50 {results[name]['p50_ms']:>9} ms  max {results[name]['max_ms']:>9} ms")
+    integrations = sorted({name for sample in samples for name in sample["integrations"]})
+    results['import app']['integrations_loaded'] = integrations
+    progress(f"Integrations loaded at startup: {', '.join(integrations) or 'none'}")
+    return results
@@ -0,0 +1,68 @@
+import argparse
+
+from sqlalchemy import inspect
+
+from app import app
+from db_models.models import db
+from services import auth_service as aus, job_service as jbs, rating_service as rts, standings_service as sts
+
+
+def init_db(args):
+    existing = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    created = sorted(set(inspect(db.engine).get_table_names()) - existing)
+    print(f"Created tables: {', '.join(created)}" if created else 'All tables already exist')
+
+
+def rebuild_standings(args):
+    rows = sts.rebuild_standings()
+    print(f'Rebuilt standings: {rows} rows')
+
+
+def rebuild_ratings(args):
+    players, games = rts.rebuild_ratings()
+    print(f'Rebuilt ratings: {players} players from {games} games')
+
+
+def export_analytics(args):
+    from services import analytics_service
+
+    manifest = analytics_service.export_snapshot()
+    tables = ', '.join(f"{name} {table['rows']} rows" for name, table in manifest['tables'].items())
+    print(f"Exported analytics snapshot {manifest['snapshot_id']} in {manifest['seconds']}s: {tables}")
+
+
+def purge_refresh_tokens(args):
+    removed = aus.purge_refresh_tokens()
+    print(f'Purged {removed} expired refresh tokens')
+
+
+def run_jobs(args):
+    # A separate worker process; set JOB_WORKERS=0 on the web processes to leave all jobs to it
+    print(f'Running queued jobs (polling every {jbs.POLL_SECONDS:g}s)')
+    jbs.work_forever(app)
+
+
+COMMANDS = {
+    'init-db': (init_db, 'Create missing tables (run `python -m migrations upgrade` for existing ones)'),
+    'rebuild-standings': (rebuild_standings, 'Recompute the standings table from every score'),
+    'rebuild-ratings': (rebuild_ratings, 'Recompute every player rating from the full score history'),
+    'export-analytics': (export_analytics, 'Write a new analytics snapshot of team_selection and scores'),
+    'purge-refresh-tokens': (purge_refresh_tokens, 'Delete expired refresh tokens'),
+    'run-jobs': (run_jobs, 'Run queued sheet imports and photo transfers until interrupted'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python commands.py', description='Maintenance commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text)
+    args = parser.parse_args()
+
+    with app.app_context():
+        COMMANDS[args.command][0](args)
+
+
+if __name__ == '__main__':
+    main()
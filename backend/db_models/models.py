@@ -7,6 +7,10 @@ db = SQLAlchemy()
 
 class TeamSelection(db.Model):
     __tablename__ = 'team_selection'
+    __table_args__ = (
+        db.UniqueConstraint('date', 'player_name', name='uq_team_selection_date_player_name'),
+        db.Index('ix_team_selection_date_field_team', 'date', 'field_auto', 'team_to_pick'),
+    )
 
     player_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     player_name = db.Column(db.String(255), nullable=False)
@@ -40,9 +44,32 @@ class TeamSelection(db.Model):
         }
 
 
+class TeamSelectionFingerprint(db.Model):
+    __tablename__ = 'team_selection_fingerprints'
+
+    date = db.Column(db.Date, primary_key=True)
+    player_name = db.Column(db.String(255), primary_key=True)
+    row_hash = db.Column(db.String(16), nullable=False)
+    synced_at = db.Column(db.DateTime, nullable=False)
+
+
+class SheetSyncState(db.Model):
+    __tablename__ = 'sheet_sync_state'
+
+    sheet_id = db.Column(db.String(255), primary_key=True)
+    revision = db.Column(db.String(255))
+    synced_at = db.Column(db.DateTime, nullable=False)
+
+
 # Model for Score
 class Score(db.Model):
     __tablename__ = 'scores'
+    __table_args__ = (
+        db.Index('ix_scores_field_date_time', 'field', 'entered_date', 'entered_time'),
+        # SQL Server treats NULLs as equal in unique indexes, so only keyed rows are indexed there
+        db.Index('uq_scores_idempotency_key', 'idempotency_key', unique=True,
+                 mssql_where=db.text('idempotency_key IS NOT NULL')),
+    )
 
     score_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     team_a = db.Column(db.String(255))
@@ -50,9 +77,10 @@ class Score(db.Model):
     team_b = db.Column(db.String(255))
     score_b = db.Column(db.Integer, nullable=False)
     entered_by = db.Column(db.String(255))
-    entered_date = db.Column(db.String(50))
-    entered_time = db.Column(db.String(50))
+    entered_date = db.Column(db.Date)
+    entered_time = db.Column(db.Time)
     field = db.Column(db.String(255), nullable=False)
+    idempotency_key = db.Column(db.String(64))
 
     def to_dict(self):
         return {
@@ -62,15 +90,47 @@ class Score(db.Model):
             "team_b": self.team_b,
             "score_b": self.score_b,
             "entered_by": self.entered_by,
-            "entered_date": self.entered_date,
-            "entered_time": self.entered_time,
+            "entered_date": self.entered_date.isoformat() if self.entered_date else None,
+            "entered_time": self.entered_time.strftime('%H:%M') if self.entered_time else None,
             "field": self.field
         }
 
 
+class Standing(db.Model):
+    __tablename__ = 'standings'
+
+    entered_date = db.Column(db.Date, primary_key=True)
+    field = db.Column(db.String(255), primary_key=True)
+    team = db.Column(db.String(255), primary_key=True)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    won = db.Column(db.Integer, nullable=False, default=0)
+    drawn = db.Column(db.Integer, nullable=False, default=0)
+    lost = db.Column(db.Integer, nullable=False, default=0)
+    goals_for = db.Column(db.Integer, nullable=False, default=0)
+    goals_against = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "entered_date": self.entered_date.isoformat() if self.entered_date else None,
+            "field": self.field,
+            "team": self.team,
+            "played": self.played,
+            "won": self.won,
+            "drawn": self.drawn,
+            "lost": self.lost,
+            "goals_for": self.goals_for,
+            "goals_against": self.goals_against,
+            "points": self.points
+        }
+
+
 # Model for Player
 class Player(db.Model):
     __tablename__ = 'players'
+    __table_args__ = (
+        db.Index('ix_players_gmail', 'gmail'),
+    )
 
     player_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     phone_number = db.Column(db.String(255))
@@ -98,7 +158,6 @@ class Player(db.Model):
             "tournament": self.tournament,
             "rating": self.rating,
             "type": self.type,
-            "password": self.password,
             "payment_type": self.payment_type,
             "id": self.id,
             "aa": self.aa,
@@ -110,6 +169,78 @@ class Player(db.Model):
         }
 
 
+class RefreshToken(db.Model):
+    __tablename__ = 'refresh_tokens'
+
+    # Only a SHA-256 digest of the token is stored
+    token_hash = db.Column(db.String(64), primary_key=True)
+    family_id = db.Column(db.String(32), nullable=False, index=True)
+    player_id = db.Column(db.Integer, nullable=False)
+    issued_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime)
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_created_at', 'status', 'created_at'),
+        # Set only while the job is queued or running, so a second run of the same work collides here
+        db.Index('uq_jobs_active_key', 'active_key', unique=True, mssql_where=db.text('active_key IS NOT NULL')),
+    )
+
+    job_id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text)
+    active_key = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False)
+    progress_done = db.Column(db.Integer)
+    progress_total = db.Column(db.Integer)
+    progress_message = db.Column(db.String(255))
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    worker = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+class PlayerRating(db.Model):
+    __tablename__ = 'player_ratings'
+    __table_args__ = (
+        db.Index('ix_player_ratings_rating', 'rating'),
+    )
+
+    # Keyed by name, the identity TeamSelection rows share across dates
+    player_name = db.Column(db.String(255), primary_key=True)
+    rating = db.Column(db.Float, nullable=False)
+    form = db.Column(db.Float, nullable=False)
+    games = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    draws = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    last_played = db.Column(db.Date)
+
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+
+    # One counter per cached scope ('*', a date, or date/field), shared by every process and job worker
+    scope = db.Column(db.String(255), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RatingChange(db.Model):
+    __tablename__ = 'rating_changes'
+
+    # What each game added to each player's rating, so an edited or deleted score can be taken back out
+    score_id = db.Column(db.Integer, primary_key=True)
+    player_name = db.Column(db.String(255), primary_key=True)
+    delta = db.Column(db.Float, nullable=False)
+    result = db.Column(db.Float, nullable=False)
+
+
 class User(UserMixin):
     def __init__(self, id, email, password):
         self.id = id
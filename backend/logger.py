@@ -1,30 +1,131 @@
+import atexit
+import json
 import logging
 import os
-from datetime import date
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import time
+from datetime import date, datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, request as current_request
 
 LOGS_DIR = 'logs'
 os.makedirs(LOGS_DIR, exist_ok=True)
 
-cur_date = date.today()
-LOG_NAME = f'app-log-{cur_date}.log'
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 20
+QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+PAYLOAD_MAX_CHARS = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', 512))
+PAYLOAD_MAX_ITEMS = 10
+# Share of successful responses whose payload is logged; error payloads are always logged
+PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.1))
+RECORD_FIELDS = ('method', 'path', 'status', 'duration_ms', 'payload')
+
+
+def log_name(day):
+    return f'app-log-{day}.log'
+
+
+class DailyRotatingFileHandler(RotatingFileHandler):
+    """Writes app-log-<date>.log, moving to a new file at midnight and size-rotating within a day."""
+
+    def __init__(self, directory, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.directory = directory
+        self.day = date.today()
+        super().__init__(os.path.join(directory, log_name(self.day)), maxBytes=max_bytes,
+                         backupCount=backup_count, encoding='utf-8', delay=True)
+
+    def shouldRollover(self, record):
+        return date.today() != self.day or super().shouldRollover(record)
+
+    def doRollover(self):
+        today = date.today()
+        if today == self.day:
+            return super().doRollover()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.day = today
+        self.baseFilename = os.path.abspath(os.path.join(self.directory, log_name(today)))
+        self.stream = self._open()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({field: getattr(record, field) for field in RECORD_FIELDS if hasattr(record, field)})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the request thread: when the listener falls behind, records are counted and dropped."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
 
-LOG_FILE = os.path.join(LOGS_DIR, LOG_NAME)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-file_handler = RotatingFileHandler(LOG_FILE, maxBytes=1024 * 1024, backupCount=20)
-file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(file_formatter)
+file_handler = DailyRotatingFileHandler(LOGS_DIR)
+file_handler.setFormatter(JsonFormatter())
+
+log_queue = queue.Queue(QUEUE_SIZE)
+logger.addHandler(DroppingQueueHandler(log_queue))
+listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+
+
+def current_log_name():
+    return os.path.basename(file_handler.baseFilename)
+
+
+def summarize_payload(message):
+    if isinstance(message, list) and len(message) > PAYLOAD_MAX_ITEMS:
+        message = message[:PAYLOAD_MAX_ITEMS] + [f'... {len(message) - PAYLOAD_MAX_ITEMS} more items']
+    text = message if isinstance(message, str) else json.dumps(message, ensure_ascii=False, default=str)
+    if len(text) > PAYLOAD_MAX_CHARS:
+        text = f'{text[:PAYLOAD_MAX_CHARS]}... ({len(text) - PAYLOAD_MAX_CHARS} more chars)'
+    return text
 
 
 def log_message(request, message, status_code):
-    if status_code == 200:
-        return logger.info(f'"{request.method} {request.path}  HTTP/1.1" {status_code} \n'
-                           f'{message}')
-    if status_code == 400:
-        return logger.error(f'"{request.method} {request.path}  HTTP/1.1" {status_code}\n'
-                            f'{message}')
+    level = logging.ERROR if status_code >= 400 else logging.INFO
+    fields = {"method": request.method, "path": request.path, "status": status_code}
+    if level == logging.ERROR or random.random() < PAYLOAD_SAMPLE_RATE:
+        fields["payload"] = summarize_payload(message)
+    logger.log(level, f'{request.method} {request.path} {status_code}', extra=fields)
+
 
+def register_request_logging(app):
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
 
-logger.addHandler(file_handler)
+    @app.after_request
+    def log_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            level = logging.ERROR if response.status_code >= 500 else \
+                logging.WARNING if response.status_code >= 400 else logging.INFO
+            logger.log(level, f'{current_request.method} {current_request.path} {response.status_code}',
+                       extra={"method": current_request.method, "path": current_request.path,
+                              "status": response.status_code, "duration_ms": duration_ms})
+        return response
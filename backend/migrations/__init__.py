@@ -0,0 +1,61 @@
+import importlib
+import os
+import pkgutil
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, select
+
+from migrations import versions
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', String(50), primary_key=True),
+    Column('description', String(255)),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def create_migration_engine(url=None):
+    return create_engine(url or os.getenv('DATABASE_URL'))
+
+
+def load_migrations():
+    modules = [importlib.import_module(f'{versions.__name__}.{name}')
+               for _, name, _ in pkgutil.iter_modules(versions.__path__)]
+    return sorted(modules, key=lambda module: module.VERSION)
+
+
+def applied_versions(connection):
+    schema_migrations.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(select(schema_migrations.c.version))}
+
+
+def migration_status(engine):
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [(migration.VERSION, migration.DESCRIPTION, migration.VERSION in applied)
+            for migration in load_migrations()]
+
+
+def upgrade(engine, target=None):
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+
+    upgraded = []
+    for migration in load_migrations():
+        if migration.VERSION in applied:
+            continue
+        if target is not None and migration.VERSION > target:
+            break
+        # One transaction per migration so a failure leaves earlier ones applied
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=migration.VERSION,
+                description=migration.DESCRIPTION,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        upgraded.append(migration)
+    return upgraded
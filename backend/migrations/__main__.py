@@ -0,0 +1,47 @@
+import argparse
+
+from migrations import create_migration_engine, migration_status, upgrade
+from migrations.plans import check_plans
+
+
+def print_plans(title, report):
+    print(title)
+    for name, result in report.items():
+        print(f"  {name:<40} {result['access']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m migrations', description='Database schema migrations')
+    parser.add_argument('--database-url', help='Defaults to the DATABASE_URL environment variable')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='List migrations and whether they are applied')
+    upgrade_parser = commands.add_parser('upgrade', help='Apply pending migrations')
+    upgrade_parser.add_argument('--target', help='Stop after this version')
+    upgrade_parser.add_argument('--check-plans', action='store_true',
+                                help='Print the hot query plans before and after upgrading')
+    commands.add_parser('plans', help='Print the access path of the hot read queries')
+    args = parser.parse_args()
+
+    engine = create_migration_engine(args.database_url)
+
+    if args.command == 'status':
+        for version, description, applied in migration_status(engine):
+            print(f"{version}  {'applied' if applied else 'pending':<8} {description}")
+    elif args.command == 'plans':
+        print_plans('Query plans:', check_plans(engine))
+    elif args.command == 'upgrade':
+        before = check_plans(engine) if args.check_plans else None
+        upgraded = upgrade(engine, target=args.target)
+        for migration in upgraded:
+            print(f"Applied {migration.VERSION}: {migration.DESCRIPTION}")
+        if not upgraded:
+            print('Database is up to date.')
+        if before is not None:
+            after = check_plans(engine)
+            print(f"\n{'query':<40} {'before':<12} after")
+            for name in before:
+                print(f"{name:<40} {before[name]['access']:<12} {after[name]['access']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+from sqlalchemy import Date, DateTime, Index, MetaData, Table, Time, inspect
+
+
+def quote(connection, name):
+    return connection.dialect.identifier_preparer.quote(name)
+
+
+def column_type(connection, table_name, column_name):
+    for column in inspect(connection).get_columns(table_name):
+        if column['name'] == column_name:
+            return column['type']
+    raise LookupError(f"Column '{table_name}.{column_name}' does not exist")
+
+
+def unique_constraint_names(connection, table_name):
+    try:
+        return {constraint['name'] for constraint in inspect(connection).get_unique_constraints(table_name)}
+    except NotImplementedError:
+        # SQL Server only reflects unique constraints as the indexes behind them
+        return set()
+
+
+def has_index(connection, table_name, name):
+    names = {index['name'] for index in inspect(connection).get_indexes(table_name)}
+    return name in names | unique_constraint_names(connection, table_name)
+
+
+def has_column(connection, table_name, column_name):
+    return any(column['name'] == column_name for column in inspect(connection).get_columns(table_name))
+
+
+def add_column(connection, table_name, column):
+    if has_column(connection, table_name, column.name):
+        return False
+    # Plain ADD (without COLUMN) is accepted by PostgreSQL, SQLite and SQL Server alike
+    column_type = column.type.compile(dialect=connection.dialect)
+    nullability = '' if column.nullable else ' NOT NULL'
+    connection.exec_driver_sql(f"ALTER TABLE {quote(connection, table_name)} "
+                               f"ADD {quote(connection, column.name)} {column_type}{nullability}")
+    return True
+
+
+def create_index(connection, name, table_name, columns, unique=False, **dialect_options):
+    if has_index(connection, table_name, name):
+        return False
+    table = Table(table_name, MetaData(), autoload_with=connection)
+    Index(name, *(table.c[column] for column in columns), unique=unique, **dialect_options).create(connection)
+    return True
+
+
+def drop_index(connection, table_name, name):
+    """Drop the index or unique constraint called name, whichever it is."""
+    if not has_index(connection, table_name, name):
+        return False
+    table, quoted = quote(connection, table_name), quote(connection, name)
+    if connection.dialect.name == 'mssql':
+        is_constraint = connection.exec_driver_sql(f"SELECT OBJECT_ID(N'{name}', 'UQ')").scalar() is not None
+    else:
+        is_constraint = name in unique_constraint_names(connection, table_name)
+    if is_constraint:
+        connection.exec_driver_sql(f"ALTER TABLE {table} DROP CONSTRAINT {quoted}")
+    else:
+        for index in Table(table_name, MetaData(), autoload_with=connection).indexes:
+            if index.name == name:
+                index.drop(connection)
+    return True
+
+
+def add_unique_constraint(connection, name, table_name, columns):
+    if has_index(connection, table_name, name):
+        return False
+    names = ', '.join(quote(connection, column) for column in columns)
+    connection.exec_driver_sql(f"ALTER TABLE {quote(connection, table_name)} "
+                               f"ADD CONSTRAINT {quote(connection, name)} UNIQUE ({names})")
+    return True
+
+
+def convert_to_date(connection, table_name, column_name):
+    if isinstance(column_type(connection, table_name, column_name), (Date, DateTime)):
+        return False
+
+    dialect = connection.dialect.name
+    table, column = quote(connection, table_name), quote(connection, column_name)
+    if dialect == 'postgresql':
+        connection.exec_driver_sql(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE DATE USING "
+            f"CASE WHEN {column} ~ '^[0-9]{{1,2}}/[0-9]{{1,2}}/[0-9]{{4}}$' "
+            f"THEN to_date({column}, 'DD/MM/YYYY') "
+            f"ELSE CAST(NULLIF({column}, '') AS DATE) END")
+    elif dialect == 'mssql':
+        connection.exec_driver_sql(
+            f"UPDATE {table} SET {column} = CONVERT(varchar(10), TRY_CONVERT(date, {column}, 103), 23) "
+            f"WHERE {column} LIKE '%/%/%'")
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+        connection.exec_driver_sql(f"ALTER TABLE {table} ALTER COLUMN {column} DATE")
+    elif dialect == 'sqlite':
+        # SQLite has no ALTER COLUMN TYPE; SQLAlchemy's Date reads ISO text, so normalize the values
+        connection.exec_driver_sql(
+            f"UPDATE {table} SET {column} = substr({column}, 7, 4) || '-' || substr({column}, 4, 2) "
+            f"|| '-' || substr({column}, 1, 2) WHERE {column} LIKE '__/__/____'")
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+    elif dialect in ('mysql', 'mariadb'):
+        # The MySQL drivers apply %-formatting to every statement, hence the doubled percent signs
+        connection.exec_driver_sql(
+            f"UPDATE {table} SET {column} = DATE_FORMAT(STR_TO_DATE({column}, '%%d/%%m/%%Y'), '%%Y-%%m-%%d') "
+            f"WHERE {column} LIKE '%%/%%/%%'")
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+        connection.exec_driver_sql(f"ALTER TABLE {table} MODIFY {column} DATE")
+    else:
+        raise NotImplementedError(f"Date conversion is not supported for '{dialect}'")
+    return True
+
+
+def convert_to_time(connection, table_name, column_name):
+    if isinstance(column_type(connection, table_name, column_name), (Time, DateTime)):
+        return False
+
+    dialect = connection.dialect.name
+    table, column = quote(connection, table_name), quote(connection, column_name)
+    if dialect == 'postgresql':
+        connection.exec_driver_sql(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE TIME USING CAST(NULLIF({column}, '') AS TIME)")
+    elif dialect == 'mssql':
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+        connection.exec_driver_sql(f"ALTER TABLE {table} ALTER COLUMN {column} TIME")
+    elif dialect == 'sqlite':
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = '0' || {column} WHERE {column} LIKE '_:__'")
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = {column} || ':00' WHERE {column} LIKE '__:__'")
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+    elif dialect in ('mysql', 'mariadb'):
+        connection.exec_driver_sql(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+        connection.exec_driver_sql(f"ALTER TABLE {table} MODIFY {column} TIME")
+    else:
+        raise NotImplementedError(f"Time conversion is not supported for '{dialect}'")
+    return True
@@ -0,0 +1,80 @@
+import re
+from datetime import date
+
+from sqlalchemy import desc, func, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from db_models.models import Score, TeamSelection
+
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN',
+    'sqlite': 'EXPLAIN QUERY PLAN',
+    'mysql': 'EXPLAIN',
+    'mariadb': 'EXPLAIN',
+}
+SAMPLE_DATE = date(2024, 11, 10)
+SAMPLE_FIELD = 'Field 1'
+SAMPLE_TEAM = 'Blue Team'
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def visit_explain(element, compiler, **kw):
+    return f"{EXPLAIN_PREFIXES[compiler.dialect.name]} {compiler.process(element.statement, **kw)}"
+
+
+def hot_queries():
+    on_field_and_date = (TeamSelection.field_auto == SAMPLE_FIELD, TeamSelection.date == SAMPLE_DATE)
+    return {
+        'get_all_fields': select(TeamSelection.field_auto).distinct().where(TeamSelection.date == SAMPLE_DATE),
+        'get_field_by_date_and_team': select(TeamSelection.team_to_pick).where(*on_field_and_date).distinct(),
+        'get_teams_by_field_and_date': select(func.replace(func.lower(TeamSelection.team_to_pick), ' team', ''))
+        .where(*on_field_and_date).distinct(),
+        'get_all_players': select(TeamSelection).where(*on_field_and_date),
+        'get_team': select(TeamSelection).where(*on_field_and_date, TeamSelection.team_to_pick == SAMPLE_TEAM),
+        'get_games_dates': select(TeamSelection.date).distinct().order_by(TeamSelection.date.desc()).limit(5),
+        'get_scores_by_field_and_date': select(Score)
+        .where(Score.field == SAMPLE_FIELD, Score.entered_date == SAMPLE_DATE)
+        .order_by(desc(Score.entered_time)).limit(10),
+        'get_games_statistics_by_team_and_date': select(Score)
+        .where(Score.entered_date == SAMPLE_DATE, Score.field == SAMPLE_FIELD),
+    }
+
+
+def explain(connection, statement):
+    return [' '.join(str(value) for value in row) for row in connection.execute(Explain(statement))]
+
+
+def classify(dialect_name, plan):
+    lines = [line.lower() for line in plan]
+    if dialect_name == 'postgresql':
+        table_scan = any('seq scan' in line for line in lines)
+    elif dialect_name == 'sqlite':
+        table_scan = any(re.search(r'\bscan\b', line) and 'index' not in line for line in lines)
+    else:
+        table_scan = any(' all ' in f' {line} ' for line in lines)
+    return 'table scan' if table_scan else 'index scan'
+
+
+def check_plans(engine):
+    dialect_name = engine.dialect.name
+    if dialect_name not in EXPLAIN_PREFIXES:
+        raise NotImplementedError(f"Query plan check is not supported for '{dialect_name}'")
+
+    report = {}
+    with engine.connect() as connection:
+        if dialect_name == 'postgresql':
+            # Small tables always favour a seq scan; disable it to check the index is usable at all
+            connection.execute(text('SET LOCAL enable_seqscan = off'))
+        for name, statement in hot_queries().items():
+            plan = explain(connection, statement)
+            report[name] = {'access': classify(dialect_name, plan), 'plan': plan}
+        connection.rollback()
+    return report
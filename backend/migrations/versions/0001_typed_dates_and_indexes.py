@@ -0,0 +1,32 @@
+from sqlalchemy import Date, DateTime
+
+from migrations.operations import (add_unique_constraint, column_type, convert_to_date, convert_to_time,
+                                   create_index, drop_index)
+
+VERSION = '0001'
+DESCRIPTION = 'Typed date/time columns and composite indexes for the hot read filters'
+UNIQUE_KEY = 'uq_team_selection_date_player_name'
+
+
+def upgrade(connection):
+    # SQL Server cannot retype a column under a constraint, and scheme.sql had this one before dates were typed
+    recreate_key = (connection.dialect.name == 'mssql'
+                    and not isinstance(column_type(connection, 'team_selection', 'date'), (Date, DateTime))
+                    and drop_index(connection, 'team_selection', UNIQUE_KEY))
+    convert_to_date(connection, 'team_selection', 'date')
+    convert_to_date(connection, 'scores', 'entered_date')
+    convert_to_time(connection, 'scores', 'entered_time')
+
+    # The sheet import upserts on (date, player_name); keep the newest row of any legacy duplicates,
+    # as the import itself lets a later row supersede an earlier one
+    connection.exec_driver_sql(
+        "DELETE FROM team_selection WHERE player_id NOT IN "
+        "(SELECT keep_id FROM (SELECT MAX(player_id) AS keep_id FROM team_selection "
+        "GROUP BY date, player_name) AS keep)")
+    if recreate_key:
+        add_unique_constraint(connection, UNIQUE_KEY, 'team_selection', ['date', 'player_name'])
+    create_index(connection, UNIQUE_KEY, 'team_selection', ['date', 'player_name'], unique=True)
+    create_index(connection, 'ix_team_selection_date_field_team', 'team_selection',
+                 ['date', 'field_auto', 'team_to_pick'])
+    create_index(connection, 'ix_scores_field_date_time', 'scores',
+                 ['field', 'entered_date', 'entered_time'])
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, text
+
+from migrations.operations import add_column, create_index
+
+VERSION = '0002'
+DESCRIPTION = 'Client idempotency keys on scores so retried submissions are deduplicated'
+
+
+def upgrade(connection):
+    add_column(connection, 'scores', Column('idempotency_key', String(64)))
+    create_index(connection, 'uq_scores_idempotency_key', 'scores', ['idempotency_key'], unique=True,
+                 mssql_where=text('idempotency_key IS NOT NULL'))
@@ -0,0 +1,8 @@
+from migrations.operations import create_index
+
+VERSION = '0003'
+DESCRIPTION = 'Index players.gmail for login lookups'
+
+
+def upgrade(connection):
+    create_index(connection, 'ix_players_gmail', 'players', ['gmail'])
@@ -12,8 +12,9 @@ CREATE TABLE team_selection
     tournament_to_pick varchar(255),
     team_to_pick       varchar(255),
     field_auto  nvarchar(50),
-    date        varchar(50),
-    primary key (player_id)
+    date        date,
+    primary key (player_id),
+    constraint uq_team_selection_date_player_name unique (date, player_name)
 );
 
 CREATE TABLE scores
@@ -24,12 +25,17 @@ CREATE TABLE scores
     team_b     varchar(255),
     score_b    int           not null,
     entered_by varchar(255),
-    entered_date varchar(50),
-    entered_time varchar(50),
+    entered_date date,
+    entered_time time,
     field      nvarchar(255) not null,
+    idempotency_key varchar(64),
     primary key (score_id)
 );
 
+CREATE INDEX ix_team_selection_date_field_team ON team_selection (date, field_auto, team_to_pick);
+CREATE INDEX ix_scores_field_date_time ON scores (field, entered_date, entered_time);
+CREATE UNIQUE INDEX uq_scores_idempotency_key ON scores (idempotency_key) WHERE idempotency_key IS NOT NULL;
+
 CREATE TABLE players
 (
     player_id      int           not null identity (1,1),
@@ -49,3 +55,5 @@ CREATE TABLE players
     football_team  nvarchar(50),
     primary key (player_id)
 );
+
+CREATE INDEX ix_players_gmail ON players (gmail);
@@ -0,0 +1,340 @@
+"""Columnar snapshots of the league tables, and the reporting queries answered from them.
+
+export_snapshot copies team_selection, scores and the joined player-game facts into zstd-compressed
+Parquet files; the report endpoints aggregate those with pandas, so they never scan the live tables.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import jsonify, request
+from sqlalchemy import select
+
+from db_models.models import db, Score, TeamSelection
+from services.dates import parse_date
+from services.serialization import list_response
+
+SNAPSHOT_DIR = os.getenv('ANALYTICS_SNAPSHOT_DIR', 'snapshots')
+KEEP_SNAPSHOTS = int(os.getenv('ANALYTICS_KEEP_SNAPSHOTS', 3))
+COMPRESSION = 'zstd'
+EXPORT_BATCH_SIZE = 50000
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+ATTRIBUTES = ['stamina', 'technique', 'ball_leader', 'aggression']
+
+SELECTION_COLUMNS = (TeamSelection.date, TeamSelection.player_name, TeamSelection.team, TeamSelection.stamina,
+                     TeamSelection.technique, TeamSelection.ball_leader, TeamSelection.aggression,
+                     TeamSelection.tournament, TeamSelection.version, TeamSelection.tournament_to_pick,
+                     TeamSelection.team_to_pick, TeamSelection.field_auto)
+SELECTION_SCHEMA = pa.schema([('date', pa.date32()), ('player_name', pa.string()), ('team', pa.string())]
+                             + [(attribute, pa.int32()) for attribute in ATTRIBUTES]
+                             + [(name, pa.string()) for name in ('tournament', 'version', 'tournament_to_pick',
+                                                                 'team_to_pick', 'field_auto')])
+SCORE_COLUMNS = (Score.score_id, Score.entered_date, Score.field, Score.team_a, Score.score_a, Score.team_b,
+                 Score.score_b)
+SCORE_SCHEMA = pa.schema([('score_id', pa.int64()), ('date', pa.date32()), ('field', pa.string()),
+                          ('team_a', pa.string()), ('score_a', pa.int32()), ('team_b', pa.string()),
+                          ('score_b', pa.int32())])
+FACT_COLUMNS = ['score_id', 'date', 'field', 'team', 'opponent', 'goals_for', 'goals_against', 'result', 'points',
+                'player_name'] + ATTRIBUTES + ['tournament', 'version']
+# Explicit, so an empty join or an all-NULL column is not written as Arrow's null type
+FACT_SCHEMA = pa.schema([('score_id', pa.int64()), ('date', pa.date32())]
+                        + [(name, pa.string()) for name in ('field', 'team', 'opponent')]
+                        + [(name, pa.int32()) for name in ('goals_for', 'goals_against')]
+                        + [('result', pa.string()), ('points', pa.int32()), ('player_name', pa.string())]
+                        + [(attribute, pa.int32()) for attribute in ATTRIBUTES]
+                        + [('tournament', pa.string()), ('version', pa.string())])
+# Read back as pandas categoricals, which group far faster than object strings
+CATEGORIES = {
+    'team_selection': ['player_name', 'team', 'tournament', 'version', 'tournament_to_pick', 'team_to_pick',
+                       'field_auto'],
+    'scores': ['field', 'team_a', 'team_b'],
+    'player_games': ['field', 'team', 'opponent', 'result', 'player_name', 'tournament', 'version'],
+}
+WIN_POINTS = 3
+DRAW_POINTS = 1
+
+# The columns each report may group by, in the frame it reads
+FACT_GROUPS = ('player_name', 'field', 'team', 'tournament', 'version', 'year', 'month')
+SELECTION_GROUPS = ('version', 'tournament', 'field_auto', 'player_name', 'year', 'month', 'date')
+RESULT_COLUMNS = ['games', 'wins', 'draws', 'losses', 'win_rate', 'points_per_game', 'goals_for', 'goals_against']
+ATTENDANCE_COLUMNS = ['player_name', 'matchdays', 'first_date', 'last_date', 'games', 'wins', 'draws', 'losses',
+                      'win_rate']
+
+
+def team_labels(teams):
+    # matchday_cache.team_label for a whole column
+    return teams.str.lower().str.replace(' team', '', regex=False)
+
+
+def export_table(connection, query, schema, path):
+    """Stream query results into a Parquet file in batches; returns the row count."""
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression=COMPRESSION) as writer:
+        result = connection.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            rows += len(batch)
+    return rows
+
+
+def player_games(selections, scores):
+    """One row per player per game: each side of a score joined to that team's roster on the day."""
+    sides = pd.concat([
+        scores.rename(columns={'team_a': 'team', 'score_a': 'goals_for', 'team_b': 'opponent',
+                               'score_b': 'goals_against'}),
+        scores.rename(columns={'team_b': 'team', 'score_b': 'goals_for', 'team_a': 'opponent',
+                               'score_a': 'goals_against'}),
+    ], ignore_index=True).dropna(subset=['date', 'team', 'goals_for', 'goals_against'])
+    sides['label'] = team_labels(sides['team'])
+
+    rosters = selections.dropna(subset=['team_to_pick'])
+    rosters = rosters.assign(label=team_labels(rosters['team_to_pick']))[
+        ['date', 'field_auto', 'label', 'player_name'] + ATTRIBUTES + ['tournament', 'version']]
+    facts = sides.merge(rosters, left_on=['date', 'field', 'label'], right_on=['date', 'field_auto', 'label'])
+
+    won, drawn = facts['goals_for'] > facts['goals_against'], facts['goals_for'] == facts['goals_against']
+    facts['result'] = np.select([won, drawn], ['win', 'draw'], 'loss')
+    facts['points'] = np.select([won, drawn], [WIN_POINTS, DRAW_POINTS], 0)
+    return facts[FACT_COLUMNS].sort_values(['date', 'score_id', 'player_name'], ignore_index=True)
+
+
+def snapshot_ids():
+    try:
+        return sorted(name for name in os.listdir(SNAPSHOT_DIR)
+                      if os.path.isfile(os.path.join(SNAPSHOT_DIR, name, MANIFEST_FILE)))
+    except FileNotFoundError:
+        return []
+
+
+def current_snapshot_id():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, CURRENT_FILE)) as current:
+            return current.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(snapshot_id):
+    """Point CURRENT at a finished snapshot, atomically, then drop the oldest beyond KEEP_SNAPSHOTS."""
+    pointer = os.path.join(SNAPSHOT_DIR, CURRENT_FILE)
+    with open(f'{pointer}.tmp', 'w') as current:
+        current.write(snapshot_id)
+    os.replace(f'{pointer}.tmp', pointer)
+    for old in snapshot_ids()[:-KEEP_SNAPSHOTS]:
+        if old != snapshot_id:
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, old), ignore_errors=True)
+
+
+def export_snapshot(progress=None):
+    """Write a new snapshot and make it current; returns its manifest."""
+    started = time.perf_counter()
+    created_at = datetime.now(timezone.utc)
+    snapshot_id = created_at.strftime('%Y%m%dT%H%M%S%fZ')
+    staging = os.path.join(SNAPSHOT_DIR, f'.{snapshot_id}.tmp')
+    os.makedirs(staging)
+    try:
+        # Both tables are read in one transaction; on PostgreSQL that is also one consistent snapshot
+        options = {'isolation_level': 'REPEATABLE READ'} if db.engine.dialect.name == 'postgresql' else {}
+        rows = {}
+        with db.engine.connect().execution_options(**options) as connection, connection.begin():
+            if progress is not None:
+                progress(0, 3, 'Exporting team_selection')
+            rows['team_selection'] = export_table(connection, select(*SELECTION_COLUMNS), SELECTION_SCHEMA,
+                                                  os.path.join(staging, 'team_selection.parquet'))
+            if progress is not None:
+                progress(1, 3, 'Exporting scores')
+            rows['scores'] = export_table(connection, select(*SCORE_COLUMNS), SCORE_SCHEMA,
+                                          os.path.join(staging, 'scores.parquet'))
+
+        if progress is not None:
+            progress(2, 3, 'Joining player games')
+        facts = player_games(pq.read_table(os.path.join(staging, 'team_selection.parquet')).to_pandas(),
+                             pq.read_table(os.path.join(staging, 'scores.parquet')).to_pandas())
+        pq.write_table(pa.Table.from_pandas(facts, schema=FACT_SCHEMA, preserve_index=False),
+                       os.path.join(staging, 'player_games.parquet'), compression=COMPRESSION)
+        rows['player_games'] = len(facts)
+
+        manifest = {
+            "snapshot_id": snapshot_id,
+            "created_at": created_at.isoformat(timespec='seconds'),
+            "tables": {name: {"rows": count, "bytes": os.path.getsize(os.path.join(staging, f'{name}.parquet'))}
+                       for name, count in rows.items()},
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as output:
+            json.dump(manifest, output, indent=2)
+        os.rename(staging, os.path.join(SNAPSHOT_DIR, snapshot_id))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    publish(snapshot_id)
+    return manifest
+
+
+class Snapshot:
+    def __init__(self, snapshot_id):
+        path = os.path.join(SNAPSHOT_DIR, snapshot_id)
+        with open(os.path.join(path, MANIFEST_FILE)) as manifest:
+            self.manifest = json.load(manifest)
+        self.frames = {name: pq.read_table(os.path.join(path, f'{name}.parquet'),
+                                           read_dictionary=columns).to_pandas()
+                       for name, columns in CATEGORIES.items()}
+        for name, frame in self.frames.items():
+            frame['date'] = pd.to_datetime(frame['date'])
+            for column in CATEGORIES[name]:
+                values = frame[column]
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    # Snapshots written before FACT_SCHEMA can hold null-typed columns, which read back as objects
+                    values = values.astype('category')
+                # Dictionary order is order of appearance; sorted categories make sorts alphabetical
+                frame[column] = values.cat.reorder_categories(sorted(values.cat.categories))
+
+
+class SnapshotCache:
+    """The current snapshot's frames, reloaded when CURRENT points at a newer one."""
+
+    def __init__(self):
+        self.snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        snapshot_id = current_snapshot_id()
+        if snapshot_id is None:
+            return None
+        with self._lock:
+            if self.snapshot is None or self.snapshot.manifest['snapshot_id'] != snapshot_id:
+                self.snapshot = Snapshot(snapshot_id)
+            return self.snapshot
+
+    def clear(self):
+        with self._lock:
+            self.snapshot = None
+
+
+snapshot_cache = SnapshotCache()
+
+
+def snapshot_headers(snapshot):
+    return {'X-Snapshot-Id': snapshot.manifest['snapshot_id'],
+            'X-Snapshot-Created-At': snapshot.manifest['created_at']}
+
+
+def filtered(frame):
+    """Rows matching the shared from/to/tournament/field/player_name arguments."""
+    mask = np.ones(len(frame), dtype=bool)
+    start, end = parse_date(request.args.get('from')), parse_date(request.args.get('to'))
+    if start is not None:
+        mask &= (frame['date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (frame['date'] <= pd.Timestamp(end)).to_numpy()
+    for argument, column in (('tournament', 'tournament'), ('player_name', 'player_name'),
+                             ('field', 'field' if 'field' in frame else 'field_auto')):
+        if request.args.get(argument) and column in frame:
+            mask &= (frame[column] == request.args[argument]).to_numpy()
+    return frame[mask]
+
+
+def group_columns(frame, allowed, default):
+    """The validated ?by= columns, adding year/month columns derived from date when asked for."""
+    names = [name.strip() for name in request.args.get('by', default).split(',') if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise ValueError(f"by must be one or more of {', '.join(allowed)}")
+    if 'year' in names:
+        frame = frame.assign(year=frame['date'].dt.year)
+    if 'month' in names:
+        frame = frame.assign(month=frame['date'].dt.strftime('%Y-%m'))
+    return frame, names
+
+
+def records(frame):
+    """JSON-ready rows: dates as ISO strings, floats rounded and NaN as null."""
+    frame = frame.copy()
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_float_dtype(frame[column]):
+            frame[column] = frame[column].round(4)
+        elif isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(object)
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def result_totals(facts, keys):
+    grouped = facts.assign(wins=facts['result'] == 'win', draws=facts['result'] == 'draw',
+                           losses=facts['result'] == 'loss').groupby(keys, observed=True, sort=False)
+    totals = grouped.agg(games=('score_id', 'size'), wins=('wins', 'sum'), draws=('draws', 'sum'),
+                         losses=('losses', 'sum'), points=('points', 'sum'), goals_for=('goals_for', 'sum'),
+                         goals_against=('goals_against', 'sum')).reset_index()
+    totals['win_rate'] = totals['wins'] / totals['games']
+    totals['points_per_game'] = totals.pop('points') / totals['games']
+    return totals
+
+
+def report(build):
+    """Run build(snapshot) -> (rows, columns) and send it with the snapshot's id and age."""
+    try:
+        snapshot = snapshot_cache.get()
+        if snapshot is None:
+            return jsonify({"error": "No analytics snapshot yet; POST /analytics/snapshot to export one"}), 404
+        rows, columns = build(snapshot)
+        return list_response(rows, columns, snapshot_headers(snapshot))
+    except (ValueError, KeyError) as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def get_win_rates():
+    """Results of player-games grouped by ?by= (default field), e.g. by=player_name,field."""
+    def build(snapshot):
+        facts, keys = group_columns(filtered(snapshot.frames['player_games']), FACT_GROUPS, 'field')
+        totals = result_totals(facts, keys).sort_values(keys)
+        return records(totals), keys + RESULT_COLUMNS
+    return report(build)
+
+
+def get_attendance():
+    """Matchdays each player was selected for, with their results over the same period."""
+    def build(snapshot):
+        selections = filtered(snapshot.frames['team_selection'])
+        attendance = selections.groupby('player_name', observed=True).agg(
+            matchdays=('date', 'nunique'), first_date=('date', 'min'), last_date=('date', 'max')).reset_index()
+        totals = result_totals(filtered(snapshot.frames['player_games']), ['player_name'])
+        attendance = attendance.merge(totals[['player_name', 'games', 'wins', 'draws', 'losses', 'win_rate']],
+                                      on='player_name', how='left')
+        for column in ('games', 'wins', 'draws', 'losses'):
+            attendance[column] = attendance[column].fillna(0).astype(int)
+        attendance = attendance.sort_values(['matchdays', 'player_name'], ascending=[False, True])
+        return records(attendance), ATTENDANCE_COLUMNS
+    return report(build)
+
+
+def get_attribute_trends():
+    """Mean and spread of the skill attributes per ?by= group (default version)."""
+    def build(snapshot):
+        selections, keys = group_columns(filtered(snapshot.frames['team_selection']), SELECTION_GROUPS, 'version')
+        grouped = selections.groupby(keys, observed=True)
+        trends = grouped[ATTRIBUTES].agg(['mean', 'std'])
+        trends.columns = [f'{attribute}_{statistic}' for attribute, statistic in trends.columns]
+        trends.insert(0, 'players', grouped['player_name'].nunique())
+        trends.insert(1, 'selections', grouped.size())
+        trends = trends.reset_index().sort_values(keys)
+        return records(trends), list(trends.columns)
+    return report(build)
+
+
+def get_snapshot_manifest():
+    snapshot_id = current_snapshot_id()
+    if snapshot_id is None:
+        return jsonify({"error": "No analytics snapshot yet; POST /analytics/snapshot to export one"}), 404
+    with open(os.path.join(SNAPSHOT_DIR, snapshot_id, MANIFEST_FILE)) as manifest:
+        return jsonify(dict(json.load(manifest), available=snapshot_ids())), 200
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+import jwt
+from flask import g, jsonify, request
+from flask_bcrypt import check_password_hash
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from db_models.models import db, Player, RefreshToken
+
+JWT_SECRET_KEY = os.getenv('SECRET_KEY')
+JWT_ALGORITHM = 'HS256'
+ACCESS_TOKEN_TTL = timedelta(minutes=int(os.getenv('ACCESS_TOKEN_MINUTES', 60)))
+REFRESH_TOKEN_TTL = timedelta(days=int(os.getenv('REFRESH_TOKEN_DAYS', 30)))
+# EventSource cannot send an Authorization header, so streams take a short-lived token in the URL
+STREAM_TOKEN_TTL = timedelta(seconds=int(os.getenv('STREAM_TOKEN_SECONDS', 60)))
+STREAM_SCOPE = 'stream'
+TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 1024))
+
+ACCOUNT_COLUMNS = (Player.player_id, Player.id, Player.gmail, Player.type, Player.player_name)
+
+
+class TokenCache:
+    """LRU of verified access tokens to their claims; expiry is still checked on every hit."""
+
+    def __init__(self, max_entries=TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._claims = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            claims = self._claims.get(token)
+            if claims is None:
+                self.misses += 1
+                return None
+            self._claims.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def put(self, token, claims):
+        with self._lock:
+            self._claims[token] = claims
+            self._claims.move_to_end(token)
+            while len(self._claims) > self.max_entries:
+                self._claims.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._claims.clear()
+
+
+token_cache = TokenCache()
+
+
+def utc(value):
+    # SQLite hands back naive datetimes for values that were stored as UTC
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def account_data(account):
+    return {'id': account.id, 'gmail': account.gmail, 'roles': [account.type], 'player_name': account.player_name}
+
+
+def issue_access_token(account):
+    payload = dict(account_data(account), player_id=account.player_id,
+                   exp=datetime.now(timezone.utc) + ACCESS_TOKEN_TTL)
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def issue_refresh_token(player_id, family_id=None):
+    """Store the digest of a new random refresh token and return the token itself."""
+    token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    db.session.add(RefreshToken(token_hash=token_digest(token), family_id=family_id or secrets.token_hex(16),
+                                player_id=player_id, issued_at=now, expires_at=now + REFRESH_TOKEN_TTL))
+    return token
+
+
+def revoke_family(family_id):
+    db.session.execute(update(RefreshToken)
+                       .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+                       .values(revoked_at=datetime.now(timezone.utc)))
+
+
+def token_response(account, refresh_token, message):
+    return {
+        'token': issue_access_token(account),
+        'refresh_token': refresh_token,
+        'expires_in': int(ACCESS_TOKEN_TTL.total_seconds()),
+        'data': account_data(account),
+        'status_code': 200,
+        'message': message,
+    }
+
+
+def login():
+    data = request.get_json()
+    email = data['gmail']
+    password = data['password']
+
+    try:
+        account = db.session.execute(select(*ACCOUNT_COLUMNS, Player.password)
+                                     .where(Player.gmail == email)).first()
+        if account and account.password and check_password_hash(account.password, password):
+            refresh_token = issue_refresh_token(account.player_id)
+            db.session.commit()
+            return jsonify(token_response(account, refresh_token, 'Login successful!')), 200
+        else:
+            return jsonify({"message": "Invalid credentials!"}), 401
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 500
+
+
+def issue_stream_token(claims):
+    payload = {key: value for key, value in claims.items() if key != 'exp'}
+    payload.update(scope=STREAM_SCOPE, exp=datetime.now(timezone.utc) + STREAM_TOKEN_TTL)
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def stream_token():
+    """A token for ?stream_token= on stream routes, for the user of the current request."""
+    return jsonify({'stream_token': issue_stream_token(g.user),
+                    'expires_in': int(STREAM_TOKEN_TTL.total_seconds())}), 200
+
+
+def refresh():
+    """Exchange a refresh token for a new access token and a new refresh token; bcrypt is never involved."""
+    token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if not token:
+        return jsonify({"message": "refresh_token is required"}), 400
+
+    try:
+        stored = db.session.get(RefreshToken, token_digest(token))
+        if stored is None or utc(stored.expires_at) <= datetime.now(timezone.utc):
+            return jsonify({"message": "Invalid or expired refresh token"}), 401
+
+        # Only one request can revoke the token; a token presented after it was rotated means it
+        # leaked, so its whole family is revoked and the user has to log in again
+        rotated = db.session.execute(update(RefreshToken)
+                                     .where(RefreshToken.token_hash == stored.token_hash,
+                                            RefreshToken.revoked_at.is_(None))
+                                     .values(revoked_at=datetime.now(timezone.utc))).rowcount
+        if not rotated:
+            revoke_family(stored.family_id)
+            db.session.commit()
+            return jsonify({"message": "Refresh token was already used"}), 401
+
+        account = db.session.execute(select(*ACCOUNT_COLUMNS).where(Player.player_id == stored.player_id)).first()
+        if account is None:
+            revoke_family(stored.family_id)
+            db.session.commit()
+            return jsonify({"message": "Invalid or expired refresh token"}), 401
+
+        refresh_token = issue_refresh_token(account.player_id, stored.family_id)
+        db.session.commit()
+        return jsonify(token_response(account, refresh_token, 'Token refreshed')), 200
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 500
+
+
+def logout():
+    token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if not token:
+        return jsonify({"message": "refresh_token is required"}), 400
+
+    try:
+        stored = db.session.get(RefreshToken, token_digest(token))
+        if stored is not None:
+            revoke_family(stored.family_id)
+            db.session.commit()
+        return jsonify({"message": "Logged out"}), 200
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 500
+
+
+def purge_refresh_tokens():
+    """Delete expired refresh tokens and return how many were removed."""
+    removed = db.session.execute(delete(RefreshToken)
+                                 .where(RefreshToken.expires_at <= datetime.now(timezone.utc))).rowcount
+    db.session.commit()
+    return removed
+
+
+def verify_access_token(token):
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM], options={'require': ['exp']})
+        token_cache.put(token, claims)
+    elif claims['exp'] <= time.time():
+        raise jwt.ExpiredSignatureError('Signature has expired')
+    return claims
+
+
+def login_required(*roles, stream=False):
+    """Require a valid bearer access token, and one of roles when any are given; claims go to g.user.
+
+    With stream=True a stream token in the stream_token query argument is accepted instead.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+            scope = None
+            if stream and not token and request.args.get('stream_token'):
+                scheme, token, scope = 'bearer', request.args['stream_token'], STREAM_SCOPE
+            if scheme.lower() != 'bearer' or not token:
+                return jsonify({"message": "Authorization required"}), 401
+            try:
+                claims = verify_access_token(token)
+            except jwt.ExpiredSignatureError:
+                return jsonify({"message": "Token expired"}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({"message": "Invalid token"}), 401
+            if claims.get('scope') != scope:
+                return jsonify({"message": "Invalid token"}), 401
+            if roles and not set(roles) & set(claims.get('roles', [])):
+                return jsonify({"message": "Forbidden"}), 403
+            g.user = claims
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
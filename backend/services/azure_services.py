@@ -1,43 +1,52 @@
 import os
-from azure.storage.blob import BlobServiceClient
+import threading
 
 AZURE_STORAGE_CONN_STR = os.environ.get('AZURE_STORAGE_CONNECTION_STRING')
 
+_blob_service = None
+_container_clients = {}
+_lock = threading.Lock()
+
 
 def create_blob_service():
-    return BlobServiceClient.from_connection_string(conn_str=AZURE_STORAGE_CONN_STR)
+    # The Azure SDK takes a noticeable part of startup, so it loads with the first client
+    from azure.storage.blob import BlobServiceClient
 
+    return BlobServiceClient.from_connection_string(conn_str=AZURE_STORAGE_CONN_STR)
 
-def blob_exists(container_client, blob_name):
-    blob_client = container_client.get_blob_client(blob_name)
-    try:
-        blob_client.get_blob_properties()
-        return True
-    except Exception as e:
-        return False
 
+def get_blob_service():
+    # Azure SDK clients are thread safe and keep a pooled HTTP session, so share one per process
+    global _blob_service
+    with _lock:
+        if _blob_service is None:
+            _blob_service = create_blob_service()
+        return _blob_service
 
-def container_exists(blob_service, name):
-    try:
-        container_client = blob_service.create_container(name)
-        print(f"Container '{name}' created.")
-        return container_client
 
-    except Exception as _:
-        print(f"Container '{name}' already exists.")
-        return blob_service.get_container_client(name)
+def set_blob_service(blob_service):
+    """Replace the shared client, e.g. with one pointing at Azurite or an in-memory stand-in."""
+    global _blob_service
+    with _lock:
+        _blob_service = blob_service
+        _container_clients.clear()
 
 
 def connect_to_azure_storage(container_name):
-    blob_service = create_blob_service()
-    container_client = container_exists(blob_service, container_name)
-
-    try:
-        if container_exists(blob_service, container_name):
-            container_client = blob_service.get_container_client(container=container_name)
-            container_client.get_container_properties()
-            return container_client
-        return container_client
-    except:
-        container_client = blob_service.create_container(container_name)
+    with _lock:
+        container_client = _container_clients.get(container_name)
+    if container_client is not None:
         return container_client
+
+    container_client = get_blob_service().get_container_client(container_name)
+    if not container_client.exists():
+        from azure.core.exceptions import ResourceExistsError
+
+        try:
+            container_client.create_container()
+        except ResourceExistsError:
+            pass
+
+    with _lock:
+        _container_clients[container_name] = container_client
+    return container_client
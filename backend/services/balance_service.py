@@ -0,0 +1,296 @@
+"""Splits a matchday's players into teams with even skill, by batched swap annealing over NumPy arrays."""
+import time
+
+import numpy as np
+from flask import jsonify, request
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from db_models.models import db, SheetSyncState, TeamSelection, TeamSelectionFingerprint
+from services.dates import parse_date
+from services.etag_service import bump as bump_version
+
+ATTRIBUTES = ('stamina', 'technique', 'ball_leader', 'aggression')
+BATCH_SIZE = 256
+MAX_ROUNDS = 2000
+PATIENCE = 300
+# Spread of the per-team variances counts half as much as the spread of the totals
+VARIANCE_WEIGHT = 0.5
+CONSTRAINT_PENALTY = 1000.0
+FINAL_TEMPERATURE = 1e-4
+# Fields with fewer than two teams picked so far are split in this many, unless data['teams'] says otherwise
+DEFAULT_TEAMS = 2
+
+
+def team_sizes(count, teams):
+    return [count // teams + (1 if team < count % teams else 0) for team in range(teams)]
+
+
+def standardize(values, weights):
+    """Attributes to zero mean and unit deviation, scaled so weight w counts w times in the squared terms."""
+    deviation = values.std(axis=0)
+    deviation[deviation == 0] = 1.0
+    return (values - values.mean(axis=0)) / deviation * np.sqrt(weights)
+
+
+def team_moments(x, assignment, teams):
+    sums = np.zeros((teams, x.shape[1]))
+    squares = np.zeros((teams, x.shape[1]))
+    np.add.at(sums, assignment, x)
+    np.add.at(squares, assignment, x * x)
+    return sums, squares
+
+
+def team_variances(sums, squares, sizes):
+    return squares / sizes - (sums / sizes) ** 2
+
+
+def violations(assignment, together, apart):
+    return int(np.count_nonzero(assignment[together[:, 0]] != assignment[together[:, 1]])
+               + np.count_nonzero(assignment[apart[:, 0]] == assignment[apart[:, 1]]))
+
+
+def balance_cost(x, assignment, teams, together, apart):
+    sums, squares = team_moments(x, assignment, teams)
+    sizes = np.bincount(assignment, minlength=teams)[:, None]
+    variances = team_variances(sums, squares, sizes)
+    return (sums.var(axis=0).sum() + VARIANCE_WEIGHT * variances.var(axis=0).sum()
+            + CONSTRAINT_PENALTY * violations(assignment, together, apart))
+
+
+def initial_assignment(x, teams, rng):
+    """Snake draft by overall strength, with ties broken at random."""
+    strength = x.sum(axis=1) + rng.random(len(x)) * 1e-9
+    order = np.argsort(-strength)
+    rounds, position = divmod(np.arange(len(x)), teams)
+    assignment = np.empty(len(x), dtype=np.intp)
+    assignment[order] = np.where(rounds % 2 == 0, position, teams - 1 - position)
+    return assignment
+
+
+def check_constraints(count, teams, together, apart):
+    parent = list(range(count))
+
+    def root(player):
+        while parent[player] != player:
+            parent[player] = parent[parent[player]]
+            player = parent[player]
+        return player
+
+    for a, b in together:
+        parent[root(a)] = root(b)
+    groups = np.bincount([root(player) for player in range(count)], minlength=count)
+    if groups.max(initial=0) > min(team_sizes(count, teams)):
+        raise ValueError('A keep_together group is larger than a team')
+    if any(root(a) == root(b) for a, b in apart):
+        raise ValueError('Players must be kept both together and apart')
+
+
+def swap_deltas(x, x2, assignment, i, j, state, together, apart):
+    """Cost change of swapping players i[k] and j[k], for the whole batch at once."""
+    sums, squares, sizes, variances, teams = state
+    ti, tj = assignment[i], assignment[j]
+    d, d2 = x[j] - x[i], x2[j] - x2[i]
+
+    delta = (2 * d * (sums[ti] - sums[tj]) + 2 * d * d).sum(axis=1) / teams
+
+    vi = team_variances(sums[ti] + d, squares[ti] + d2, sizes[ti])
+    vj = team_variances(sums[tj] - d, squares[tj] - d2, sizes[tj])
+    total = variances.sum(axis=0) + vi - variances[ti] + vj - variances[tj]
+    total2 = (variances ** 2).sum(axis=0) + vi ** 2 - variances[ti] ** 2 + vj ** 2 - variances[tj] ** 2
+    delta += VARIANCE_WEIGHT * (total2 / teams - (total / teams) ** 2 - variances.var(axis=0)).sum(axis=1)
+
+    for pairs, broken_when_same in ((together, False), (apart, True)):
+        if not len(pairs):
+            continue
+        moved = []
+        for column in (0, 1):
+            player = pairs[:, column][None, :]
+            moved.append(np.where(player == i[:, None], tj[:, None],
+                                  np.where(player == j[:, None], ti[:, None], assignment[player])))
+        before = (assignment[pairs[:, 0]] == assignment[pairs[:, 1]]) == broken_when_same
+        after = (moved[0] == moved[1]) == broken_when_same
+        delta += CONSTRAINT_PENALTY * (after.sum(axis=1) - before.sum())
+    return delta
+
+
+def balance(values, teams, together=(), apart=(), weights=None, seed=0):
+    """Assign each row of values (players x attributes) to one of teams teams.
+
+    Minimizes the spread across teams of each attribute's total and variance, with keep-together
+    and keep-apart pairs of row indexes as soft constraints; returns (assignment, cost, violations).
+    """
+    count = len(values)
+    if teams < 2 or teams > count:
+        raise ValueError(f'Cannot split {count} players into {teams} teams')
+    together = np.asarray(together, dtype=np.intp).reshape(-1, 2)
+    apart = np.asarray(apart, dtype=np.intp).reshape(-1, 2)
+    check_constraints(count, teams, together, apart)
+
+    rng = np.random.default_rng(seed)
+    x = standardize(np.asarray(values, dtype=float),
+                    np.ones(values.shape[1]) if weights is None else np.asarray(weights, dtype=float))
+    x2 = x * x
+    assignment = initial_assignment(x, teams, rng)
+    sizes = np.bincount(assignment, minlength=teams)[:, None].astype(float)
+    sums, squares = team_moments(x, assignment, teams)
+    cost = balance_cost(x, assignment, teams, together, apart)
+    best, best_cost, best_round = assignment.copy(), cost, 0
+    temperature = None
+
+    for round_number in range(MAX_ROUNDS):
+        i = rng.integers(count, size=BATCH_SIZE)
+        j = rng.integers(count, size=BATCH_SIZE)
+        state = (sums, squares, sizes, team_variances(sums, squares, sizes), teams)
+        deltas = swap_deltas(x, x2, assignment, i, j, state, together, apart)
+        deltas[assignment[i] == assignment[j]] = np.inf
+        if temperature is None:
+            finite = np.abs(deltas[np.isfinite(deltas)])
+            temperature = float(np.median(finite)) if len(finite) else 0.0
+            cooling = FINAL_TEMPERATURE ** (1 / MAX_ROUNDS)
+
+        k = int(np.argmin(deltas))
+        delta = deltas[k]
+        if np.isfinite(delta) and (delta < 0 or (temperature > 0 and rng.random() < np.exp(-delta / temperature))):
+            a, b = i[k], j[k]
+            ta, tb = assignment[a], assignment[b]
+            sums[ta] += x[b] - x[a]
+            sums[tb] -= x[b] - x[a]
+            squares[ta] += x2[b] - x2[a]
+            squares[tb] -= x2[b] - x2[a]
+            assignment[a], assignment[b] = tb, ta
+            cost += delta
+            if cost < best_cost - 1e-12:
+                best, best_cost, best_round = assignment.copy(), cost, round_number
+        if round_number - best_round > PATIENCE:
+            break
+        temperature *= cooling
+
+    return best, balance_cost(x, best, teams, together, apart), violations(best, together, apart)
+
+
+def team_names(requested, existing):
+    if isinstance(requested, list):
+        if len(set(requested)) != len(requested):
+            raise ValueError('Team names must be unique')
+        return [str(name) for name in requested]
+    count = int(requested) if requested is not None else max(len(existing), DEFAULT_TEAMS)
+    if count == len(existing):
+        return existing
+    return [f'Team {number}' for number in range(1, count + 1)]
+
+
+def constraint_pairs(groups, players, chain):
+    """Groups of player ids or names -> index pairs; chained for keep-together, every pair for keep-apart."""
+    by_id = {player.player_id: index for index, player in enumerate(players)}
+    by_name = {player.player_name: index for index, player in enumerate(players)}
+    pairs = []
+    for group in groups or []:
+        indexes = []
+        for reference in group:
+            index = by_id.get(reference) if isinstance(reference, int) else by_name.get(reference)
+            if index is None:
+                raise ValueError(f"Player '{reference}' is not in this selection")
+            indexes.append(index)
+        if chain:
+            pairs += list(zip(indexes, indexes[1:]))
+        else:
+            pairs += [(a, b) for position, a in enumerate(indexes) for b in indexes[position + 1:]]
+    return pairs
+
+
+def balance_field(players, data, weights):
+    existing = list(dict.fromkeys(player.team_to_pick for player in players if player.team_to_pick))
+    names = team_names(data.get('teams'), existing)
+    # When every field is balanced, each field's constraints are the references to its own players
+    references = {player.player_id for player in players} | {player.player_name for player in players}
+    together = constraint_pairs([[ref for ref in group if ref in references]
+                                 for group in data.get('keep_together') or []], players, chain=True)
+    apart = constraint_pairs([[ref for ref in group if ref in references]
+                              for group in data.get('keep_apart') or []], players, chain=False)
+
+    started = time.perf_counter()
+    values = np.array([[getattr(player, attribute) for attribute in ATTRIBUTES] for player in players], dtype=float)
+    assignment, cost, broken = balance(values, len(names), together, apart, weights, data.get('seed', 0))
+    seconds = time.perf_counter() - started
+
+    totals = np.zeros((len(names), len(ATTRIBUTES)))
+    np.add.at(totals, assignment, values)
+    teams = [{"team_to_pick": name,
+              "size": int(np.count_nonzero(assignment == team)),
+              "totals": dict(zip(ATTRIBUTES, totals[team].tolist())),
+              "players": [{"player_id": players[index].player_id, "player_name": players[index].player_name}
+                          for index in np.flatnonzero(assignment == team)]}
+             for team, name in enumerate(names)]
+    changes = [{"player_id": player.player_id, "team_to_pick": names[team]}
+               for player, team in zip(players, assignment.tolist()) if player.team_to_pick != names[team]]
+    return {
+        "field_auto": players[0].field_auto,
+        "teams": teams,
+        "spread": dict(zip(ATTRIBUTES, np.ptp(totals, axis=0).tolist())),
+        "cost": round(float(cost), 6),
+        "violations": broken,
+        "changed": len(changes),
+        "seconds": round(seconds, 4),
+    }, changes
+
+
+def balance_teams():
+    """Balance the players of data['date'] (one field, or each field separately) and optionally save the teams."""
+    data = request.get_json(silent=True) or {}
+    try:
+        date = parse_date(data.get('date'))
+        if date is None:
+            raise ValueError('date is required')
+        weights = [float((data.get('weights') or {}).get(attribute, 1)) for attribute in ATTRIBUTES]
+        if min(weights) < 0:
+            raise ValueError('weights must not be negative')
+
+        query = (select(TeamSelection.player_id, TeamSelection.player_name, TeamSelection.field_auto,
+                        TeamSelection.team_to_pick, *(getattr(TeamSelection, name) for name in ATTRIBUTES))
+                 .where(TeamSelection.date == date).order_by(TeamSelection.player_id))
+        if data.get('field_auto'):
+            query = query.where(TeamSelection.field_auto == data['field_auto'])
+        by_field = {}
+        for player in db.session.execute(query).all():
+            by_field.setdefault(player.field_auto, []).append(player)
+        if not by_field:
+            return jsonify({"error": "No players selected for this date"}), 404
+        known = {reference for players in by_field.values() for player in players
+                 for reference in (player.player_id, player.player_name)}
+        for group in (data.get('keep_together') or []) + (data.get('keep_apart') or []):
+            for reference in group:
+                if reference not in known:
+                    raise ValueError(f"Player '{reference}' is not in this selection")
+
+        results, changes = [], []
+        for field, players in by_field.items():
+            try:
+                result, field_changes = balance_field(players, data, weights)
+            except ValueError as e:
+                if data.get('field_auto'):
+                    raise
+                # One field that cannot be split must not hold back the others
+                results.append({"field_auto": field, "skipped": str(e)})
+                continue
+            results.append(result)
+            changes += field_changes
+
+        applied = bool(data.get('apply'))
+        if applied and changes:
+            db.session.execute(update(TeamSelection), changes)
+            # The sheet no longer matches these rows, so the next incremental sync must rewrite them
+            names = {player.player_id: player.player_name for players in by_field.values() for player in players}
+            db.session.execute(delete(TeamSelectionFingerprint).where(
+                TeamSelectionFingerprint.date == date,
+                TeamSelectionFingerprint.player_name.in_([names[change['player_id']] for change in changes])))
+            db.session.execute(update(SheetSyncState).values(revision=None))
+            bump_version(date)
+            db.session.commit()
+
+        return jsonify({"date": date.isoformat(), "applied": applied, "fields": results}), 200
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
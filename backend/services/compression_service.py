@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+CACHE_MAX_BYTES = int(os.getenv('COMPRESSION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html', 'text/csv')
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def supported_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+class CompressedCache:
+    """LRU of compressed bodies bounded by their total size."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, body, encoding):
+        with self._lock:
+            compressed = self._bodies.get(key)
+            if compressed is not None:
+                self._bodies.move_to_end(key)
+                self.hits += 1
+                return compressed
+            self.misses += 1
+
+        compressed = compress(body, encoding)
+        if len(compressed) > self.max_bytes:
+            return compressed
+        with self._lock:
+            previous = self._bodies.pop(key, None)
+            self.size += len(compressed) - (len(previous) if previous is not None else 0)
+            self._bodies[key] = compressed
+            while self.size > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self.size -= len(evicted)
+        return compressed
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+            self.size = 0
+
+
+compressed_cache = CompressedCache()
+
+
+def cache_key(body, encoding):
+    # Keyed by content, which is far cheaper to hash than to compress; an ETag is read before the
+    # view runs, so it can name a version older than the data the body holds
+    return encoding, hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def compress_response(response):
+    if response.direct_passthrough or response.is_streamed or response.status_code != 200 \
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    body = response.get_data()
+    if encoding is None or len(body) < MIN_SIZE:
+        return response
+
+    response.set_data(compressed_cache.get(cache_key(body, encoding), body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def register_response_compression(app):
+    app.after_request(compress_response)
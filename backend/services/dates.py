@@ -0,0 +1,33 @@
+from datetime import date, datetime, time
+
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d')
+TIME_FORMATS = ('%H:%M', '%H:%M:%S')
+
+
+def parse_date(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Date '{value}' does not match any known formats")
+
+
+def parse_time(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, time):
+        return value
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Time '{value}' does not match any known formats")
+
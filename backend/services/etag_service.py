@@ -0,0 +1,95 @@
+import hashlib
+from functools import wraps
+
+from flask import make_response, request
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db_models.models import db, DataVersion
+from services.dates import parse_date
+
+# Versions are rows in data_versions, so a write made by any worker or job changes every process's tags
+ALL_DATES = '*'
+
+
+def scope(date=None, field=None):
+    if date is None:
+        return ALL_DATES
+    return date.isoformat() if field is None else f'{date.isoformat()}/{field}'
+
+
+def bump_scope(name):
+    """Add one to the version of scope name in the current transaction; it is published on commit."""
+    counter = update(DataVersion).where(DataVersion.scope == name).values(version=DataVersion.version + 1)
+    if db.session.execute(counter).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(DataVersion).values(scope=name, version=1))
+    except IntegrityError:
+        # Another transaction created the row in the meantime
+        db.session.execute(counter)
+
+
+def bump(date=None, field=None):
+    """Bump the version of (date, field); no date bumps everything, no field the whole date.
+
+    Call it before committing the change, so readers never see the new version with the old data.
+    """
+    bump_scope(scope(date, field))
+
+
+def read_versions(names):
+    rows = db.session.execute(select(DataVersion.scope, DataVersion.version).where(DataVersion.scope.in_(names)))
+    versions = dict(rows.all())
+    return [versions.get(name, 0) for name in names]
+
+
+def fields_version(date):
+    """The sum of every field version of date; versions only grow, so a bump of any field changes it."""
+    fields = select(func.coalesce(func.sum(DataVersion.version), 0)).where(
+        DataVersion.scope.startswith(f'{scope(date)}/', autoescape=True))
+    return db.session.execute(fields).scalar()
+
+
+def current_version(date, field=None, all_fields=False):
+    """The version tag of (date, field); all_fields=True covers every field of the date instead of one."""
+    names = [ALL_DATES]
+    if date is not None:
+        names.append(scope(date))
+        if field is not None:
+            names.append(scope(date, field))
+    versions = read_versions(names)
+    if date is not None and field is None and all_fields:
+        versions.append(fields_version(date))
+    return '.'.join(str(version) for version in versions)
+
+
+def make_etag(date, field=None, all_fields=False):
+    arguments = hashlib.md5(request.full_path.encode(), usedforsecurity=False).hexdigest()[:12]
+    return f"{current_version(date, field, all_fields)}-{arguments}"
+
+
+def conditional(date_arg=None, field_arg=None):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                date = parse_date(request.args.get(date_arg)) if date_arg else None
+            except ValueError:
+                return view(*args, **kwargs)
+            field = request.args.get(field_arg) if field_arg else None
+
+            # Without its field, a per-field route answers for every field of the date
+            etag = make_etag(date, field, all_fields=field_arg is not None)
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
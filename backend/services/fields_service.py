@@ -1,15 +1,16 @@
 from flask import jsonify, request
 from logger import log_message
-from db_models.models import TeamSelection, db
+from services.dates import parse_date
+from services.matchday_cache import get_snapshot
+from services.serialization import list_response
 
 
 def get_all_fields():
     try:
-        date = request.args.get("date")
-        results = db.session.query(TeamSelection.field_auto.label('field')).distinct().filter_by(date=date).all()
-        result_list = [{'field': result.field} for result in results]
+        date = parse_date(request.args.get("date"))
+        result_list = [{'field': field} for field in get_snapshot(date).fields()]
         log_message(request, result_list, 200)
-        return jsonify(result_list), 200
+        return list_response(result_list, ['field'])
     except Exception as e:
         error_message = {"error": str(e)}
         log_message(request, error_message, 400)
@@ -19,15 +20,10 @@ def get_all_fields():
 def get_field_by_date_and_team():
     try:
         field_auto = request.args.get('field_auto')
-        date = request.args.get('date')
-        results = db.session.query(TeamSelection.team_to_pick) \
-            .filter(TeamSelection.field_auto == field_auto) \
-            .filter(TeamSelection.date == date) \
-            .distinct() \
-            .all()
-        response = [{"team_to_pick": result.team_to_pick} for result in results]
+        date = parse_date(request.args.get('date'))
+        response = [{"team_to_pick": team_to_pick} for team_to_pick in get_snapshot(date).teams(field_auto)]
         log_message(request, response, 200)
-        return jsonify(response), 200
+        return list_response(response, ['team_to_pick'])
 
     except Exception as e:
         error_message = {"error": str(e)}
@@ -2,7 +2,10 @@ from datetime import datetime
 
 from flask import jsonify, request
 from sqlalchemy.exc import SQLAlchemyError
-from db_models.models import TeamSelection, db, Score
+from db_models.models import TeamSelection, db
+from services.dates import parse_date
+from services.scores_service import SCORE_FIELDS, scores_on
+from services.serialization import list_response
 
 
 def format_date(d):
@@ -23,7 +26,7 @@ def get_games_dates():
 
         db.session.close()
 
-        return jsonify(formatted_results), 200
+        return list_response(formatted_results, ['date'])
 
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -31,15 +34,13 @@ def get_games_dates():
 
 def get_games_statistics_by_team_and_date():
     try:
-        entered_date = request.args.get("entered_date")
+        entered_date = parse_date(request.args.get("entered_date"))
         field = request.args.get("field")
-        results = db.session.query(Score).filter(Score.entered_date == entered_date,
-                                                 Score.field == field).all()
+        # Statistics aggregate the whole matchday, so unlike the score list this is not paged
+        rows = scores_on(entered_date, [field]).all()
+        return list_response(SCORE_FIELDS.records(rows), SCORE_FIELDS.names)
 
-        result_dicts = [result.to_dict() for result in results]
-        return jsonify(result_dicts), 200
-
-    except SQLAlchemyError as e:
+    except (SQLAlchemyError, ValueError) as e:
 
         return jsonify({"error": str(e)}), 400
     finally:
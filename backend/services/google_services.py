@@ -1,7 +1,14 @@
+import base64
+import hashlib
 import io
 import json
 import os
-from services import azure_services as azs
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.storage.blob import BlobBlock, ContentSettings
+from services import azure_services as azs, image_service as ims
 import gspread as gs
 import pandas as pd
 from dotenv import load_dotenv
@@ -12,6 +19,14 @@ from googleapiclient.http import MediaIoBaseDownload
 
 load_dotenv()
 
+DRIVE_FILE_FIELDS = 'nextPageToken, files(id, name, md5Checksum, modifiedTime, size, mimeType)'
+TRANSFER_WORKERS = int(os.getenv('PHOTO_TRANSFER_WORKERS', 4))
+TRANSFER_RETRIES = 3
+TRANSFER_BACKOFF_SECONDS = 0.5
+TRANSFER_CHUNK_SIZE = 4 * 1024 * 1024
+
+_drive_services = threading.local()
+
 
 def load_credentials():
     credentials_json_str = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON')
@@ -35,6 +50,16 @@ def get_data_from_sheet(sheet, start_column, end_column):
     return df
 
 
+def get_sheet_revision(sheet):
+    spreadsheet = sheet.spreadsheet
+    try:
+        if hasattr(spreadsheet, 'get_lastUpdateTime'):
+            return spreadsheet.get_lastUpdateTime()
+        return spreadsheet.lastUpdateTime
+    except Exception:
+        return None
+
+
 def create_drive_service():
     creds_json = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON')
     creds = service_account.Credentials.from_service_account_info(
@@ -53,47 +78,134 @@ def correct_extension(filename):
         return f"{filename}.jpg"
 
 
-def transfer_files(folder_id, container_name):
-    # Create the Google Drive and Azure Blob services
-    drive_service = create_drive_service()
-    blob_service = azs.create_blob_service()
-
-    # Check if the Azure Blob container exists, or create it if it doesn't
-    container_client = azs.container_exists(blob_service, container_name)
-
-    # Retrieve the list of blobs (files) already in the container
-    blobs_list = container_client.list_blobs()
-    existing_blobs = {blob.name for blob in blobs_list}
-
-    # Retrieve the list of files from the specified Google Drive folder
-    results = drive_service.files().list(
-        q=f"'{folder_id}' in parents and trashed=false",
-        fields="files(id, name)"
-    ).execute()
-    items = results.get('files', [])
-
-    if not items:
-        print('No files found in the Google Drive folder.')
-    else:
-        for item in items:
-            correct_name = correct_extension(item['name'])
-
-            # Check if the file exists in the blob container
-            if correct_name in existing_blobs:
-                print(f'File {correct_name} already exists in the Azure Blob. Updating...')
-            else:
-                print(f'Uploading new file: {correct_name}')
-
-            # Download the file from Google Drive
-            request = drive_service.files().get_media(fileId=item['id'])
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            fh.seek(0)
-
-            # Upload or overwrite the file in Azure Blob Storage
-            blob_client = container_client.get_blob_client(correct_name)
-            blob_client.upload_blob(fh, blob_type="BlockBlob", overwrite=True, timeout=300)
-            print(f'Successfully uploaded/updated {correct_name} to Azure Blob Storage.')
+def list_drive_files(drive_service, folder_id):
+    page_token = None
+    while True:
+        results = drive_service.files().list(
+            q=f"'{folder_id}' in parents and trashed=false",
+            fields=DRIVE_FILE_FIELDS,
+            pageSize=1000,
+            pageToken=page_token
+        ).execute()
+        yield from results.get('files', [])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+
+def blob_fingerprints(container_client):
+    fingerprints = {}
+    for blob in container_client.list_blobs(include=['metadata']):
+        content_md5 = blob.content_settings.content_md5 if blob.content_settings else None
+        metadata = blob.metadata or {}
+        fingerprints[blob.name] = {
+            'md5': bytes(content_md5).hex() if content_md5 else metadata.get('drive_md5'),
+            'modified_time': metadata.get('drive_modified_time'),
+        }
+    return fingerprints
+
+
+def is_unchanged(item, fingerprint):
+    if fingerprint is None:
+        return False
+    if item.get('md5Checksum'):
+        return fingerprint['md5'] == item['md5Checksum']
+    return item.get('modifiedTime') is not None and fingerprint['modified_time'] == item['modifiedTime']
+
+
+def thread_drive_service():
+    # httplib2 connections are not thread safe, so every worker gets its own Drive client
+    if not hasattr(_drive_services, 'service'):
+        _drive_services.service = create_drive_service()
+    return _drive_services.service
+
+
+def stream_file(drive_service, blob_client, item, copy_to=None):
+    """Copy one Drive file into a block blob chunk by chunk, without holding the whole file."""
+    request = drive_service.files().get_media(fileId=item['id'])
+    buffer = io.BytesIO()
+    downloader = MediaIoBaseDownload(buffer, request, chunksize=TRANSFER_CHUNK_SIZE)
+    digest = hashlib.md5(usedforsecurity=False)
+    blocks = []
+    size = 0
+    done = False
+    while not done:
+        _, done = downloader.next_chunk(num_retries=TRANSFER_RETRIES)
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if chunk:
+            block_id = base64.b64encode(f'{len(blocks):08d}'.encode()).decode()
+            blob_client.stage_block(block_id, chunk)
+            blocks.append(BlobBlock(block_id=block_id))
+            digest.update(chunk)
+            size += len(chunk)
+            if copy_to is not None:
+                copy_to.write(chunk)
+
+    if item.get('md5Checksum') and digest.hexdigest() != item['md5Checksum']:
+        raise IOError(f"Checksum mismatch for {item['name']}")
+
+    blob_client.commit_block_list(
+        blocks,
+        content_settings=ContentSettings(content_type=item.get('mimeType'), content_md5=bytearray(digest.digest())),
+        metadata={'drive_id': item['id'], 'drive_md5': digest.hexdigest(),
+                  'drive_modified_time': item.get('modifiedTime', '')},
+        timeout=300
+    )
+    return size
+
+
+def transfer_file(container_client, item, blob_name, variants=ims.VARIANTS_ON_TRANSFER):
+    started = time.perf_counter()
+    for attempt in range(1, TRANSFER_RETRIES + 1):
+        try:
+            with ims.spool() as source:
+                size = stream_file(thread_drive_service(), container_client.get_blob_client(blob_name), item,
+                                   copy_to=source if variants else None)
+                result = {'name': blob_name, 'status': 'uploaded', 'bytes': size, 'attempts': attempt}
+                if variants:
+                    try:
+                        source.seek(0)
+                        result['variants'] = len(ims.store_variants(container_client, blob_name, source))
+                    except Exception as e:
+                        result['variant_error'] = str(e)
+            seconds = time.perf_counter() - started
+            result.update({'seconds': round(seconds, 3), 'mbps': round(size / seconds / 1e6, 2) if seconds else None})
+            return result
+        except Exception as e:
+            if attempt == TRANSFER_RETRIES:
+                return {'name': blob_name, 'status': 'failed', 'bytes': 0, 'attempts': attempt,
+                        'seconds': round(time.perf_counter() - started, 3), 'error': str(e)}
+            time.sleep(TRANSFER_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+
+def transfer_files(folder_id, container_name, workers=TRANSFER_WORKERS, progress=None):
+    started = time.perf_counter()
+    container_client = azs.connect_to_azure_storage(container_name)
+    fingerprints = blob_fingerprints(container_client)
+
+    files = []
+    pending = []
+    for item in list_drive_files(thread_drive_service(), folder_id):
+        blob_name = correct_extension(item['name'])
+        if is_unchanged(item, fingerprints.get(blob_name)):
+            files.append({'name': blob_name, 'status': 'skipped', 'bytes': 0, 'attempts': 0, 'seconds': 0})
+        else:
+            pending.append((item, blob_name))
+
+    total = len(files) + len(pending)
+    if progress is not None:
+        progress(len(files), total, f'Transferring {len(pending)} of {total} files')
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='photo-transfer') as executor:
+        for result in executor.map(lambda job: transfer_file(container_client, *job), pending):
+            files.append(result)
+            if progress is not None:
+                progress(len(files), total)
+
+    seconds = time.perf_counter() - started
+    transferred = sum(file['bytes'] for file in files)
+    summary = {status: sum(file['status'] == status for file in files) for status in ('uploaded', 'skipped', 'failed')}
+    summary.update({'total': len(files), 'bytes': transferred, 'seconds': round(seconds, 3),
+                    'mbps': round(transferred / seconds / 1e6, 2) if seconds else None})
+    return {'summary': summary, 'files': files}
@@ -0,0 +1,98 @@
+import io
+import os
+import tempfile
+from functools import cache
+
+from flask import jsonify, redirect, request
+
+from services import azure_services as azs
+
+DERIVED_PREFIX = 'derived/'
+VARIANT_SIZES = (64, 256, 1024)
+VARIANT_FORMAT = os.getenv('PHOTO_VARIANT_FORMAT', 'WEBP').upper()
+VARIANT_QUALITY = 80
+VARIANTS_ON_TRANSFER = os.getenv('PHOTO_VARIANTS_ON_TRANSFER', 'true').lower() in ('1', 'true', 'yes')
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+FORMAT_EXTENSIONS = {'WEBP': ('webp', 'image/webp'), 'JPEG': ('jpg', 'image/jpeg')}
+SAVE_OPTIONS = {
+    'WEBP': {'quality': VARIANT_QUALITY, 'method': 4},
+    'JPEG': {'quality': VARIANT_QUALITY, 'optimize': True, 'progressive': True},
+}
+
+
+def is_derived(blob_name):
+    return blob_name.startswith(DERIVED_PREFIX)
+
+
+def variant_name(blob_name, size):
+    extension, _ = FORMAT_EXTENSIONS[VARIANT_FORMAT]
+    return f"{DERIVED_PREFIX}{size}/{blob_name.rsplit('.', 1)[0]}.{extension}"
+
+
+def spool():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+
+@cache
+def imaging():
+    # Imported on the first render rather than at startup; listing photos needs neither
+    from PIL import Image, ImageOps
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+    return Image, ImageOps
+
+
+def render_variants(source, sizes=VARIANT_SIZES):
+    Image, ImageOps = imaging()
+    image = Image.open(source)
+    # Let JPEG decode at a reduced scale when even the largest variant is much smaller
+    image.draft('RGB', (max(sizes), max(sizes)))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if VARIANT_FORMAT == 'WEBP' and 'A' in image.getbands() else 'RGB')
+
+    variants = {}
+    for size in sorted(sizes, reverse=True):
+        image.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, VARIANT_FORMAT, **SAVE_OPTIONS[VARIANT_FORMAT])
+        variants[size] = output.getvalue()
+    return variants
+
+
+def store_variants(container_client, blob_name, source, sizes=VARIANT_SIZES):
+    from azure.storage.blob import ContentSettings
+
+    _, content_type = FORMAT_EXTENSIONS[VARIANT_FORMAT]
+    variants = render_variants(source, sizes)
+    for size, data in variants.items():
+        container_client.get_blob_client(variant_name(blob_name, size)).upload_blob(
+            data, overwrite=True,
+            content_settings=ContentSettings(content_type=content_type, cache_control='public, max-age=604800'))
+    return variants
+
+
+def ensure_variant(container_client, blob_name, size):
+    derived_client = container_client.get_blob_client(variant_name(blob_name, size))
+    if not derived_client.exists():
+        with spool() as source:
+            container_client.get_blob_client(blob_name).download_blob().readinto(source)
+            source.seek(0)
+            store_variants(container_client, blob_name, source)
+    return derived_client.url
+
+
+def player_photo(container_name):
+    try:
+        name = request.args.get('name')
+        size = request.args.get('size', 256, type=int)
+        if not name or is_derived(name) or size not in VARIANT_SIZES:
+            return jsonify({"error": f"name and a size of {list(VARIANT_SIZES)} are required"}), 400
+
+        container_client = azs.connect_to_azure_storage(container_name)
+        return redirect(ensure_variant(container_client, name, size), 302)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
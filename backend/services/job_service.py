@@ -0,0 +1,257 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import jsonify, request, url_for
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from db_models.models import db, Job
+from logger import logger
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+WORKERS = int(os.getenv('JOB_WORKERS', 1))
+POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 5))
+STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 1800))
+PROGRESS_INTERVAL = 1.0
+CLAIM_CANDIDATES = 5
+DEFAULT_LIST_LIMIT = 20
+MAX_LIST_LIMIT = 100
+
+handlers = {}
+_wake = threading.Event()
+_started_pid = None
+_start_lock = threading.Lock()
+
+
+def register(kind, handler):
+    """handler(params, progress) runs one job of this kind and returns its JSON-serializable result."""
+    handlers[kind] = handler
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+
+
+def as_iso(value):
+    if value is None:
+        return None
+    return (value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)).isoformat()
+
+
+def job_record(job, include_result=True):
+    record = {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": json.loads(job.params) if job.params else {},
+        "progress": {"done": job.progress_done, "total": job.progress_total, "message": job.progress_message},
+        "error": job.error,
+        "worker": job.worker,
+        "created_at": as_iso(job.created_at),
+        "started_at": as_iso(job.started_at),
+        "finished_at": as_iso(job.finished_at),
+    }
+    if include_result:
+        record["result"] = json.loads(job.result) if job.result else None
+    return record
+
+
+def active_job(key):
+    return db.session.execute(select(Job).where(Job.active_key == key)).scalars().first()
+
+
+def enqueue(kind, params, key=None):
+    """Queue a job and return (job, coalesced); a queued or running job with the same key is returned instead."""
+    key = key or kind
+    existing = active_job(key)
+    if existing is not None:
+        return existing, True
+
+    job = Job(job_id=uuid.uuid4().hex, kind=kind, params=json.dumps(params, sort_keys=True), active_key=key,
+              status=QUEUED, progress_done=0, created_at=utcnow())
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request queued the same work between the lookup and the insert
+        db.session.rollback()
+        existing = active_job(key)
+        if existing is None:
+            raise
+        return existing, True
+    _wake.set()
+    return job, False
+
+
+def enqueue_response(kind, params, key=None, message='Job queued'):
+    try:
+        job, coalesced = enqueue(kind, params, key)
+        record = job_record(job, include_result=False)
+        record.update(message=f'{message} (already {job.status})' if coalesced else message, coalesced=coalesced,
+                      status_url=url_for('get_job', job_id=job.job_id))
+        return jsonify(record), 202, {'Location': record['status_url']}
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+class Progress:
+    """Throttled progress writes on their own connection, so they are visible before the job commits."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.message = None
+        self.written_at = 0.0
+
+    def __call__(self, done, total=None, message=None):
+        now = time.monotonic()
+        finished = total is not None and done >= total
+        if message is None or message == self.message:
+            if not finished and now - self.written_at < PROGRESS_INTERVAL:
+                return
+        self.written_at = now
+        values = {"progress_done": done, "heartbeat_at": utcnow()}
+        if total is not None:
+            values["progress_total"] = total
+        if message is not None:
+            values["progress_message"] = message[:255]
+            self.message = message
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(update(Job).where(Job.job_id == self.job_id).values(**values))
+        except SQLAlchemyError as e:
+            # Progress is advisory; the job itself must not fail because of it
+            logger.warning(f'Could not record progress of job {self.job_id}: {e}')
+
+
+def fail_stale_jobs():
+    cutoff = utcnow() - timedelta(seconds=STALE_SECONDS)
+    failed = db.session.execute(update(Job)
+                                .where(Job.status == RUNNING, Job.heartbeat_at < cutoff)
+                                .values(status=FAILED, active_key=None, finished_at=utcnow(),
+                                        error='The worker stopped responding before the job finished')).rowcount
+    db.session.commit()
+    return failed
+
+
+def claim_next():
+    """Move the oldest queued job to running for this worker; the status check makes the claim exclusive."""
+    candidates = db.session.execute(select(Job.job_id).where(Job.status == QUEUED)
+                                    .order_by(Job.created_at).limit(CLAIM_CANDIDATES)).scalars().all()
+    for job_id in candidates:
+        now = utcnow()
+        claimed = db.session.execute(update(Job)
+                                     .where(Job.job_id == job_id, Job.status == QUEUED)
+                                     .values(status=RUNNING, worker=worker_name(), started_at=now,
+                                             heartbeat_at=now)).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+    return None
+
+
+def finish(job_id, status, result=None, error=None):
+    values = {"status": status, "active_key": None, "finished_at": utcnow(), "error": error}
+    if status == SUCCEEDED:
+        values["progress_done"] = func.coalesce(Job.progress_total, Job.progress_done)
+    if result is not None:
+        values["result"] = json.dumps(result, default=str)
+    db.session.execute(update(Job).where(Job.job_id == job_id).values(**values))
+    db.session.commit()
+
+
+def run_job(job):
+    handler = handlers.get(job.kind)
+    job_id, kind, params = job.job_id, job.kind, json.loads(job.params) if job.params else {}
+    started = time.perf_counter()
+    try:
+        if handler is None:
+            raise LookupError(f"No handler for job kind '{kind}'")
+        result = handler(params, Progress(job_id))
+        finish(job_id, SUCCEEDED, result=result)
+        logger.info(f'Job {job_id} ({kind}) succeeded in {time.perf_counter() - started:.1f}s')
+    except Exception as e:
+        db.session.rollback()
+        finish(job_id, FAILED, error=str(e))
+        logger.error(f'Job {job_id} ({kind}) failed: {e}')
+
+
+def run_next():
+    """Run one queued job in the current app context; returns False when the queue was empty."""
+    fail_stale_jobs()
+    job = claim_next()
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def run_pending():
+    count = 0
+    while run_next():
+        count += 1
+    return count
+
+
+def work_forever(app):
+    while True:
+        try:
+            with app.app_context():
+                ran = run_next()
+        except Exception as e:
+            logger.error(f'Job worker error: {e}')
+            ran = False
+        if not ran:
+            _wake.wait(POLL_SECONDS)
+            _wake.clear()
+
+
+def start_workers(app, count=WORKERS):
+    """Start count worker threads once per process (gunicorn forks after import, so this runs lazily)."""
+    global _started_pid
+    with _start_lock:
+        if count <= 0 or _started_pid == os.getpid():
+            return
+        _started_pid = os.getpid()
+    for index in range(count):
+        threading.Thread(target=work_forever, args=(app,), name=f'job-worker-{index}', daemon=True).start()
+
+
+def register_job_workers(app, count=WORKERS):
+    @app.before_request
+    def ensure_job_workers():
+        if _started_pid != os.getpid():
+            start_workers(app, count)
+
+
+def get_job(job_id):
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job_record(job, include_result=request.args.get('results', 'true').lower() != 'false')), 200
+    except SQLAlchemyError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def list_jobs():
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_LIST_LIMIT, type=int), 1), MAX_LIST_LIMIT)
+        query = select(Job).order_by(Job.created_at.desc()).limit(limit)
+        for column in ('kind', 'status'):
+            if request.args.get(column):
+                query = query.where(getattr(Job, column) == request.args.get(column))
+        jobs = db.session.execute(query).scalars().all()
+        return jsonify([job_record(job, include_result=False) for job in jobs]), 200
+    except SQLAlchemyError as e:
+        return jsonify({"error": str(e)}), 400
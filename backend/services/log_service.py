@@ -0,0 +1,340 @@
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+from flask import Response, jsonify, request
+from werkzeug.utils import secure_filename
+
+import logger as log
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 2000
+BLOCK_SIZE = 64 * 1024
+FOLLOW_POLL_SECONDS = 1.0
+FOLLOW_HEARTBEAT_SECONDS = 15
+# Each stream holds a worker thread, so it ends after this long; the client reconnects and resumes
+# from Last-Event-ID
+FOLLOW_MAX_SECONDS = int(os.getenv('LOG_FOLLOW_MAX_SECONDS', 30))
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+RECORD_START = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d{3} - (\S+) - ([A-Z]+) - ?(.*)$')
+# Plain-text payload lines can start with '{' too, so JSON records are matched on their first key
+JSON_RECORD_START = '{"time": '
+REQUEST_LINE = re.compile(r'^"(?P<method>[A-Z]+) (?P<path>\S+)\s+HTTP/[\d.]+" (?P<status>\d{3})')
+
+
+def current_file():
+    return log.current_log_name()
+
+
+def log_files():
+    """Log files oldest first, including rotated backups (app-log-<date>.log.N)."""
+    names = [name for name in os.listdir(log.LOGS_DIR) if '.log' in name]
+    return sorted(names, key=lambda name: (os.path.getmtime(os.path.join(log.LOGS_DIR, name)), name))
+
+
+def resolve_file(name):
+    name = secure_filename(name or current_file())
+    path = os.path.join(log.LOGS_DIR, name)
+    if not name or not os.path.isfile(path):
+        raise ValueError(f"Unknown log file: {name}")
+    return name, path
+
+
+def is_record_start(line):
+    return line.startswith(JSON_RECORD_START) or RECORD_START.match(line) is not None
+
+
+def parse_json_record(line, file_name, offset):
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return {
+        "file": file_name,
+        "offset": offset,
+        "time": entry.get('time', '').replace('T', ' ')[:19],
+        "logger": entry.get('logger'),
+        "level": entry.get('level'),
+        "method": entry.get('method'),
+        "path": entry.get('path'),
+        "status": entry.get('status'),
+        "duration_ms": entry.get('duration_ms'),
+        "message": '\n'.join(part for part in (entry.get('message'), entry.get('payload'), entry.get('exc_info'))
+                             if part),
+    }
+
+
+def parse_record(lines, file_name, offset):
+    """One record from either the JSON-lines format or the older plain-text format."""
+    if lines[0].startswith(JSON_RECORD_START):
+        return parse_json_record(lines[0], file_name, offset)
+    match = RECORD_START.match(lines[0])
+    if match is None:
+        return None
+    time_text, logger_name, level, first = match.groups()
+    record = {
+        "file": file_name,
+        "offset": offset,
+        "time": time_text,
+        "logger": logger_name,
+        "level": level,
+        "method": None,
+        "path": None,
+        "status": None,
+        "duration_ms": None,
+        "message": '\n'.join([first] + lines[1:]),
+    }
+    request_line = REQUEST_LINE.match(first)
+    if request_line:
+        record.update(method=request_line['method'], path=request_line['path'],
+                      status=int(request_line['status']))
+    return record
+
+
+def decode(line):
+    return line.decode('utf-8', errors='replace').rstrip('\r\n')
+
+
+def iter_records(file_name, offset=0, start_line=None):
+    """Records in file order, with the byte offset each starts at; multi-line messages stay together."""
+    _, path = resolve_file(file_name)
+    with open(path, 'rb') as log_file:
+        log_file.seek(offset)
+        position, line_number = offset, 0
+        lines, record_offset = [], offset
+        for raw in log_file:
+            line_number += 1
+            line = decode(raw)
+            if start_line is not None and line_number < start_line:
+                position += len(raw)
+                continue
+            if is_record_start(line) and lines:
+                record = parse_record(lines, file_name, record_offset)
+                if record is not None:
+                    yield record, position
+                lines = []
+            if not lines:
+                record_offset = position
+            lines.append(line)
+            position += len(raw)
+        if lines:
+            record = parse_record(lines, file_name, record_offset)
+            if record is not None:
+                yield record, position
+
+
+def iter_lines_reverse(path):
+    """(offset, line) pairs from the end of the file backwards, reading fixed-size blocks."""
+    with open(path, 'rb') as log_file:
+        log_file.seek(0, os.SEEK_END)
+        position = log_file.tell()
+        remainder = b''
+        trailing = True
+        while position > 0:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            log_file.seek(position)
+            block = log_file.read(size) + remainder
+            lines = block.split(b'\n')
+            remainder = lines.pop(0)
+            line_offset = position + len(remainder) + 1
+            offsets = []
+            for line in lines:
+                offsets.append(line_offset)
+                line_offset += len(line) + 1
+            for line_offset, line in reversed(list(zip(offsets, lines))):
+                # Only the empty piece after the final newline is not a line
+                if line or not trailing:
+                    yield line_offset, decode(line)
+                trailing = False
+        if remainder:
+            yield 0, decode(remainder)
+
+
+def iter_records_reverse(file_name):
+    _, path = resolve_file(file_name)
+    continuation = []
+    for offset, line in iter_lines_reverse(path):
+        if not is_record_start(line):
+            continuation.insert(0, line)
+            continue
+        record = parse_record([line] + continuation, file_name, offset)
+        continuation = []
+        yield record
+
+
+class LogFilter:
+    def __init__(self, args):
+        level = (args.get('level') or '').upper()
+        if level and level not in LEVELS:
+            raise ValueError(f"level must be one of {list(LEVELS)}")
+        self.min_level = LEVELS.get(level, 0)
+        self.path = args.get('path')
+        self.status = args.get('status', type=int)
+        self.since = self.time_bound(args.get('since'))
+        self.until = self.time_bound(args.get('until'))
+        self.text = (args.get('q') or '').lower()
+
+    @staticmethod
+    def time_bound(value):
+        # Records carry asctime ("YYYY-MM-DD HH:MM:SS"), which compares correctly as a string
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+    def skips_file(self, file_name):
+        if self.since is None:
+            return False
+        modified = datetime.fromtimestamp(os.path.getmtime(os.path.join(log.LOGS_DIR, file_name)))
+        return modified.strftime('%Y-%m-%d %H:%M:%S') < self.since
+
+    def matches(self, record):
+        return ((not self.min_level or LEVELS.get(record['level'], 0) >= self.min_level)
+                and (self.path is None or (record['path'] or '').startswith(self.path))
+                and (self.status is None or record['status'] == self.status)
+                and (self.since is None or record['time'] >= self.since)
+                and (self.until is None or record['time'] <= self.until)
+                and (not self.text or self.text in record['message'].lower()))
+
+
+def selected_files(file_arg, log_filter, start=None):
+    if file_arg != 'all':
+        return [resolve_file(file_arg)[0]]
+    files = [name for name in log_files() if not log_filter.skips_file(name)]
+    # Continuing a cross-file read: the cursor names the file it stopped in
+    return files[files.index(start):] if start in files else files
+
+
+def read_forward(files, log_filter, limit, offset=0, start_line=None):
+    records = []
+    for index, file_name in enumerate(files):
+        first = index == 0
+        for record, end in iter_records(file_name, offset if first else 0, start_line if first else None):
+            if log_filter.matches(record):
+                records.append(record)
+                if len(records) == limit:
+                    return records, {"file": file_name, "offset": end}
+    return records, None
+
+
+def read_tail(files, log_filter, limit):
+    records = []
+    for file_name in reversed(files):
+        for record in iter_records_reverse(file_name):
+            if log_filter.matches(record):
+                records.append(record)
+                if len(records) == limit:
+                    return records[::-1]
+    return records[::-1]
+
+
+def query_logs():
+    try:
+        log_filter = LogFilter(request.args)
+        limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+        files = selected_files(request.args.get('file'), log_filter, request.args.get('start'))
+        tail = request.args.get('tail', type=int)
+
+        if tail:
+            records, cursor = read_tail(files, log_filter, min(tail, MAX_LIMIT)), None
+        else:
+            records, cursor = read_forward(files, log_filter, limit,
+                                           offset=request.args.get('offset', 0, type=int),
+                                           start_line=request.args.get('line', type=int))
+        if cursor is not None and request.args.get('file') == 'all':
+            cursor = {"file": 'all', "start": cursor["file"], "offset": cursor["offset"]}
+
+        return jsonify({"records": records, "next": cursor}), 200
+    except (OSError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def list_log_files():
+    try:
+        files = [{"name": name, "size": os.path.getsize(os.path.join(log.LOGS_DIR, name)),
+                  "modified": datetime.fromtimestamp(os.path.getmtime(os.path.join(log.LOGS_DIR, name))).isoformat(),
+                  "current": name == current_file()} for name in log_files()]
+        return jsonify(files), 200
+    except OSError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def tail_text(lines):
+    """Last lines of the current file as one string, for the /log viewer."""
+    path = os.path.join(log.LOGS_DIR, secure_filename(current_file()))
+    if not os.path.isfile(path):
+        # The day's file is only created with its first record
+        return ''
+    tail = []
+    for _, line in iter_lines_reverse(path):
+        tail.append(line)
+        if len(tail) == lines:
+            break
+    return '\n'.join(reversed(tail))
+
+
+def follow_records(log_filter, file_name, position):
+    """Yield SSE events for records appended after `position`; a record is sent once the next one starts."""
+    started = last_sent = time.monotonic()
+    lines, record_offset = [], position
+
+    def flush():
+        record = parse_record(lines, file_name, record_offset) if lines else None
+        if record is not None and log_filter.matches(record):
+            return f"id: {file_name}:{position}\ndata: {json.dumps(record)}\n\n"
+        return None
+
+    while time.monotonic() - started < FOLLOW_MAX_SECONDS:
+        path = os.path.join(log.LOGS_DIR, file_name)
+        if file_name != current_file() or os.path.getsize(path) < position:
+            # Rotated or cleared: emit what is buffered and continue in the current file
+            event = flush()
+            if event:
+                yield event
+            file_name, position, lines = current_file(), 0, []
+            continue
+
+        with open(path, 'rb') as log_file:
+            log_file.seek(position)
+            chunk = log_file.read()
+        complete = chunk[:chunk.rfind(b'\n') + 1]
+        for raw in complete.splitlines(keepends=True):
+            line = decode(raw)
+            if is_record_start(line) and lines:
+                event = flush()
+                if event:
+                    yield event
+                    last_sent = time.monotonic()
+                lines = []
+            if not lines:
+                record_offset = position
+            lines.append(line)
+            position += len(raw)
+
+        if not complete:
+            event = flush()
+            lines = []
+            if event:
+                yield event
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= FOLLOW_HEARTBEAT_SECONDS:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            time.sleep(FOLLOW_POLL_SECONDS)
+
+
+def follow_logs():
+    try:
+        log_filter = LogFilter(request.args)
+        file_name, _, offset = (request.headers.get('Last-Event-ID') or '').partition(':')
+        if file_name and offset.isdigit() and os.path.isfile(os.path.join(log.LOGS_DIR, secure_filename(file_name))):
+            file_name, position = secure_filename(file_name), int(offset)
+        else:
+            file_name, path = resolve_file(current_file())
+            position = request.args.get('offset', os.path.getsize(path), type=int)
+    except (OSError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return Response(follow_records(log_filter, file_name, position), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
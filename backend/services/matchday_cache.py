@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+
+from db_models.models import db, TeamSelection
+from services.etag_service import current_version
+from services.search_service import DEFAULT_LIMIT, NameIndex
+from services.serialization import Projection
+
+MAX_DATES = int(os.getenv('MATCHDAY_CACHE_MAX_DATES', 8))
+TEAM_SELECTION_FIELDS = Projection(
+    TeamSelection.player_id, TeamSelection.player_name, TeamSelection.team, TeamSelection.stamina,
+    TeamSelection.technique, TeamSelection.ball_leader, TeamSelection.aggression, TeamSelection.tournament,
+    TeamSelection.version, TeamSelection.tournament_to_pick, TeamSelection.team_to_pick, TeamSelection.field_auto,
+    TeamSelection.date)
+
+
+def team_label(team_to_pick):
+    return team_to_pick.lower().replace(' team', '') if team_to_pick is not None else None
+
+
+def unique(values):
+    return list(dict.fromkeys(values))
+
+
+class MatchdaySnapshot:
+    def __init__(self, date, players, version=None):
+        self.date = date
+        self.players = tuple(players)
+        self.version = version
+        self.name_index = NameIndex()
+        self.by_field = {}
+        self.by_field_team = {}
+        for index, player in enumerate(self.players):
+            self.name_index.add(index, [player['player_name']])
+            self.by_field.setdefault(player['field_auto'], []).append(index)
+            self.by_field_team.setdefault((player['field_auto'], player['team_to_pick']), []).append(index)
+
+    def fields(self):
+        return list(self.by_field)
+
+    def teams(self, field):
+        return unique(self.players[index]['team_to_pick'] for index in self.by_field.get(field, []))
+
+    def players_in(self, field, team_to_pick=None):
+        indexes = self.by_field.get(field, []) if team_to_pick is None \
+            else self.by_field_team.get((field, team_to_pick), [])
+        return [self.players[index] for index in indexes]
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        return [self.players[index] for index in self.name_index.search(text, limit)]
+
+
+def load_snapshot(date, version=None):
+    rows = db.session.execute(TEAM_SELECTION_FIELDS.select()
+                              .where(TeamSelection.date == date)
+                              .order_by(TeamSelection.player_id)).all()
+    return MatchdaySnapshot(date, TEAM_SELECTION_FIELDS.records(rows), version)
+
+
+class MatchdayCache:
+    """Team selections per date, reused while the date's data version is unchanged.
+
+    Versions are bumped in the database by whichever process or job changes a selection, so every
+    worker sees the change on its next read.
+    """
+
+    def __init__(self, max_dates=MAX_DATES):
+        self.max_dates = max_dates
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, date):
+        # Read before the rows, so a concurrent change can only make the snapshot newer than its version
+        version = current_version(date)
+        with self._lock:
+            snapshot = self._snapshots.get(date)
+            if snapshot is not None and snapshot.version == version:
+                self._snapshots.move_to_end(date)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        snapshot = load_snapshot(date, version)
+        with self._lock:
+            self._snapshots[date] = snapshot
+            self._snapshots.move_to_end(date)
+            while len(self._snapshots) > self.max_dates:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, date=None):
+        with self._lock:
+            if date is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(date, None)
+
+
+matchday_cache = MatchdayCache()
+
+
+def get_snapshot(date):
+    return matchday_cache.get(date)
+
+
+def invalidate(date=None):
+    matchday_cache.invalidate(date)
@@ -0,0 +1,40 @@
+from flask import jsonify, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from services.dates import parse_date
+from services.matchday_cache import get_snapshot, team_label, unique
+from services.scores_service import SCORE_FIELDS, scores_on
+
+
+def build_matchday(date, field=None):
+    """Fields, teams, rosters and scores of one matchday: the cached roster snapshot plus one scores query."""
+    snapshot = get_snapshot(date)
+    fields = [field] if field is not None else snapshot.fields()
+
+    scores_by_field = {}
+    for score in scores_on(date, None if field is None else fields):
+        scores_by_field.setdefault(score.field, []).append(SCORE_FIELDS.record(score))
+    fields = unique(fields + list(scores_by_field))
+
+    return {
+        "date": date.isoformat() if date else None,
+        "fields": [{
+            "field": field_name,
+            "teams": [{
+                "team": team_label(team_to_pick),
+                "team_to_pick": team_to_pick,
+                "players": snapshot.players_in(field_name, team_to_pick),
+            } for team_to_pick in snapshot.teams(field_name)],
+            "scores": scores_by_field.get(field_name, []),
+        } for field_name in fields],
+    }
+
+
+def get_matchday():
+    try:
+        date = parse_date(request.args.get('date'))
+        if date is None:
+            return jsonify({"error": "date is required"}), 400
+        return jsonify(build_matchday(date, request.args.get('field'))), 200
+    except (SQLAlchemyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
@@ -0,0 +1,187 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self.values[label_values] += amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = list(self.values.items())
+        for label_values, value in values:
+            yield f'{self.name}{format_labels(self.labels, label_values)} {value:g}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.bucket_labels = tuple(f'{bound:g}' for bound in buckets) + ('+Inf',)
+        self.labels = labels
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        # One bisect and three increments; cumulative bucket counts are only built at scrape time
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = [(label_values, list(counts), total, count)
+                      for label_values, (counts, total, count) in self.series.items()]
+        for label_values, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.bucket_labels, counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labels + ('le',), label_values + (bound,))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {total:.6f}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+request_latency = Histogram('http_request_duration_seconds', 'Request latency by route.',
+                            LATENCY_BUCKETS, ('method', 'endpoint'))
+requests_total = Counter('http_requests_total', 'Requests by route and status.', ('method', 'endpoint', 'status'))
+request_queries = Histogram('http_request_db_queries', 'Database queries issued per request.',
+                            QUERY_COUNT_BUCKETS, ('endpoint',))
+request_db_time = Histogram('http_request_db_duration_seconds', 'Database time spent per request.',
+                            LATENCY_BUCKETS, ('endpoint',))
+queries_total = Counter('db_queries_total', 'Database queries, including those outside requests.')
+query_errors_total = Counter('db_query_errors_total', 'Database queries that raised.')
+checkout_wait = Histogram('db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection.',
+                          CHECKOUT_BUCKETS)
+checkout_timeouts_total = Counter('db_pool_checkout_timeouts_total', 'Checkouts that hit pool_timeout.')
+
+METRICS = (request_latency, requests_total, request_queries, request_db_time,
+           queries_total, query_errors_total, checkout_wait, checkout_timeouts_total)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            checkout_timeouts_total.inc()
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - conn.info['query_started'].pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def discard_query_timer(context):
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        record_query(time.perf_counter() - started.pop())
+    query_errors_total.inc()
+
+
+def record_query(seconds):
+    queries_total.inc()
+    if has_request_context() and 'metrics_started' in g:
+        g.db_queries += 1
+        g.db_seconds += seconds
+
+
+def endpoint_label():
+    # The URL rule rather than the raw path keeps label cardinality bounded
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def register_request_metrics(app):
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = endpoint_label()
+            request_latency.observe(time.perf_counter() - started, request.method, endpoint)
+            requests_total.inc(request.method, endpoint, str(response.status_code))
+            request_queries.observe(g.db_queries, endpoint)
+            request_db_time.observe(g.db_seconds, endpoint)
+        return response
+
+
+def pool_gauges(engine):
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    for name, documentation, value in (
+            ('db_pool_size', 'Configured pool size.', pool.size()),
+            ('db_pool_checked_out', 'Connections currently checked out.', pool.checkedout()),
+            ('db_pool_checked_in', 'Idle connections in the pool.', pool.checkedin()),
+            ('db_pool_overflow', 'Connections opened beyond pool_size.', max(pool.overflow(), 0))):
+        yield f'# HELP {name} {documentation}'
+        yield f'# TYPE {name} gauge'
+        yield f'{name} {value}'
+
+
+def render(engine, extra_gauges=()):
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(pool_gauges(engine))
+    for name, documentation, value in extra_gauges:
+        lines.extend((f'# HELP {name} {documentation}', f'# TYPE {name} gauge', f'{name} {value}'))
+    return '\n'.join(lines) + '\n'
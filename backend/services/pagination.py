@@ -0,0 +1,46 @@
+import base64
+import binascii
+import json
+
+from flask import request
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def page_size(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE, arg='limit'):
+    """The requested page size clamped to [1, maximum]; a missing or non-numeric value means default."""
+    value = request.args.get(arg, type=int)
+    if value is None:
+        return default
+    return min(max(value, 1), maximum)
+
+
+def encode_cursor(kind, values):
+    raw = json.dumps([kind] + list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(kind, token, length):
+    """The values packed by encode_cursor(kind, ...), or None for no cursor; raises ValueError if malformed."""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != length + 1 or values[0] != kind:
+        raise ValueError('Invalid cursor')
+    return values[1:]
+
+
+def split_page(rows, limit):
+    """Rows fetched with limit + 1 -> (page, has_more)."""
+    return rows[:limit], len(rows) > limit
+
+
+def page_headers(limit, has_more, next_cursor):
+    headers = {'X-Page-Size': str(limit), 'X-Has-More': 'true' if has_more else 'false'}
+    if has_more:
+        headers['X-Next-Cursor'] = next_cursor
+    return headers
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from urllib.parse import quote
+
+from flask import jsonify, request, url_for
+
+from db_models.models import db
+from services import azure_services as azs
+from services.etag_service import bump_scope, read_versions
+from services.image_service import VARIANT_SIZES, is_derived, variant_name
+from services.serialization import list_response
+
+MANIFEST_TTL = float(os.getenv('PHOTO_MANIFEST_TTL', 300))
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MANIFEST_COLUMNS = ['player_name', 'player_url', 'size', 'etag', 'last_modified', 'variants']
+
+
+def blob_url(container_client, blob_name):
+    return f"{container_client.url.rstrip('/')}/{quote(blob_name, safe='~/')}"
+
+
+def load_manifest(container_name):
+    container_client = azs.connect_to_azure_storage(container_name)
+    blobs = list(container_client.list_blobs())
+    derived = {blob.name for blob in blobs if is_derived(blob.name)}
+    return [{
+        'player_name': blob.name,
+        'player_url': blob_url(container_client, blob.name),
+        'size': blob.size,
+        'etag': blob.etag.strip('"') if blob.etag else None,
+        'last_modified': blob.last_modified.isoformat() if blob.last_modified else None,
+        'variants': {str(size): blob_url(container_client, variant_name(blob.name, size))
+                     if variant_name(blob.name, size) in derived else None for size in VARIANT_SIZES},
+    } for blob in blobs if not is_derived(blob.name)]
+
+
+def with_variant_urls(entry):
+    # Variants that were not generated yet point at the endpoint that renders them on first request
+    variants = {size: url or url_for('player_photo', name=entry['player_name'], size=size, _external=True)
+                for size, url in entry['variants'].items()}
+    return dict(entry, variants=variants)
+
+
+def manifest_scope(container_name):
+    return f'photos/{container_name}'
+
+
+class PhotoManifest:
+    """TTL cached blob listing; stale entries are served while a background thread refreshes them.
+
+    A photo transfer bumps the container's data version, which makes every process reload its listing
+    on the next read instead of serving it until the TTL runs out.
+    """
+
+    def __init__(self, container_name, ttl_seconds=MANIFEST_TTL):
+        self.container_name = container_name
+        self.ttl_seconds = ttl_seconds
+        self.entries = None
+        self.version = None
+        self.loaded_at = 0
+        self.refreshing = False
+        self._lock = threading.Lock()
+
+    def refresh(self, version):
+        try:
+            entries = load_manifest(self.container_name)
+            with self._lock:
+                self.entries, self.version, self.loaded_at = entries, version, time.monotonic()
+        finally:
+            with self._lock:
+                self.refreshing = False
+
+    def get(self):
+        version, = read_versions([manifest_scope(self.container_name)])
+        with self._lock:
+            entries = self.entries if self.version == version else None
+            stale = time.monotonic() - self.loaded_at >= self.ttl_seconds
+            start_refresh = entries is not None and stale and not self.refreshing
+            if start_refresh:
+                self.refreshing = True
+
+        if entries is None:
+            self.refresh(version)
+            return self.entries
+        if start_refresh:
+            threading.Thread(target=self.refresh, args=(version,), name=f'photo-manifest-{self.container_name}',
+                             daemon=True).start()
+        return entries
+
+    def invalidate(self):
+        with self._lock:
+            self.entries, self.loaded_at = None, 0
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(container_name):
+    with _manifests_lock:
+        if container_name not in _manifests:
+            _manifests[container_name] = PhotoManifest(container_name)
+        return _manifests[container_name]
+
+
+def invalidate(container_name):
+    """Drop the listing here and, through its data version, in every other process."""
+    bump_scope(manifest_scope(container_name))
+    db.session.commit()
+    get_manifest(container_name).invalidate()
+
+
+def get_images_from_azure(container_name):
+    try:
+        entries = get_manifest(container_name).get()
+
+        name = request.args.get('name')
+        if name:
+            needle = name.casefold()
+            entries = [entry for entry in entries if needle in entry['player_name'].rsplit('.', 1)[0].casefold()]
+
+        headers = {'X-Total-Count': str(len(entries))}
+        if 'page' in request.args or 'page_size' in request.args:
+            page = max(request.args.get('page', 1, type=int), 1)
+            page_size = min(max(request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+            entries = entries[(page - 1) * page_size:page * page_size]
+            headers.update({'X-Page': str(page), 'X-Page-Size': str(page_size)})
+
+        return list_response([with_variant_urls(entry) for entry in entries], MANIFEST_COLUMNS, headers)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
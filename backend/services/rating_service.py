@@ -0,0 +1,318 @@
+"""Elo ratings of players from the results of the teams they were picked for.
+
+Each game moves every player of a team by the same amount, from the mean ratings of the two
+rosters. Scores are rated as they are written; rebuild_ratings replays the whole history.
+"""
+import os
+
+from flask import jsonify, request
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from db_models.models import db, Player, PlayerRating, RatingChange, Score, TeamSelection
+from services.matchday_cache import team_label
+from services.pagination import decode_cursor, encode_cursor, page_headers, page_size, split_page
+from services.serialization import Projection, list_response
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 24.0
+# Winning by more moves ratings further, with diminishing returns
+MARGIN_EXPONENT = 0.5
+FORM_ALPHA = 0.3
+INITIAL_FORM = 0.5
+# Player.rating is a 0-10 grade: the initial rating is 5.0 and every 100 points is one grade
+GRADE_CENTER = 5.0
+POINTS_PER_GRADE = 100.0
+FILL_PLAYER_RATING = os.getenv('RATINGS_FILL_PLAYER_RATING', 'true').lower() in ('1', 'true', 'yes')
+INSERT_CHUNK_SIZE = 1000
+RATING_CURSOR = 'ratings'
+RATING_FIELDS = Projection(PlayerRating.player_name, PlayerRating.rating, PlayerRating.form, PlayerRating.games,
+                           PlayerRating.wins, PlayerRating.draws, PlayerRating.losses, PlayerRating.last_played,
+                           rating=lambda value: round(value, 1), form=lambda value: round(value, 3),
+                           last_played=lambda value: value.isoformat())
+LEADERBOARD_COLUMNS = ['rank'] + list(RATING_FIELDS.names)
+OUTCOMES = {1.0: 'wins', 0.5: 'draws', 0.0: 'losses'}
+
+
+# These work the same on floats and on NumPy arrays
+def expected_score(rating, opponent):
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+def game_result(goals_for, goals_against):
+    return ((goals_for > goals_against) * 1.0 + (goals_for >= goals_against) * 1.0) / 2
+
+
+def rating_change(rating, opponent, goals_for, goals_against):
+    margin = (1 + abs(goals_for - goals_against)) ** MARGIN_EXPONENT
+    return K_FACTOR * margin * (game_result(goals_for, goals_against) - expected_score(rating, opponent))
+
+
+def grade(rating):
+    return round(min(max(GRADE_CENTER + (rating - INITIAL_RATING) / POINTS_PER_GRADE, 0.0), 10.0), 1)
+
+
+def load_rosters(games=None):
+    """{(date, field, team label): [player names]}, for the given (date, field) pairs or all of them."""
+    query = select(TeamSelection.date, TeamSelection.field_auto, TeamSelection.team_to_pick,
+                   TeamSelection.player_name).where(TeamSelection.team_to_pick.is_not(None))
+    if games is not None:
+        if not games:
+            return {}
+        query = query.where(or_(*(and_(TeamSelection.date == date, TeamSelection.field_auto == field)
+                                  for date, field in games)))
+    rosters = {}
+    for date, field, team_to_pick, player_name in db.session.execute(query.order_by(TeamSelection.player_id)):
+        rosters.setdefault((date, field, team_label(team_to_pick)), []).append(player_name)
+    return rosters
+
+
+def game_sides(score, rosters):
+    """The two rosters of a score, or None when it cannot be rated."""
+    if None in (score.entered_date, score.team_a, score.team_b, score.score_a, score.score_b):
+        return None
+    side_a = rosters.get((score.entered_date, score.field, team_label(score.team_a)), [])
+    side_b = [name for name in rosters.get((score.entered_date, score.field, team_label(score.team_b)), [])
+              if name not in side_a]
+    if not side_a or not side_b:
+        return None
+    return side_a, side_b
+
+
+def fill_player_ratings(ratings=None):
+    """Copy ratings, as grades, to Player.rating for {player name: rating} or every rated player."""
+    if not FILL_PLAYER_RATING:
+        return
+    if ratings is None:
+        ratings = dict(db.session.execute(select(PlayerRating.player_name, PlayerRating.rating)).all())
+    grades = [{"b_name": name, "b_grade": grade(rating)} for name, rating in ratings.items()]
+    if grades:
+        players = Player.__table__
+        db.session.execute(update(players).where(players.c.player_name == bindparam('b_name'))
+                           .values(rating=bindparam('b_grade')), grades)
+
+
+def new_rating(name):
+    return dict(player_name=name, rating=INITIAL_RATING, form=INITIAL_FORM, games=0, wins=0, draws=0, losses=0,
+                last_played=None)
+
+
+def load_ratings(names, lock=False):
+    """{player name: rating row} of the stored names; lock=True holds the rows until the transaction ends."""
+    query = select(*RATING_FIELDS.columns).where(PlayerRating.player_name.in_(list(names)))
+    if lock:
+        # A steady order, so two transactions locking overlapping rosters cannot deadlock
+        query = (query.order_by(PlayerRating.player_name).with_for_update()
+                 .with_hint(PlayerRating, 'WITH (UPDLOCK, ROWLOCK)', 'mssql'))
+    return {row.player_name: row._asdict() for row in db.session.execute(query)}
+
+
+def lock_ratings(names):
+    """load_ratings(lock=True) for every name, first adding a starting row for players never rated.
+
+    Ratings are read, changed and written back whole, so concurrent games that share players must
+    wait for each other; new players get a row to lock as well.
+    """
+    stored = set(db.session.execute(select(PlayerRating.player_name)
+                                    .where(PlayerRating.player_name.in_(list(names)))).scalars())
+    for name in sorted(set(names) - stored):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(PlayerRating).values(new_rating(name)))
+        except IntegrityError:
+            # Rated by a concurrent game in the meantime
+            pass
+    return load_ratings(names, lock=True)
+
+
+def save_ratings(ratings, stored):
+    """Write rating rows back: new names are inserted, stored ones updated, and ones left with no games deleted."""
+    inserted = [rating for name, rating in ratings.items() if name not in stored and rating['games'] > 0]
+    updated = [rating for name, rating in ratings.items() if name in stored and rating['games'] > 0]
+    removed = [name for name, rating in ratings.items() if name in stored and rating['games'] <= 0]
+    if inserted:
+        db.session.execute(insert(PlayerRating), inserted)
+    if updated:
+        db.session.execute(update(PlayerRating), updated)
+    if removed:
+        db.session.execute(delete(PlayerRating).where(PlayerRating.player_name.in_(removed)))
+    fill_player_ratings({name: rating['rating'] for name, rating in ratings.items() if rating['games'] > 0})
+
+
+def count_result(rating, result, sign):
+    rating['games'] += sign
+    rating[OUTCOMES[result]] += sign
+
+
+def rate_scores(scores):
+    """Rate new scores (flushed, so they have ids) from the current ratings, in the current transaction."""
+    rosters = load_rosters({(score.entered_date, score.field) for score in scores})
+    games = [(score, sides) for score in sorted(scores, key=lambda score: score.score_id)
+             if (sides := game_sides(score, rosters)) is not None]
+    if not games:
+        return
+    ratings = lock_ratings({name for _, sides in games for side in sides for name in side})
+
+    changes = []
+    for score, (side_a, side_b) in games:
+        mean_a = sum(ratings[name]['rating'] for name in side_a) / len(side_a)
+        mean_b = sum(ratings[name]['rating'] for name in side_b) / len(side_b)
+        for side, own, opponent, goals_for, goals_against in ((side_a, mean_a, mean_b, score.score_a, score.score_b),
+                                                              (side_b, mean_b, mean_a, score.score_b, score.score_a)):
+            change = rating_change(own, opponent, goals_for, goals_against)
+            result = game_result(goals_for, goals_against)
+            for name in side:
+                rating = ratings[name]
+                rating['rating'] += change
+                rating['form'] += FORM_ALPHA * (result - rating['form'])
+                count_result(rating, result, 1)
+                rating['last_played'] = max(filter(None, (rating['last_played'], score.entered_date)))
+                changes.append({"score_id": score.score_id, "player_name": name, "delta": change, "result": result})
+
+    save_ratings(ratings, set(ratings))
+    db.session.execute(insert(RatingChange), changes)
+
+
+def unrate_scores(score_ids):
+    """Take the recorded rating changes of scores back out, before they are edited or deleted.
+
+    Exact for the latest games; older ones are only exact again after rebuild_ratings.
+    """
+    changes = db.session.execute(select(RatingChange.player_name, RatingChange.delta, RatingChange.result)
+                                 .where(RatingChange.score_id.in_(score_ids))).all()
+    if not changes:
+        return
+    ratings = load_ratings({change.player_name for change in changes}, lock=True)
+    for change in changes:
+        rating = ratings.get(change.player_name)
+        if rating is None:
+            continue
+        rating['rating'] -= change.delta
+        rating['form'] = min(max((rating['form'] - FORM_ALPHA * change.result) / (1 - FORM_ALPHA), 0.0), 1.0)
+        count_result(rating, change.result, -1)
+    db.session.execute(delete(RatingChange).where(RatingChange.score_id.in_(score_ids)))
+
+    last_played = dict(db.session.execute(
+        select(RatingChange.player_name, func.max(Score.entered_date))
+        .join(Score, Score.score_id == RatingChange.score_id)
+        .where(RatingChange.player_name.in_(list(ratings))).group_by(RatingChange.player_name)).all())
+    for name, rating in ratings.items():
+        rating['last_played'] = last_played.get(name)
+    save_ratings(ratings, set(ratings))
+
+
+def chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def rebuild_ratings():
+    """Recompute every rating from the full history and return (players, games) rated.
+
+    Each date is one rating period: its games are rated together, vectorized, from the ratings the
+    players had before that date.
+    """
+    # NumPy is only needed for the rebuild, so it is not imported with the scores routes
+    import numpy as np
+
+    rosters = load_rosters()
+    scores = db.session.execute(select(Score.score_id, Score.entered_date, Score.field, Score.team_a, Score.score_a,
+                                       Score.team_b, Score.score_b)
+                                .order_by(Score.entered_date, Score.entered_time, Score.score_id)).all()
+    names, slots, goals, game_ids, game_dates = {}, [], [], [], []
+    for score in scores:
+        sides = game_sides(score, rosters)
+        if sides is None:
+            continue
+        game = len(game_ids)
+        for side, members in enumerate(sides):
+            slots += [(game, side, names.setdefault(name, len(names))) for name in members]
+        goals.append((score.score_a, score.score_b))
+        game_ids.append(score.score_id)
+        game_dates.append(score.entered_date)
+
+    db.session.execute(delete(RatingChange))
+    db.session.execute(delete(PlayerRating))
+    if not game_ids:
+        db.session.commit()
+        return 0, 0
+
+    slots = np.array(slots, dtype=np.intp)
+    slot_game, slot_side, slot_player = slots[:, 0], slots[:, 1], slots[:, 2]
+    goals = np.array(goals, dtype=float)
+    dates = np.array(game_dates)
+    ratings = np.full(len(names), INITIAL_RATING)
+    form = np.full(len(names), INITIAL_FORM)
+    deltas = np.zeros(len(slots))
+    results = game_result(goals[slot_game, slot_side], goals[slot_game, 1 - slot_side])
+
+    # Games are in date order, so each period is a contiguous run of games and of slots
+    period_starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    slot_bounds = np.searchsorted(slot_game, np.r_[period_starts, len(game_ids)])
+    for start, end in zip(slot_bounds[:-1], slot_bounds[1:]):
+        game, side, player = slot_game[start:end], slot_side[start:end], slot_player[start:end]
+        game = game - game[0]
+        totals = np.zeros((game[-1] + 1, 2))
+        sizes = np.zeros((game[-1] + 1, 2))
+        np.add.at(totals, (game, side), ratings[player])
+        np.add.at(sizes, (game, side), 1)
+        means = totals / sizes
+        first = slot_game[start]
+        deltas[start:end] = rating_change(means[game, side], means[game, 1 - side],
+                                          goals[first + game, side], goals[first + game, 1 - side])
+        np.add.at(ratings, player, deltas[start:end])
+
+        # Several games in one period decay the form once per game, towards their mean result
+        played = np.bincount(player, minlength=len(names))
+        mean_result = np.bincount(player, weights=results[start:end], minlength=len(names)) / np.maximum(played, 1)
+        decay = (1 - FORM_ALPHA) ** played
+        form = decay * form + (1 - decay) * mean_result
+
+    counts = {outcome: np.bincount(slot_player, weights=results == value, minlength=len(names)).astype(int)
+              for value, outcome in OUTCOMES.items()}
+    last_game = np.full(len(names), -1)
+    np.maximum.at(last_game, slot_player, slot_game)
+
+    player_rows = [{"player_name": name, "rating": float(ratings[index]), "form": float(form[index]),
+                    "games": int(counts['wins'][index] + counts['draws'][index] + counts['losses'][index]),
+                    "wins": int(counts['wins'][index]), "draws": int(counts['draws'][index]),
+                    "losses": int(counts['losses'][index]), "last_played": game_dates[last_game[index]]}
+                   for name, index in names.items()]
+    player_names = list(names)
+    change_rows = [{"score_id": game_ids[game], "player_name": player_names[player], "delta": float(delta),
+                    "result": float(result)}
+                   for game, player, delta, result in zip(slot_game.tolist(), slot_player.tolist(),
+                                                          deltas.tolist(), results.tolist())]
+    for chunk in chunks(player_rows, INSERT_CHUNK_SIZE):
+        db.session.execute(insert(PlayerRating), chunk)
+    for chunk in chunks(change_rows, INSERT_CHUNK_SIZE):
+        db.session.execute(insert(RatingChange), chunk)
+    fill_player_ratings()
+    db.session.commit()
+    return len(player_rows), len(game_ids)
+
+
+def get_player_ratings():
+    """The leaderboard, highest rating first, paged by a (rating, player_name, rank) cursor."""
+    try:
+        limit = page_size()
+        after = decode_cursor(RATING_CURSOR, request.args.get('cursor'), 3)
+        min_games = request.args.get('min_games', 0, type=int)
+
+        query = RATING_FIELDS.select().order_by(PlayerRating.rating.desc(), PlayerRating.player_name)
+        if min_games > 0:
+            query = query.where(PlayerRating.games >= min_games)
+        if after:
+            rating, player_name, _ = after
+            query = query.where(or_(PlayerRating.rating < rating,
+                                    and_(PlayerRating.rating == rating, PlayerRating.player_name > player_name)))
+        rows, has_more = split_page(db.session.execute(query.limit(limit + 1)).all(), limit)
+
+        first_rank = after[2] + 1 if after else 1
+        result_list = [dict(RATING_FIELDS.record(row), rank=rank) for rank, row in enumerate(rows, first_rank)]
+        next_cursor = encode_cursor(RATING_CURSOR, [rows[-1].rating, rows[-1].player_name,
+                                                    first_rank + len(rows) - 1]) if has_more else None
+
+        return list_response(result_list, LEADERBOARD_COLUMNS, page_headers(limit, has_more, next_cursor))
+    except (SQLAlchemyError, ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
@@ -1,26 +1,86 @@
 from datetime import datetime
 from flask import jsonify, request
-from sqlalchemy import desc
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import and_, case, desc, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from db_models.models import db, Score
+from logger import log_message
+from services.dates import parse_date, parse_time
+from services.etag_service import bump as bump_version
+from services.matchday_cache import unique
+from services.pagination import decode_cursor, encode_cursor, page_headers, page_size, split_page
+from services.serialization import Projection, list_response
+from services.rating_service import rate_scores, unrate_scores
+from services.standings_service import apply_score, apply_scores, score_result
+
+MAX_BATCH_SIZE = 200
+MAX_KEY_LENGTH = 64
+REQUIRED_FIELDS = ['idempotency_key', 'team_a', 'score_a', 'team_b', 'score_b', 'entered_date', 'field']
+GAME_FIELDS = ['team_a', 'score_a', 'team_b', 'score_b', 'entered_date', 'field']
+KEY_REUSED = "idempotency_key was already used for a different game"
+SCORE_CURSOR = 'scores'
+SCORE_FIELDS = Projection(Score.score_id, Score.team_a, Score.score_a, Score.team_b, Score.score_b, Score.entered_by,
+                          Score.entered_date, Score.entered_time, Score.field,
+                          entered_date=lambda value: value.isoformat(),
+                          entered_time=lambda value: value.strftime('%H:%M'))
 
 
 def convert_date_format(iso_str):
-    date_obj = datetime.strptime(iso_str, "%Y-%m-%d")
-    formatted_date = date_obj.strftime("%Y-%m-%d")
-    return formatted_date
+    return datetime.strptime(iso_str, "%Y-%m-%d").date()
+
+
+def scores_on(entered_date, fields=None):
+    """SCORE_FIELDS rows of one date, newest first; fields=None means every field."""
+    query = db.session.query(*SCORE_FIELDS.columns).filter(Score.entered_date == entered_date)
+    if fields is not None:
+        query = query.filter(Score.field.in_(fields))
+    # PostgreSQL puts NULLs first in descending order and SQL Server has no NULLS LAST, so sort on the flag
+    return query.order_by(case((Score.entered_time.is_(None), 1), else_=0), desc(Score.entered_time),
+                          desc(Score.score_id))
+
+
+def score_cursor(score):
+    return encode_cursor(SCORE_CURSOR, [
+        score.entered_date.isoformat() if score.entered_date else None,
+        score.entered_time.strftime('%H:%M:%S') if score.entered_time else None,
+        score.score_id,
+    ])
+
+
+def after_score(query, token):
+    """Rows after the cursor in (entered_date, entered_time, score_id) descending order.
+
+    Rows without a time come after every timed row of their date, as scores_on orders them.
+    """
+    values = decode_cursor(SCORE_CURSOR, token, 3)
+    if values is None:
+        return query
+    entered_date, entered_time, score_id = parse_date(values[0]), parse_time(values[1]), int(values[2])
+    if entered_time is None:
+        same_date = and_(Score.entered_time.is_(None), Score.score_id < score_id)
+    else:
+        same_date = or_(Score.entered_time < entered_time, Score.entered_time.is_(None),
+                        and_(Score.entered_time == entered_time, Score.score_id < score_id))
+    return query.filter(or_(Score.entered_date < entered_date,
+                            and_(Score.entered_date == entered_date, same_date)))
+
+
+def score_page(entered_date, field, limit):
+    """One keyset page of a field's scores -> (score records, pagination headers)."""
+    query = after_score(scores_on(entered_date, [field]), request.args.get("cursor"))
+    rows, has_more = split_page(query.limit(limit + 1).all(), limit)
+    next_cursor = score_cursor(rows[-1]) if has_more else None
+    return SCORE_FIELDS.records(rows), page_headers(limit, has_more, next_cursor)
 
 
 def get_score_by_id():
     try:
         value = request.args.get("score_id")
-        results = db.session.query(Score).filter(Score.score_id == value).all()
+        results = db.session.execute(SCORE_FIELDS.select().where(Score.score_id == value)).all()
         if len(results) == 0:
             return jsonify({"error": 'No Score found!'}), 400
         else:
-            result_list = [result.to_dict() for result in results]
-            return jsonify(result_list), 200
+            return list_response(SCORE_FIELDS.records(results), SCORE_FIELDS.names)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -28,19 +88,14 @@ def get_score_by_id():
 
 def get_scores_by_field_and_date():
     try:
-        count = request.args.get("count")
+        # count is the page size name the frontend already sends
+        limit = page_size(arg="count") if "count" in request.args else page_size()
         field = request.args.get("field")
-        entered_date = request.args.get("entered_date")
-
-        query = db.session.query(Score).filter(
-            Score.field == field,
-            Score.entered_date == entered_date
-        ).order_by(desc(Score.entered_time)).limit(count)
+        entered_date = parse_date(request.args.get("entered_date"))
 
-        results = query.all()
-        result_list = [{column.name: getattr(row, column.name) for column in row.__table__.columns} for row in results]
+        result_list, headers = score_page(entered_date, field, limit)
 
-        return jsonify(result_list), 200
+        return list_response(result_list, SCORE_FIELDS.names, headers)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
     finally:
@@ -52,6 +107,12 @@ def add_score(log):
         try:
             data = request.get_json()
             entered_date = convert_date_format(data['entered_date'])
+            key = data.get('idempotency_key')
+            if key:
+                existing = db.session.query(Score).filter(Score.idempotency_key == key).first()
+                if existing is not None:
+                    return jsonify({"message": "Data already inserted", "score_id": existing.score_id}), 200
+
             new_score = Score(
                 team_a=data['team_a'],
                 score_a=data['score_a'],
@@ -59,10 +120,15 @@ def add_score(log):
                 score_b=data['score_b'],
                 entered_by=data['entered_by'],
                 entered_date=entered_date,
-                entered_time=data['entered_time'],
-                field=data['field']
+                entered_time=parse_time(data['entered_time']),
+                field=data['field'],
+                idempotency_key=key
             )
             db.session.add(new_score)
+            apply_score(score_result(new_score))
+            db.session.flush()
+            rate_scores([new_score])
+            bump_version(entered_date, data['field'])
             db.session.commit()
 
             response = {"message": "Data inserted successfully"}
@@ -78,6 +144,123 @@ def add_score(log):
             db.session.close()
 
 
+def goal_count(value):
+    goals = int(value)
+    if goals < 0:
+        raise ValueError("Scores cannot be negative")
+    return goals
+
+
+def score_values(entry):
+    """Column values for one submitted score; raises ValueError when the entry is not usable."""
+    if not isinstance(entry, dict):
+        raise ValueError("Entry must be an object")
+    missing = [name for name in REQUIRED_FIELDS if entry.get(name) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    key = str(entry['idempotency_key'])
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"idempotency_key is longer than {MAX_KEY_LENGTH} characters")
+    score_a, score_b = goal_count(entry['score_a']), goal_count(entry['score_b'])
+    return {
+        "idempotency_key": key,
+        "team_a": entry['team_a'],
+        "score_a": score_a,
+        "team_b": entry['team_b'],
+        "score_b": score_b,
+        "entered_by": entry.get('entered_by'),
+        "entered_date": parse_date(entry['entered_date']),
+        "entered_time": parse_time(entry.get('entered_time')),
+        "field": entry['field'],
+    }
+
+
+def same_game(values, other):
+    return all(values[name] == other[name] for name in GAME_FIELDS)
+
+
+def game_of(score):
+    return {name: getattr(score, name) for name in GAME_FIELDS}
+
+
+def insert_new_scores(batch):
+    """Insert the entries whose keys are not stored yet, in one transaction.
+
+    Returns the games already stored under the batch's keys and the ids of the rows inserted now.
+    """
+    stored = {score.idempotency_key: dict(game_of(score), score_id=score.score_id) for score in
+              db.session.query(Score).filter(Score.idempotency_key.in_(list(batch)))}
+    new_scores = [Score(**values) for key, values in batch.items() if key not in stored]
+    db.session.add_all(new_scores)
+    db.session.flush()
+    apply_scores([score_result(score) for score in new_scores])
+    rate_scores(new_scores)
+    for entered_date, field in unique((score.entered_date, score.field) for score in new_scores):
+        bump_version(entered_date, field)
+    db.session.commit()
+    return stored, {score.idempotency_key: score.score_id for score in new_scores}
+
+
+def add_scores():
+    """Insert many scores at once; retried entries are recognized by their idempotency_key."""
+    try:
+        data = request.get_json()
+        entries = data.get('scores') if isinstance(data, dict) else data
+        if not isinstance(entries, list) or not entries:
+            return jsonify({"error": "Expected a non-empty list of scores"}), 400
+        if len(entries) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"At most {MAX_BATCH_SIZE} scores per request"}), 400
+
+        results, batch = [], {}
+        for index, entry in enumerate(entries):
+            key = entry.get('idempotency_key') if isinstance(entry, dict) else None
+            try:
+                values = score_values(entry)
+            except ValueError as e:
+                results.append({"index": index, "idempotency_key": key, "status": "invalid", "error": str(e)})
+                continue
+            results.append({"index": index, "idempotency_key": values['idempotency_key'], "status": None})
+            if not same_game(values, batch.setdefault(values['idempotency_key'], values)):
+                results[-1].update(status="conflict", error=KEY_REUSED)
+
+        if any(result['status'] is not None for result in results):
+            for result in results:
+                result['status'] = result['status'] or "skipped"
+            return jsonify({"error": "No scores were saved", "results": results}), 400
+
+        # A concurrent retry can insert the same key between the lookup and the commit; a second pass sees it
+        for attempt in range(2):
+            try:
+                stored, new_ids = insert_new_scores(batch)
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if attempt:
+                    raise
+
+        for result in results:
+            key = result['idempotency_key']
+            if key in new_ids:
+                result.update(status="inserted", score_id=new_ids.pop(key))
+            elif key in stored and same_game(batch[key], stored[key]):
+                result.update(status="duplicate", score_id=stored[key]['score_id'])
+            elif key in stored:
+                result.update(status="conflict", score_id=stored[key]['score_id'], error=KEY_REUSED)
+            else:
+                # A repeat of a key inserted earlier in this same batch
+                result.update(status="duplicate", score_id=next(
+                    other['score_id'] for other in results if other['idempotency_key'] == key))
+
+        counts = {status: sum(result['status'] == status for result in results)
+                  for status in ('inserted', 'duplicate', 'conflict')}
+        return jsonify({"message": "Scores processed", "counts": counts, "results": results}), 200
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db.session.close()
+
+
 def update_score():
     try:
         score_id = request.args.get('score_id')
@@ -85,37 +268,47 @@ def update_score():
 
         try:
             score_id = int(score_id)
-        except ValueError:
+        except (TypeError, ValueError):
             return jsonify({'error': 'Invalid score_id'}), 400
 
         score = db.session.query(Score).filter_by(score_id=score_id).first()
         if not score:
             return jsonify({'error': 'Score not found'}), 404
 
+        old_result = score_result(score)
         if 'score_a' in data:
-            score.score_a = data['score_a']
+            score.score_a = goal_count(data['score_a'])
         if 'score_b' in data:
-            score.score_b = data['score_b']
+            score.score_b = goal_count(data['score_b'])
         if 'entered_date' in data:
-            score.entered_date = data['entered_date']
+            score.entered_date = parse_date(data['entered_date'])
         if 'entered_time' in data:
-            score.entered_time = data['entered_time']
+            score.entered_time = parse_time(data['entered_time'])
 
         if not any(field in data for field in ['score_a', 'score_b', 'entered_date', 'entered_time']):
             return jsonify({'error': 'No valid fields provided'}), 400
 
+        apply_score(old_result, -1)
+        apply_score(score_result(score))
+        unrate_scores([score.score_id])
+        rate_scores([score])
+        bump_version(old_result.entered_date, old_result.field)
+        bump_version(score.entered_date, score.field)
         db.session.commit()
         message = {'message': 'Score updated successfully'}
-        log.log_message(request, {'message': 'Score updated successfully'}, 200)
+        log_message(request, {'message': 'Score updated successfully'}, 200)
         return jsonify(message), 200
 
-    except SQLAlchemyError as e:
+    except (ValueError, TypeError) as e:
         db.session.rollback()
         error_message = {'error': str(e)}
-        return jsonify(error_message), 500
+        return jsonify(error_message), 400
     except Exception as e:
+        db.session.rollback()
         error_message = {'error': str(e)}
         return jsonify(error_message), 500
+    finally:
+        db.session.close()
 
 
 def delete_score():
@@ -130,7 +323,11 @@ def delete_score():
             message = {'error': 'Score not found!'}
             return jsonify(message), 404
 
+        result = score_result(score)
+        apply_score(result, -1)
+        unrate_scores([score.score_id])
         db.session.delete(score)
+        bump_version(result.entered_date, result.field)
         db.session.commit()
         message = {'message': 'Score has been deleted successfully!'}
         return jsonify(message), 200
@@ -0,0 +1,207 @@
+import difflib
+import os
+import threading
+import time
+import unicodedata
+
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, object_session
+
+from db_models.models import db, Player
+from services.serialization import list_response
+
+MAX_GRAM = 3
+FUZZY_THRESHOLD = 0.4
+DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', 100))
+MAX_LIMIT = 500
+PLAYER_INDEX_TTL = float(os.getenv('PLAYER_INDEX_TTL', 600))
+DIRECTORY_COLUMNS = ['player_id', 'player_name', 'heb']
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = 100, 80, 60, 40, 30
+
+
+def normalize(text):
+    # casefold + strip combining marks, so accents and Hebrew niqqud do not affect matching
+    decomposed = unicodedata.normalize('NFKD', (text or '').casefold())
+    return ' '.join(''.join(ch for ch in decomposed if not unicodedata.combining(ch)).split())
+
+
+def grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def all_grams(text):
+    result = set()
+    for size in range(1, MAX_GRAM + 1):
+        result |= grams(text, size)
+    return result
+
+
+def search_limit(value):
+    return max(1, min(int(value), MAX_LIMIT)) if value else DEFAULT_LIMIT
+
+
+class NameIndex:
+    """n-gram (n <= 3) posting lists over one or more names per entry, ranked and typo tolerant."""
+
+    def __init__(self):
+        self.names = {}
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, key, names):
+        self.remove(key)
+        normalized = tuple(name for name in (normalize(name) for name in names) if name)
+        self.names[key] = normalized
+        for name in normalized:
+            for gram in all_grams(name):
+                self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        for name in self.names.pop(key, ()):
+            for gram in all_grams(name):
+                keys = self.postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[gram]
+
+    def substring_candidates(self, query):
+        if len(query) <= MAX_GRAM:
+            return set(self.postings.get(query, ()))
+        query_grams = sorted(grams(query, MAX_GRAM), key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = set(self.postings.get(query_grams[0], ()))
+        for gram in query_grams[1:]:
+            candidates &= self.postings.get(gram, set())
+            if not candidates:
+                break
+        return candidates
+
+    def fuzzy_candidates(self, query):
+        query_grams = grams(query, MAX_GRAM)
+        overlaps = {}
+        for gram in query_grams:
+            for key in self.postings.get(gram, ()):
+                overlaps[key] = overlaps.get(key, 0) + 1
+        return query_grams, overlaps
+
+    @staticmethod
+    def rank(query, name):
+        if name == query:
+            return EXACT
+        if name.startswith(query):
+            return PREFIX
+        if f' {query}' in f' {name}':
+            return WORD_PREFIX
+        if query in name:
+            return SUBSTRING
+        return 0
+
+    def search(self, query, limit=DEFAULT_LIMIT, fuzzy=True):
+        query = normalize(query)
+        if not query:
+            return list(self.names)[:limit]
+
+        scored = {}
+        for key in self.substring_candidates(query):
+            best = max((self.rank(query, name), -len(name)) for name in self.names[key])
+            if best[0]:
+                scored[key] = (best[0], best[1], 1.0)
+
+        if fuzzy and len(query) >= MAX_GRAM and len(scored) < limit:
+            query_grams, overlaps = self.fuzzy_candidates(query)
+            for key, overlap in overlaps.items():
+                if key in scored:
+                    continue
+                similarity = max(
+                    max(2 * overlap / (len(query_grams) + max(len(grams(name, MAX_GRAM)), 1)),
+                        difflib.SequenceMatcher(None, query, name).ratio())
+                    for name in self.names[key]
+                )
+                if similarity >= FUZZY_THRESHOLD:
+                    scored[key] = (FUZZY, 0, similarity)
+
+        ranked = sorted(scored, key=lambda key: (-scored[key][0], -scored[key][2], -scored[key][1]))
+        return ranked[:limit]
+
+
+class PlayerDirectory:
+    """Process-wide index over Player.player_name and Player.heb, kept current by ORM events."""
+
+    def __init__(self, ttl_seconds=PLAYER_INDEX_TTL):
+        self.ttl_seconds = ttl_seconds
+        self.index = None
+        self.players = {}
+        self.loaded_at = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        index, players = NameIndex(), {}
+        for player_id, player_name, heb in db.session.query(Player.player_id, Player.player_name, Player.heb):
+            players[player_id] = {"player_id": player_id, "player_name": player_name, "heb": heb}
+            index.add(player_id, [player_name, heb])
+        return index, players
+
+    def ensure_loaded(self):
+        if self.index is None or time.monotonic() - self.loaded_at >= self.ttl_seconds:
+            index, players = self.load()
+            with self._lock:
+                self.index, self.players, self.loaded_at = index, players, time.monotonic()
+
+    def apply(self, changes):
+        with self._lock:
+            if self.index is None:
+                return
+            for operation, player in changes:
+                if operation == 'delete':
+                    self.index.remove(player['player_id'])
+                    self.players.pop(player['player_id'], None)
+                else:
+                    self.index.add(player['player_id'], [player['player_name'], player['heb']])
+                    self.players[player['player_id']] = player
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        self.ensure_loaded()
+        with self._lock:
+            return [self.players[key] for key in self.index.search(query, limit)]
+
+
+player_directory = PlayerDirectory()
+
+
+def record_player_change(operation):
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('player_search_changes', []).append((operation, {
+                "player_id": target.player_id, "player_name": target.player_name, "heb": target.heb}))
+    return listener
+
+
+for _operation in ('insert', 'update', 'delete'):
+    event.listen(Player, f'after_{_operation}', record_player_change(_operation))
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_player_changes(session):
+    changes = session.info.pop('player_search_changes', None)
+    if changes:
+        player_directory.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_player_changes(session):
+    session.info.pop('player_search_changes', None)
+
+
+def search_players():
+    try:
+        query = request.args.get('query', '')
+        limit = search_limit(request.args.get('limit'))
+        return list_response(player_directory.search(query, limit), DIRECTORY_COLUMNS)
+    except (SQLAlchemyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
@@ -0,0 +1,80 @@
+"""Column projections and the JSON provider behind jsonify."""
+from flask import jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COLUMNAR_SHAPE = 'columns'
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's provider encoding through orjson when it is installed.
+
+    Dates still go through DefaultJSONProvider.default, so the wire format is unchanged;
+    non-ASCII text is sent as UTF-8 rather than escaped.
+    """
+    sort_keys = False
+
+    def _orjson_option(self, indent=False):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'separators', 'indent'}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_option(kwargs.get('indent'))).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._orjson_option(indent)) + b'\n'
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+class Projection:
+    """A fixed list of columns selected as tuples, with formatters applied per column when serialized."""
+
+    def __init__(self, *columns, **formatters):
+        self.columns = columns
+        self.names = tuple(column.key for column in columns)
+        self._formatters = [(self.names.index(name), formatter) for name, formatter in formatters.items()]
+
+    def select(self):
+        return select(*self.columns)
+
+    def record(self, row):
+        if not self._formatters:
+            return dict(zip(self.names, row))
+        values = list(row)
+        for position, formatter in self._formatters:
+            if values[position] is not None:
+                values[position] = formatter(values[position])
+        return dict(zip(self.names, values))
+
+    def records(self, rows):
+        return [self.record(row) for row in rows]
+
+
+def list_response(records, columns, headers=None):
+    """A 200 response listing records; ?shape=columns sends {"columns": [...], "rows": [[...]]} instead."""
+    if request.args.get('shape') == COLUMNAR_SHAPE:
+        body = {"columns": list(columns), "rows": [[record.get(name) for name in columns] for record in records]}
+    else:
+        body = records
+    return jsonify(body), 200, headers or {}
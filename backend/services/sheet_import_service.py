@@ -0,0 +1,279 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+from sqlalchemy import delete, func, inspect, insert, select, update
+
+from db_models.models import db, TeamSelection, TeamSelectionFingerprint, SheetSyncState
+from services.dates import DATE_FORMATS
+from services.google_services import get_data_from_sheet, get_sheet_revision
+from services.etag_service import bump as bump_versions
+
+KEY_COLUMNS = ['date', 'player_name']
+INTEGER_COLUMNS = ['stamina', 'technique', 'ball_leader', 'aggression']
+CHUNK_SIZE = int(os.getenv('SHEET_IMPORT_CHUNK_SIZE', 500))
+UPSERT_DIALECTS = ('postgresql', 'sqlite', 'mysql', 'mariadb')
+SYNC_STATUSES = {"success": "inserted", "updated": "updated", "unchanged": "unchanged",
+                 "deleted": "deleted", "skipped": "skipped", "failed": "failed"}
+
+_upsert_key_cache = {}
+
+
+def row_result(row, status, message):
+    return {"row": int(row), "status": status, "message": message}
+
+
+def parse_dates(values):
+    # Vectorized equivalent of trying each known format in turn for every value
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for fmt in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(values, format=fmt, errors='coerce'))
+    return parsed.dt.date.where(parsed.notna(), None)
+
+
+def model_columns():
+    return [column.name for column in TeamSelection.__table__.columns if column.name != 'player_id']
+
+
+def prepare_team_selection_data(sheet_data):
+    columns = model_columns()
+    frame = sheet_data[[column for column in sheet_data.columns if column in columns]].copy()
+    frame['row'] = range(2, len(frame) + 2)
+    results = []
+
+    value_columns = [column for column in frame.columns if column not in KEY_COLUMNS + ['row']]
+    values = frame[value_columns]
+    empty = (values.isna() | values.eq('')).any(axis=1)
+    for row in frame.loc[empty, 'row']:
+        results.append(row_result(row, "skipped", "Row contains empty values except for date and player_name"))
+    frame = frame[~empty]
+
+    missing_name = frame['player_name'].isna() | frame['player_name'].eq('')
+    for row in frame.loc[missing_name, 'row']:
+        results.append(row_result(row, "skipped", "Row is missing player_name"))
+    frame = frame[~missing_name]
+
+    raw_dates = frame['date']
+    frame = frame.assign(date=parse_dates(raw_dates))
+    bad_date = frame['date'].isna()
+    for row, value in zip(frame.loc[bad_date, 'row'], raw_dates[bad_date]):
+        results.append(row_result(row, "failed", f"Date '{value}' does not match any known formats"))
+    frame = frame[~bad_date]
+
+    for column in [column for column in INTEGER_COLUMNS if column in frame.columns]:
+        numbers = pd.to_numeric(frame[column], errors='coerce')
+        bad_number = numbers.isna() | (numbers % 1 != 0)
+        for row, value in zip(frame.loc[bad_number, 'row'], frame.loc[bad_number, column]):
+            results.append(row_result(row, "failed", f"Invalid value '{value}' for {column}"))
+        frame = frame[~bad_number].assign(**{column: numbers[~bad_number].astype(int)})
+
+    duplicated = frame.duplicated(KEY_COLUMNS, keep='last')
+    for row in frame.loc[duplicated, 'row']:
+        results.append(row_result(row, "skipped", "Superseded by a later row for the same date and player_name"))
+    frame = frame[~duplicated]
+
+    return frame, results
+
+
+def has_upsert_key(engine):
+    if engine.url not in _upsert_key_cache:
+        inspector = inspect(engine)
+        key = set(KEY_COLUMNS)
+        unique_sets = [set(c['column_names']) for c in inspector.get_unique_constraints(TeamSelection.__tablename__)]
+        unique_sets += [set(i['column_names']) for i in inspector.get_indexes(TeamSelection.__tablename__)
+                        if i.get('unique')]
+        _upsert_key_cache[engine.url] = key in unique_sets
+    return _upsert_key_cache[engine.url]
+
+
+def upsert_statement(dialect_name, records, update_columns):
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(TeamSelection).values(records)
+        return statement.on_duplicate_key_update({c: statement.inserted[c] for c in update_columns})
+
+    statement = dialect_insert(TeamSelection).values(records)
+    return statement.on_conflict_do_update(index_elements=KEY_COLUMNS,
+                                           set_={c: statement.excluded[c] for c in update_columns})
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upsert_team_selection(frame, chunk_size=CHUNK_SIZE):
+    if frame.empty:
+        return []
+
+    columns = [column for column in frame.columns if column != 'row']
+    update_columns = [column for column in columns if column not in KEY_COLUMNS]
+    dates = frame['date'].unique().tolist()
+
+    existing_ids = {}
+    existing = db.session.execute(
+        select(TeamSelection.player_id, TeamSelection.date, TeamSelection.player_name)
+        .where(TeamSelection.date.in_(dates))
+    ).all()
+    for player_id, date, player_name in existing:
+        existing_ids.setdefault((date, player_name), []).append(player_id)
+
+    records = frame[columns].to_dict('records')
+    is_update = [(record['date'], record['player_name']) in existing_ids for record in records]
+
+    engine = db.session.get_bind()
+    if engine.dialect.name in UPSERT_DIALECTS and has_upsert_key(engine):
+        for chunk in chunks(records, chunk_size):
+            db.session.execute(upsert_statement(engine.dialect.name, chunk, update_columns))
+    else:
+        new_records = [record for record, exists in zip(records, is_update) if not exists]
+        changed_records = [dict(record, player_id=player_id)
+                           for record, exists in zip(records, is_update) if exists
+                           for player_id in existing_ids[(record['date'], record['player_name'])]]
+        for chunk in chunks(new_records, chunk_size):
+            db.session.execute(insert(TeamSelection), chunk)
+        for chunk in chunks(changed_records, chunk_size):
+            db.session.execute(update(TeamSelection), chunk)
+
+    return [row_result(row, "updated", "Row updated successfully") if exists
+            else row_result(row, "success", "Row inserted successfully")
+            for row, exists in zip(frame['row'], is_update)]
+
+
+def import_team_selection(sheet_data, chunk_size=CHUNK_SIZE, progress=None):
+    frame, results = prepare_team_selection_data(sheet_data)
+    if progress is not None:
+        progress(0, len(frame), f'Writing {len(frame)} rows')
+
+    try:
+        results += upsert_team_selection(frame, chunk_size)
+        if not frame.empty:
+            refresh_fingerprints(frame, chunk_size)
+        bump_versions()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        results += [row_result(row, "failed", f"Import error: {e}") for row in frame['row']]
+
+    return sorted(results, key=lambda result: result['row'])
+
+
+def row_fingerprints(frame):
+    columns = [column for column in frame.columns if column != 'row']
+    hashes = pd.util.hash_pandas_object(frame[columns].astype(str), index=False)
+    return hashes.map('{:016x}'.format)
+
+
+def sheet_keys(sheet_data):
+    dates = parse_dates(sheet_data['date'])
+    return {(date, name) for date, name in zip(dates, sheet_data['player_name']) if date is not None}
+
+
+def load_fingerprints(dates=None):
+    query = select(TeamSelectionFingerprint.date, TeamSelectionFingerprint.player_name,
+                   TeamSelectionFingerprint.row_hash)
+    if dates is not None:
+        query = query.where(TeamSelectionFingerprint.date.in_(dates))
+    return {(date, name): row_hash for date, name, row_hash in db.session.execute(query)}
+
+
+def save_fingerprints(changed, stored, chunk_size):
+    synced_at = datetime.now(timezone.utc)
+    records = [{"date": date, "player_name": name, "row_hash": row_hash, "synced_at": synced_at}
+               for date, name, row_hash in zip(changed['date'], changed['player_name'], changed['row_hash'])]
+    new_records = [record for record in records if (record['date'], record['player_name']) not in stored]
+    changed_records = [record for record in records if (record['date'], record['player_name']) in stored]
+    for chunk in chunks(new_records, chunk_size):
+        db.session.execute(insert(TeamSelectionFingerprint), chunk)
+    for chunk in chunks(changed_records, chunk_size):
+        db.session.execute(update(TeamSelectionFingerprint), chunk)
+
+
+def refresh_fingerprints(frame, chunk_size):
+    # A full import rewrites rows behind the incremental sync: record what they now hold, and drop the
+    # stored revisions so the next sync compares every row instead of trusting an unchanged sheet
+    stored = load_fingerprints(frame['date'].unique().tolist())
+    save_fingerprints(frame.assign(row_hash=row_fingerprints(frame)), stored, chunk_size)
+    db.session.execute(update(SheetSyncState).values(revision=None))
+
+
+def delete_missing_rows(missing_keys):
+    names_by_date = {}
+    for date, name in missing_keys:
+        names_by_date.setdefault(date, []).append(name)
+    for date, names in names_by_date.items():
+        for model in (TeamSelection, TeamSelectionFingerprint):
+            db.session.execute(delete(model).where(model.date == date, model.player_name.in_(names)))
+
+
+def count_statuses(results):
+    counts = dict.fromkeys(SYNC_STATUSES.values(), 0)
+    for result in results:
+        counts[SYNC_STATUSES[result['status']]] += 1
+    return counts
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def sync_team_selection(sheet, sheet_id, delete_missing=False, force=False, chunk_size=CHUNK_SIZE, progress=None):
+    started = time.perf_counter()
+    timings = {}
+
+    revision = get_sheet_revision(sheet)
+    state = db.session.get(SheetSyncState, sheet_id)
+    if not force and revision is not None and state is not None and state.revision == revision:
+        counts = count_statuses([])
+        counts['unchanged'] = db.session.query(func.count()).select_from(TeamSelectionFingerprint).scalar()
+        timings['total_ms'] = elapsed_ms(started)
+        return {"revision": revision, "counts": counts, "timings": timings, "results": []}
+
+    step = time.perf_counter()
+    sheet_data = get_data_from_sheet(sheet, 'A', 'L')
+    timings['fetch_ms'] = elapsed_ms(step)
+
+    step = time.perf_counter()
+    frame, results = prepare_team_selection_data(sheet_data)
+    frame = frame.assign(row_hash=row_fingerprints(frame))
+    timings['prepare_ms'] = elapsed_ms(step)
+
+    step = time.perf_counter()
+    stored = load_fingerprints(None if delete_missing else frame['date'].unique().tolist())
+    unchanged = pd.Series([stored.get(key) == row_hash for key, row_hash in
+                           zip(zip(frame['date'], frame['player_name']), frame['row_hash'])],
+                          index=frame.index, dtype=bool)
+    changed = frame[~unchanged]
+    results += [row_result(row, "unchanged", "Row unchanged since last sync") for row in frame.loc[unchanged, 'row']]
+    missing_keys = set(stored) - sheet_keys(sheet_data) if delete_missing else set()
+    timings['diff_ms'] = elapsed_ms(step)
+    if progress is not None:
+        progress(0, len(changed), f'Writing {len(changed)} changed rows')
+
+    step = time.perf_counter()
+    try:
+        results += upsert_team_selection(changed.drop(columns=['row_hash']), chunk_size)
+        save_fingerprints(changed, stored, chunk_size)
+        delete_missing_rows(missing_keys)
+        if state is None:
+            state = SheetSyncState(sheet_id=sheet_id)
+            db.session.add(state)
+        state.revision = revision
+        state.synced_at = datetime.now(timezone.utc)
+        bump_versions()
+        db.session.commit()
+        results += [{"row": None, "status": "deleted", "message": f"Deleted {name} on {date.isoformat()}"}
+                    for date, name in sorted(missing_keys)]
+    except Exception as e:
+        db.session.rollback()
+        results += [row_result(row, "failed", f"Import error: {e}") for row in changed['row']]
+    timings['write_ms'] = elapsed_ms(step)
+    timings['total_ms'] = elapsed_ms(started)
+
+    results.sort(key=lambda result: (result['row'] is None, result['row'] or 0))
+    return {"revision": revision, "counts": count_statuses(results), "timings": timings, "results": results}
@@ -0,0 +1,117 @@
+from collections import namedtuple
+
+from flask import jsonify, request
+from sqlalchemy import case, delete, func, insert, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from db_models.models import db, Score, Standing
+from services.dates import parse_date
+from services.serialization import list_response
+
+WIN_POINTS = 3
+DRAW_POINTS = 1
+
+ScoreResult = namedtuple('ScoreResult', ['entered_date', 'field', 'team_a', 'score_a', 'team_b', 'score_b'])
+
+TOTAL_COLUMNS = ['played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'points']
+STANDING_COLUMNS = ['team'] + TOTAL_COLUMNS + ['goal_difference']
+
+
+def score_result(score):
+    return ScoreResult(score.entered_date, score.field, score.team_a, score.score_a, score.team_b, score.score_b)
+
+
+def team_deltas(result, sign):
+    sides = ((result.team_a, result.score_a, result.score_b), (result.team_b, result.score_b, result.score_a))
+    for team, goals_for, goals_against in sides:
+        won, drawn, lost = goals_for > goals_against, goals_for == goals_against, goals_for < goals_against
+        yield team, {
+            "played": sign,
+            "won": sign * won,
+            "drawn": sign * drawn,
+            "lost": sign * lost,
+            "goals_for": sign * goals_for,
+            "goals_against": sign * goals_against,
+            "points": sign * (WIN_POINTS * won + DRAW_POINTS * drawn),
+        }
+
+
+def apply_scores(results, sign=1):
+    """Add (sign=1) or remove (sign=-1) games from the standings in the current transaction.
+
+    Deltas are merged per (date, field, team) first, so a batch costs one statement per team row.
+    """
+    totals = {}
+    for result in results:
+        if result.entered_date is None or result.team_a is None or result.team_b is None:
+            continue
+        for team, deltas in team_deltas(result, sign):
+            merged = totals.setdefault((result.entered_date, result.field, team), dict.fromkeys(TOTAL_COLUMNS, 0))
+            for column, delta in deltas.items():
+                merged[column] += delta
+
+    for (entered_date, field, team), deltas in totals.items():
+        key = (Standing.entered_date == entered_date, Standing.field == field, Standing.team == team)
+        increment = update(Standing).where(*key).values({column: getattr(Standing, column) + delta
+                                                         for column, delta in deltas.items()})
+        updated = db.session.execute(increment)
+        if updated.rowcount == 0 and deltas['played'] > 0:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(Standing).values(entered_date=entered_date, field=field, team=team,
+                                                               **deltas))
+            except IntegrityError:
+                # A concurrent score inserted this team's row first; add to it instead
+                db.session.execute(increment)
+        elif deltas['played'] < 0:
+            db.session.execute(delete(Standing).where(*key, Standing.played <= 0))
+
+
+def apply_score(result, sign=1):
+    apply_scores([result], sign)
+
+
+def rebuild_standings():
+    sides = union_all(
+        select(Score.entered_date, Score.field, Score.team_a.label('team'),
+               Score.score_a.label('goals_for'), Score.score_b.label('goals_against')),
+        select(Score.entered_date, Score.field, Score.team_b.label('team'),
+               Score.score_b.label('goals_for'), Score.score_a.label('goals_against')),
+    ).subquery()
+    won = func.sum(case((sides.c.goals_for > sides.c.goals_against, 1), else_=0))
+    drawn = func.sum(case((sides.c.goals_for == sides.c.goals_against, 1), else_=0))
+    lost = func.sum(case((sides.c.goals_for < sides.c.goals_against, 1), else_=0))
+    totals = (
+        select(sides.c.entered_date, sides.c.field, sides.c.team, func.count(), won, drawn, lost,
+               func.sum(sides.c.goals_for), func.sum(sides.c.goals_against),
+               literal(WIN_POINTS) * won + literal(DRAW_POINTS) * drawn)
+        .where(sides.c.entered_date.is_not(None), sides.c.team.is_not(None))
+        .group_by(sides.c.entered_date, sides.c.field, sides.c.team)
+    )
+
+    db.session.execute(delete(Standing))
+    db.session.execute(insert(Standing).from_select(['entered_date', 'field', 'team'] + TOTAL_COLUMNS, totals))
+    db.session.commit()
+    return db.session.query(func.count()).select_from(Standing).scalar()
+
+
+def get_standings():
+    try:
+        entered_date = parse_date(request.args.get('entered_date'))
+        field = request.args.get('field')
+
+        query = select(Standing.team, *(func.sum(getattr(Standing, column)).label(column)
+                                        for column in TOTAL_COLUMNS))
+        if entered_date is not None:
+            query = query.where(Standing.entered_date == entered_date)
+        if field is not None:
+            query = query.where(Standing.field == field)
+        query = query.group_by(Standing.team)
+
+        rows = db.session.execute(query).all()
+        result_list = [dict(row._mapping, goal_difference=row.goals_for - row.goals_against) for row in rows]
+        result_list.sort(key=lambda row: (-row['points'], -row['goal_difference'], -row['goals_for'], row['team']))
+
+        return list_response(result_list, STANDING_COLUMNS)
+    except (SQLAlchemyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
@@ -1,24 +1,26 @@
+from bisect import bisect_right
+from operator import itemgetter
+
 from flask import jsonify, request
-from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 
-from db_models.models import TeamSelection, db
+from services.dates import parse_date
+from services.matchday_cache import TEAM_SELECTION_FIELDS, get_snapshot, team_label, unique
+from services.pagination import decode_cursor, encode_cursor, page_headers, page_size, split_page
+from services.serialization import list_response
+
+PLAYER_CURSOR = 'team_selection'
 
 
 def get_teams_by_field_and_date():
     try:
         field = request.args.get('field_auto')
-        entered_date = request.args.get('date')
+        entered_date = parse_date(request.args.get('date'))
 
-        teams = db.session.query(
-            func.replace(func.lower(TeamSelection.team_to_pick), ' team', '').label('team')
-        ).filter(
-            TeamSelection.field_auto == field,
-            TeamSelection.date == entered_date
-        ).distinct().all()
+        teams = unique(team_label(team_to_pick) for team_to_pick in get_snapshot(entered_date).teams(field))
 
-        result = [{'team': team.team} for team in teams]
-        return jsonify(result), 200
+        result = [{'team': team} for team in teams]
+        return list_response(result, ['team'])
 
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -26,31 +28,31 @@ def get_teams_by_field_and_date():
 
 def get_all_players():
     try:
-        date = request.args.get('date')
+        date = parse_date(request.args.get('date'))
         field = request.args.get('field')
-        results = db.session.query(TeamSelection).filter_by(date=date, field_auto=field)
-        result_list = [result.to_dict() for result in results]
+        limit = page_size()
+        after = decode_cursor(PLAYER_CURSOR, request.args.get('cursor'), 1)
 
-        return jsonify(result_list), 200
+        # Snapshot rows are ordered by player_id, so the cursor is a bisect rather than a scan
+        players = get_snapshot(date).players_in(field)
+        start = bisect_right(players, int(after[0]), key=itemgetter('player_id')) if after else 0
+        result_list, has_more = split_page(players[start:start + limit + 1], limit)
+        next_cursor = encode_cursor(PLAYER_CURSOR, [result_list[-1]['player_id']]) if has_more else None
 
-    except SQLAlchemyError as e:
+        return list_response(result_list, TEAM_SELECTION_FIELDS.names, page_headers(limit, has_more, next_cursor))
+
+    except (SQLAlchemyError, ValueError) as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        db.session.close()
 
 
 def get_team():
     try:
         team_to_pick = request.args.get("team_to_pick")
         field_auto = request.args.get("field_auto")
-        date = request.args.get("date")
-
-        result = (db.session.query(TeamSelection)
-                  .filter_by(team_to_pick=team_to_pick, field_auto=field_auto, date=date)
-                  .all())
+        date = parse_date(request.args.get("date"))
 
-        result_list = [team.to_dict() for team in result]
+        result_list = get_snapshot(date).players_in(field_auto, team_to_pick)
 
-        return jsonify(result_list), 200
-    except SQLAlchemyError as e:
+        return list_response(result_list, TEAM_SELECTION_FIELDS.names)
+    except (SQLAlchemyError, ValueError) as e:
         return jsonify({"error": str(e)}), 400
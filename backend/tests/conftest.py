@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ['JOB_WORKERS'] = '0'
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-that-is-at-least-32-bytes')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as log  # noqa: E402
+from app import app as flask_app  # noqa: E402
+from db_models.models import db  # noqa: E402
+from services import matchday_cache, search_service  # noqa: E402
+
+
+def redirect_logs(directory):
+    handler = log.file_handler
+    handler.acquire()
+    try:
+        if handler.stream:
+            handler.stream.close()
+            handler.stream = None
+        handler.directory = directory
+        handler.baseFilename = os.path.join(directory, log.log_name(handler.day))
+    finally:
+        handler.release()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Keep the request log out of the working tree
+    logs_dir = str(tmp_path / 'logs')
+    os.makedirs(logs_dir)
+    monkeypatch.setattr(log, 'LOGS_DIR', logs_dir)
+    redirect_logs(logs_dir)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+    # Versions start over with the next test's tables, so snapshots of this one must not survive
+    matchday_cache.invalidate()
+    search_service.player_directory.index = None
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,59 @@
+from datetime import date
+
+from db_models.models import db, TeamSelection
+
+ENTERED_DATE = date(2024, 11, 10)
+
+
+def select_players(field, count, team_to_pick=None):
+    db.session.add_all(TeamSelection(player_name=f'{field} player {number}', stamina=number % 5 + 1,
+                                     technique=number % 3 + 1, ball_leader=number % 4 + 1, aggression=2,
+                                     team_to_pick=team_to_pick, field_auto=field, date=ENTERED_DATE)
+                       for number in range(count))
+    db.session.commit()
+
+
+def balance(client, **options):
+    response = client.post('/balance_teams', json=dict(date=ENTERED_DATE.isoformat(), seed=1, **options))
+    return response.status_code, response.get_json()
+
+
+def team_names(result):
+    return [team['team_to_pick'] for team in result['teams']]
+
+
+def test_unpicked_field_gets_default_teams(client):
+    select_players('Field 1', 10)
+    status, body = balance(client, field_auto='Field 1')
+    assert status == 200
+    result, = body['fields']
+    assert team_names(result) == ['Team 1', 'Team 2']
+    assert [team['size'] for team in result['teams']] == [5, 5]
+
+
+def test_picked_teams_keep_their_names(client):
+    select_players('Field 1', 9, team_to_pick='Blue Team')
+    db.session.query(TeamSelection).filter(TeamSelection.player_id % 3 == 0).update({'team_to_pick': 'Red Team'})
+    db.session.query(TeamSelection).filter(TeamSelection.player_id % 3 == 1).update({'team_to_pick': 'Green Team'})
+    db.session.commit()
+    _, body = balance(client)
+    assert sorted(team_names(body['fields'][0])) == ['Blue Team', 'Green Team', 'Red Team']
+
+
+def test_field_that_cannot_be_split_is_skipped(client):
+    select_players('Field 1', 8)
+    select_players('Field 2', 1)
+    status, body = balance(client, apply=True)
+    assert status == 200
+    balanced, skipped = body['fields']
+    assert team_names(balanced) == ['Team 1', 'Team 2']
+    assert skipped == {'field_auto': 'Field 2', 'skipped': 'Cannot split 1 players into 2 teams'}
+    picked = db.session.query(TeamSelection.field_auto, TeamSelection.team_to_pick).all()
+    assert sorted(set(picked)) == [('Field 1', 'Team 1'), ('Field 1', 'Team 2'), ('Field 2', None)]
+
+
+def test_single_field_that_cannot_be_split_is_an_error(client):
+    select_players('Field 2', 1)
+    status, body = balance(client, field_auto='Field 2')
+    assert status == 400
+    assert body['error'] == 'Cannot split 1 players into 2 teams'
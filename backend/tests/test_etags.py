@@ -0,0 +1,82 @@
+from datetime import date
+
+from sqlalchemy import update
+
+from db_models.models import db, DataVersion, TeamSelection
+from services import etag_service, matchday_cache
+
+ENTERED_DATE = date(2024, 11, 10)
+SCORES_URL = '/get_scores_by_field_and_date?field=Field 1&entered_date=2024-11-10'
+
+
+def add_score(client, field='Field 1', entered_time='10:00'):
+    response = client.post('/add_score', json={
+        'team_a': 'blue', 'score_a': 2, 'team_b': 'red', 'score_b': 1, 'entered_by': 'test',
+        'entered_date': ENTERED_DATE.isoformat(), 'entered_time': entered_time, 'field': field})
+    assert response.status_code == 200
+
+
+def conditional_get(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+
+def test_unchanged_data_answers_304(client):
+    etag = client.get(SCORES_URL).headers['ETag']
+    response = conditional_get(client, SCORES_URL, etag)
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+
+def test_score_write_changes_the_field_tag(client):
+    etag = client.get(SCORES_URL).headers['ETag']
+    add_score(client)
+    response = conditional_get(client, SCORES_URL, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 1
+
+
+def test_other_field_keeps_its_tag(client):
+    etag = client.get(SCORES_URL).headers['ETag']
+    add_score(client, field='Field 2')
+    assert conditional_get(client, SCORES_URL, etag).status_code == 304
+
+
+def test_date_without_field_follows_every_field(client):
+    url = f'/matchday?date={ENTERED_DATE.isoformat()}'
+    etag = client.get(url).headers['ETag']
+    add_score(client, field='Field 2')
+    response = conditional_get(client, url, etag)
+    assert response.status_code == 200
+    assert conditional_get(client, url, response.headers['ETag']).status_code == 304
+
+
+def test_version_bumped_by_another_process(client):
+    etag = client.get(SCORES_URL).headers['ETag']
+    # What a sheet import committed by a job worker leaves behind
+    etag_service.bump()
+    db.session.commit()
+    assert conditional_get(client, SCORES_URL, etag).status_code == 200
+
+
+def test_failed_write_does_not_bump(app):
+    etag_service.bump(ENTERED_DATE, 'Field 1')
+    db.session.rollback()
+    assert etag_service.current_version(ENTERED_DATE, 'Field 1') == '0.0.0'
+
+
+def test_matchday_snapshot_follows_the_shared_version(app):
+    db.session.add(TeamSelection(player_name='Dana', stamina=1, technique=1, ball_leader=1, aggression=1,
+                                 team_to_pick='Blue Team', field_auto='Field 1', date=ENTERED_DATE))
+    db.session.commit()
+    snapshot = matchday_cache.get_snapshot(ENTERED_DATE)
+    assert matchday_cache.get_snapshot(ENTERED_DATE) is snapshot
+
+    # Another worker moves the player and bumps the date; this process never calls invalidate()
+    db.session.execute(update(TeamSelection).values(team_to_pick='Red Team'))
+    etag_service.bump(ENTERED_DATE)
+    db.session.commit()
+    reloaded = matchday_cache.get_snapshot(ENTERED_DATE)
+    assert reloaded is not snapshot
+    assert reloaded.teams('Field 1') == ['Red Team']
+    assert db.session.get(DataVersion, etag_service.scope(ENTERED_DATE)).version == 1
@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+import pytest
+
+from db_models.models import db, Job
+from services import job_service
+
+
+def echo(params, progress):
+    progress(1, 2, 'Halfway')
+    return {"echo": params['value']}
+
+
+def broken(params, progress):
+    raise RuntimeError('Handler failed')
+
+
+@pytest.fixture(autouse=True)
+def handlers(monkeypatch):
+    monkeypatch.setitem(job_service.handlers, 'echo', echo)
+    monkeypatch.setitem(job_service.handlers, 'broken', broken)
+
+
+def job_status(client, job_id):
+    return client.get(f'/jobs/{job_id}').get_json()
+
+
+def test_job_runs_and_reports_its_result(app, client):
+    job, coalesced = job_service.enqueue('echo', {'value': 7})
+    assert not coalesced
+    assert job_service.run_pending() == 1
+    record = job_status(client, job.job_id)
+    assert (record['status'], record['result']) == ('succeeded', {'echo': 7})
+    assert record['progress'] == {'done': 2, 'total': 2, 'message': 'Halfway'}
+
+
+def test_same_key_coalesces_until_finished(app):
+    first, _ = job_service.enqueue('echo', {'value': 1}, key='echo:a')
+    second, coalesced = job_service.enqueue('echo', {'value': 2}, key='echo:a')
+    assert coalesced and second.job_id == first.job_id
+    _, coalesced = job_service.enqueue('echo', {'value': 3}, key='echo:b')
+    assert not coalesced
+
+    assert job_service.run_pending() == 2
+    third, coalesced = job_service.enqueue('echo', {'value': 4}, key='echo:a')
+    assert not coalesced and third.job_id != first.job_id
+
+
+def test_failed_handler_fails_the_job(app, client):
+    job, _ = job_service.enqueue('broken', {})
+    job_service.run_pending()
+    record = job_status(client, job.job_id)
+    assert (record['status'], record['error']) == ('failed', 'Handler failed')
+    assert db.session.get(Job, job.job_id).active_key is None
+
+
+def test_unknown_kind_fails(app):
+    job, _ = job_service.enqueue('missing', {})
+    job_service.run_pending()
+    assert db.session.get(Job, job.job_id).error == "No handler for job kind 'missing'"
+
+
+def test_stale_running_job_is_failed(app):
+    job, _ = job_service.enqueue('echo', {'value': 1})
+    job_id = job.job_id
+    job.status = job_service.RUNNING
+    job.heartbeat_at = job_service.utcnow() - timedelta(seconds=job_service.STALE_SECONDS + 1)
+    db.session.commit()
+    assert job_service.fail_stale_jobs() == 1
+    assert db.session.get(Job, job_id).status == job_service.FAILED
+
+
+def test_list_filters_by_status(app, client):
+    job_service.enqueue('echo', {'value': 1}, key='echo:a')
+    job_service.enqueue('broken', {})
+    job_service.run_pending()
+    failed = client.get('/jobs', query_string={'status': 'failed'}).get_json()
+    assert [job['kind'] for job in failed] == ['broken']
+
+
+def test_route_enqueues_with_a_status_url(client):
+    response = client.post('/analytics/snapshot')
+    assert response.status_code == 202
+    record = response.get_json()
+    assert response.headers['Location'] == record['status_url'] == f"/jobs/{record['job_id']}"
+    assert client.post('/analytics/snapshot').get_json()['coalesced']
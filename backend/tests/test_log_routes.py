@@ -0,0 +1,67 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import logger as log
+from services import auth_service
+
+PROTECTED = [('GET', '/log'), ('GET', '/logs'), ('GET', '/logs/files'), ('GET', '/logs/stream'),
+             ('POST', '/logs/stream/token'), ('POST', '/logs/clear')]
+
+
+def access_token(role):
+    account = SimpleNamespace(player_id=1, id='1', gmail='avi@example.com', type=role, player_name='Avi')
+    return auth_service.issue_access_token(account)
+
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def current_log(app):
+    # The file handler only creates the day's file with its first record
+    path = os.path.join(log.LOGS_DIR, log.current_log_name())
+    with open(path, 'w'):
+        pass
+    return path
+
+
+def open_stream(client, **options):
+    response = client.get('/logs/stream', buffered=False, **options)
+    response.close()
+    return response.status_code
+
+
+@pytest.mark.parametrize('method, url', PROTECTED)
+def test_log_routes_need_an_admin(client, method, url):
+    assert client.open(url, method=method).status_code == 401
+    assert client.open(url, method=method, headers=bearer(access_token('player'))).status_code == 403
+
+
+def test_admin_reads_and_clears_the_log(client, current_log):
+    headers = bearer(access_token('admin'))
+    assert client.get('/log', headers=headers).get_json()['log_name'] == log.current_log_name()
+    assert client.get('/logs/files', headers=headers).status_code == 200
+    assert client.post('/logs/clear', headers=headers).get_json()['success']
+
+
+def test_log_view_before_the_first_record_is_empty(client):
+    response = client.get('/log', headers=bearer(access_token('admin')))
+    assert response.status_code == 200
+    assert response.get_json()['log_data'] == ''
+
+
+def test_stream_opens_with_a_stream_token(client, current_log):
+    body = client.post('/logs/stream/token', headers=bearer(access_token('admin'))).get_json()
+    assert body['expires_in'] == auth_service.STREAM_TOKEN_TTL.total_seconds()
+    assert open_stream(client, query_string={'stream_token': body['stream_token']}) == 200
+    assert open_stream(client, headers=bearer(access_token('admin'))) == 200
+
+
+def test_tokens_stay_in_their_place(client, current_log):
+    stream_token = client.post('/logs/stream/token', headers=bearer(access_token('admin'))).get_json()['stream_token']
+    assert client.get('/logs/files', headers=bearer(stream_token)).status_code == 401
+    assert client.get('/logs/files', query_string={'stream_token': stream_token}).status_code == 401
+    assert open_stream(client, query_string={'stream_token': access_token('admin')}) == 401
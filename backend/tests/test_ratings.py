@@ -0,0 +1,90 @@
+from datetime import date
+
+import pytest
+
+from db_models.models import db, PlayerRating, RatingChange, Score, TeamSelection
+from services.rating_service import INITIAL_RATING, rebuild_ratings
+
+FIELD = 'Field 1'
+DATES = [date(2024, 11, 10), date(2024, 11, 17)]
+ROSTERS = {'Blue Team': ['Avi', 'Ben'], 'Red Team': ['Dan', 'Eli']}
+
+
+def pick_teams(entered_date, rosters=ROSTERS):
+    db.session.add_all(TeamSelection(player_name=name, stamina=5, technique=5, ball_leader=5, aggression=5,
+                                     team_to_pick=team, field_auto=FIELD, date=entered_date)
+                       for team, names in rosters.items() for name in names)
+    db.session.commit()
+
+
+def add_score(client, entered_date, score_a, score_b):
+    response = client.post('/add_score', json={
+        'team_a': 'blue', 'score_a': score_a, 'team_b': 'red', 'score_b': score_b, 'entered_by': 'test',
+        'entered_date': entered_date.isoformat(), 'entered_time': '10:00', 'field': FIELD})
+    assert response.status_code == 200
+    return db.session.query(Score.score_id).order_by(Score.score_id.desc()).limit(1).scalar()
+
+
+def stored_ratings():
+    db.session.expire_all()
+    return {rating.player_name: (rating.rating, rating.form, rating.games, rating.wins, rating.draws, rating.losses,
+                                 rating.last_played)
+            for rating in db.session.query(PlayerRating)}
+
+
+def test_win_moves_both_teams(client):
+    pick_teams(DATES[0])
+    add_score(client, DATES[0], 3, 1)
+    ratings = stored_ratings()
+    assert ratings['Avi'][0] > INITIAL_RATING > ratings['Dan'][0]
+    assert ratings['Avi'][0] - INITIAL_RATING == pytest.approx(INITIAL_RATING - ratings['Dan'][0])
+    assert ratings['Ben'][2:] == (1, 1, 0, 0, DATES[0])
+    leaderboard = client.get('/player_ratings').get_json()
+    assert [row['player_name'] for row in leaderboard] == ['Avi', 'Ben', 'Dan', 'Eli']
+
+
+def test_unpicked_game_is_not_rated(client):
+    add_score(client, DATES[0], 3, 1)
+    assert stored_ratings() == {}
+
+
+def test_deleted_score_is_taken_back_out(client):
+    pick_teams(DATES[0])
+    score_id = add_score(client, DATES[0], 3, 1)
+    client.delete('/delete_score', query_string={'score_id': score_id})
+    assert stored_ratings() == {}
+    assert db.session.query(RatingChange).count() == 0
+
+
+def test_updated_score_is_rerated(client):
+    pick_teams(DATES[0])
+    score_id = add_score(client, DATES[0], 3, 1)
+    client.patch('/update_score', query_string={'score_id': score_id}, json={'score_a': 0})
+    updated = stored_ratings()
+    rebuild_ratings()
+    assert updated['Avi'][0] == pytest.approx(stored_ratings()['Avi'][0])
+    assert updated['Avi'][3:6] == (0, 0, 1)
+
+
+def test_new_players_join_later(client):
+    pick_teams(DATES[0])
+    add_score(client, DATES[0], 3, 1)
+    pick_teams(DATES[1], {'Blue Team': ['Avi', 'Gil'], 'Red Team': ['Dan', 'Eli']})
+    add_score(client, DATES[1], 0, 2)
+    ratings = stored_ratings()
+    assert ratings['Gil'][2:] == (1, 0, 0, 1, DATES[1])
+    assert ratings['Avi'][2] == 2
+
+
+def test_scores_match_a_rebuild(client):
+    for entered_date, (score_a, score_b) in zip(DATES, [(3, 1), (2, 2)]):
+        pick_teams(entered_date)
+        add_score(client, entered_date, score_a, score_b)
+    incremental = stored_ratings()
+    assert rebuild_ratings() == (4, 2)
+    rebuilt = stored_ratings()
+    assert rebuilt.keys() == incremental.keys()
+    for name, rating in rebuilt.items():
+        assert rating[0] == pytest.approx(incremental[name][0])
+        assert rating[1] == pytest.approx(incremental[name][1])
+        assert rating[2:] == incremental[name][2:]
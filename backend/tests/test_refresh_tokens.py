@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_bcrypt import generate_password_hash
+
+from db_models.models import db, Player, RefreshToken
+from services.auth_service import token_digest
+
+GMAIL = 'avi@example.com'
+PASSWORD = 'secret'
+
+
+@pytest.fixture
+def player(app):
+    player = Player(player_name='Avi', tournament='Sunday', type='admin', id='1', gmail=GMAIL,
+                    password=generate_password_hash(PASSWORD, rounds=4).decode())
+    db.session.add(player)
+    db.session.commit()
+    return player.player_id
+
+
+def login(client, password=PASSWORD):
+    return client.post('/login', json={'gmail': GMAIL, 'password': password})
+
+
+def refresh(client, token):
+    return client.post('/refresh', json={'refresh_token': token})
+
+
+def stored(token):
+    db.session.expire_all()
+    return db.session.get(RefreshToken, token_digest(token))
+
+
+def test_login_issues_both_tokens(client, player):
+    body = login(client).get_json()
+    assert body['token'] and body['refresh_token']
+    assert body['data']['roles'] == ['admin']
+    assert stored(body['refresh_token']).player_id == player
+    assert login(client, 'wrong').status_code == 401
+
+
+def test_refresh_rotates_the_token(client, player):
+    first = login(client).get_json()['refresh_token']
+    response = refresh(client, first)
+    assert response.status_code == 200
+    second = response.get_json()['refresh_token']
+    assert second != first
+    assert stored(first).revoked_at is not None
+    assert stored(second).revoked_at is None
+    assert stored(second).family_id == stored(first).family_id
+
+
+def test_reused_token_revokes_its_family(client, player):
+    first = login(client).get_json()['refresh_token']
+    second = refresh(client, first).get_json()['refresh_token']
+    assert refresh(client, first).status_code == 401
+    assert stored(second).revoked_at is not None
+    assert refresh(client, second).status_code == 401
+
+
+def test_other_logins_survive_a_reuse(client, player):
+    first = login(client).get_json()['refresh_token']
+    other = login(client).get_json()['refresh_token']
+    refresh(client, first)
+    refresh(client, first)
+    assert refresh(client, other).status_code == 200
+
+
+def test_expired_token_is_refused(client, player):
+    token = login(client).get_json()['refresh_token']
+    stored(token).expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.session.commit()
+    assert refresh(client, token).status_code == 401
+
+
+def test_logout_revokes_the_family(client, player):
+    token = login(client).get_json()['refresh_token']
+    assert client.post('/logout', json={'refresh_token': token}).status_code == 200
+    assert refresh(client, token).status_code == 401
+    assert client.post('/refresh', json={}).status_code == 400
@@ -0,0 +1,54 @@
+from db_models.models import db, Score
+
+GAME = {'team_a': 'blue', 'score_a': 3, 'team_b': 'red', 'score_b': 1, 'entered_date': '2024-11-10',
+        'entered_time': '10:00', 'field': 'Field 1'}
+
+
+def entry(key, **changes):
+    return dict(GAME, idempotency_key=key, **changes)
+
+
+def post(client, entries):
+    return client.post('/add_scores', json={'scores': entries})
+
+
+def score_count():
+    return db.session.query(Score).count()
+
+
+def test_batch_inserts_every_entry(client):
+    response = post(client, [entry('a'), entry('b', score_a=0)])
+    assert response.status_code == 200
+    assert response.get_json()['counts'] == {'inserted': 2, 'duplicate': 0, 'conflict': 0}
+    assert score_count() == 2
+
+
+def test_retried_batch_is_not_inserted_twice(client):
+    first = post(client, [entry('a'), entry('b')]).get_json()
+    retry = post(client, [entry('a'), entry('b'), entry('c')]).get_json()
+    assert retry['counts'] == {'inserted': 1, 'duplicate': 2, 'conflict': 0}
+    assert [result['score_id'] for result in retry['results'][:2]] == \
+        [result['score_id'] for result in first['results']]
+    assert score_count() == 3
+
+
+def test_repeated_key_within_a_batch_is_one_score(client):
+    results = post(client, [entry('a'), entry('a')]).get_json()['results']
+    assert [result['status'] for result in results] == ['inserted', 'duplicate']
+    assert results[0]['score_id'] == results[1]['score_id']
+    assert score_count() == 1
+
+
+def test_key_reused_for_another_game_is_a_conflict(client):
+    post(client, [entry('a')])
+    results = post(client, [entry('a', score_b=2)]).get_json()['results']
+    assert results[0]['status'] == 'conflict'
+    assert db.session.query(Score.score_b).scalar() == 1
+
+
+def test_invalid_entry_saves_nothing(client):
+    response = post(client, [entry('a'), entry('b', score_a=-1), {'idempotency_key': 'c'}])
+    assert response.status_code == 400
+    statuses = [result['status'] for result in response.get_json()['results']]
+    assert statuses == ['skipped', 'invalid', 'invalid']
+    assert score_count() == 0
@@ -0,0 +1,74 @@
+from datetime import date, time
+
+from sqlalchemy.dialects import postgresql
+
+from db_models.models import db, Score
+from services.scores_service import scores_on
+
+FIELD = 'Field 1'
+ENTERED_DATE = date(2024, 11, 10)
+TIMES = [time(9, 5), None, time(10, 30), None, time(10, 30), time(8, 0), None]
+
+
+def add_scores(times):
+    scores = [Score(team_a='blue', score_a=1, team_b='red', score_b=0, entered_date=ENTERED_DATE,
+                    entered_time=entered_time, field=FIELD) for entered_time in times]
+    db.session.add_all(scores)
+    db.session.commit()
+    return [score.score_id for score in scores]
+
+
+def expected_order(ids, times):
+    timed = sorted((pair for pair in zip(times, ids) if pair[0] is not None), reverse=True)
+    untimed = sorted((score_id for entered_time, score_id in zip(times, ids) if entered_time is None), reverse=True)
+    return [score_id for _, score_id in timed] + untimed
+
+
+def read_pages(client, count):
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = {'field': FIELD, 'entered_date': ENTERED_DATE.isoformat(), 'count': count}
+        if cursor:
+            query['cursor'] = cursor
+        response = client.get('/get_scores_by_field_and_date', query_string=query)
+        assert response.status_code == 200
+        ids += [score['score_id'] for score in response.get_json()]
+        pages += 1
+        if response.headers['X-Has-More'] != 'true':
+            return ids, pages
+        cursor = response.headers['X-Next-Cursor']
+
+
+def test_untimed_scores_come_after_timed_ones(client):
+    ids = add_scores(TIMES)
+    full, _ = read_pages(client, 100)
+    assert full == expected_order(ids, TIMES)
+
+
+def test_pages_cover_mixed_times_once(client):
+    ids = add_scores(TIMES)
+    for count in (1, 2, 3):
+        paged, pages = read_pages(client, count)
+        assert paged == expected_order(ids, TIMES)
+        assert pages == -(-len(TIMES) // count)
+
+
+def test_cursor_from_untimed_row(client):
+    ids = add_scores([None, None, None])
+    paged, _ = read_pages(client, 1)
+    assert paged == sorted(ids, reverse=True)
+
+
+def test_order_puts_untimed_last_without_dialect_null_ordering(app):
+    # PostgreSQL sorts NULLs first in descending order, which SQLite cannot reproduce
+    sql = str(scores_on(ENTERED_DATE).statement.compile(dialect=postgresql.dialect()))
+    order_by = sql.split('ORDER BY', 1)[1]
+    assert order_by.index('IS NULL') < order_by.index('scores.entered_time DESC')
+
+
+def test_statistics_return_the_whole_matchday(client):
+    ids = add_scores(TIMES)
+    query = {'field': FIELD, 'entered_date': ENTERED_DATE.isoformat(), 'limit': 2}
+    response = client.get('/get_games_statistics_by_team_and_date', query_string=query)
+    assert [score['score_id'] for score in response.get_json()] == expected_order(ids, TIMES)
+    assert 'X-Has-More' not in response.headers
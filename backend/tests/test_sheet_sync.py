@@ -0,0 +1,67 @@
+from datetime import date
+
+from benchmarks.fakes import FakeWorksheet
+from db_models.models import db, SheetSyncState, TeamSelection
+from services import google_services as gos
+from services.sheet_import_service import import_team_selection, sync_team_selection
+
+SHEET_ID = 'sheet'
+ENTERED_DATE = date(2024, 11, 10)
+
+
+def sheet_row(name, stamina=5, team_to_pick='Blue Team'):
+    return [name, 'A', str(stamina), '5', '5', '5', 'Sunday', 'v1', 'Sunday', team_to_pick, 'Field 1', '10/11/2024']
+
+
+def sync(worksheet, **options):
+    return sync_team_selection(worksheet, SHEET_ID, **options)
+
+
+def stamina(name):
+    return db.session.query(TeamSelection.stamina).filter_by(player_name=name, date=ENTERED_DATE).scalar()
+
+
+def test_first_sync_inserts_every_row(app):
+    result = sync(FakeWorksheet([sheet_row('Avi'), sheet_row('Ben')]))
+    assert result['counts']['inserted'] == 2
+    assert db.session.get(SheetSyncState, SHEET_ID).revision == '1'
+
+
+def test_same_revision_reads_nothing(app):
+    worksheet = FakeWorksheet([sheet_row('Avi')])
+    sync(worksheet)
+    worksheet.rows = [sheet_row('Avi', stamina=9)]
+    result = sync(worksheet)
+    assert result['results'] == [] and result['counts']['unchanged'] == 1
+    assert stamina('Avi') == 5
+
+
+def test_new_revision_writes_changed_rows_only(app):
+    worksheet = FakeWorksheet([sheet_row('Avi'), sheet_row('Ben')])
+    sync(worksheet)
+    worksheet.rows = [sheet_row('Avi'), sheet_row('Ben', stamina=9)]
+    worksheet.spreadsheet.revision = '2'
+    result = sync(worksheet)
+    assert (result['counts']['unchanged'], result['counts']['updated']) == (1, 1)
+    assert stamina('Ben') == 9
+
+
+def test_missing_rows_are_deleted_on_request(app):
+    worksheet = FakeWorksheet([sheet_row('Avi'), sheet_row('Ben')])
+    sync(worksheet)
+    worksheet.rows = [sheet_row('Avi')]
+    result = sync(worksheet, force=True, delete_missing=True)
+    assert result['counts']['deleted'] == 1
+    assert stamina('Ben') is None
+
+
+def test_full_import_makes_the_next_sync_compare_rows(app):
+    worksheet = FakeWorksheet([sheet_row('Avi')])
+    sync(worksheet)
+    import_team_selection(gos.get_data_from_sheet(FakeWorksheet([sheet_row('Avi', stamina=7)]), 'A', 'L'))
+    assert db.session.get(SheetSyncState, SHEET_ID).revision is None
+
+    # Same revision as the last sync, but the rows differ from what the full import wrote
+    result = sync(worksheet)
+    assert result['counts']['updated'] == 1
+    assert stamina('Avi') == 5
@@ -0,0 +1,71 @@
+from db_models.models import db, Score
+from services.standings_service import rebuild_standings
+
+GAME = {'entered_by': 'test', 'entered_date': '2024-11-10', 'entered_time': '10:00', 'field': 'Field 1'}
+
+
+def add_score(client, team_a, score_a, team_b, score_b, **changes):
+    response = client.post('/add_score', json=dict(GAME, team_a=team_a, score_a=score_a, team_b=team_b,
+                                                   score_b=score_b, **changes))
+    assert response.status_code == 200
+    return db.session.query(Score.score_id).order_by(Score.score_id.desc()).limit(1).scalar()
+
+
+def standings(client, **query):
+    return {row['team']: row for row in client.get('/get_standings', query_string=query).get_json()}
+
+
+def test_scores_add_to_the_table(client):
+    add_score(client, 'blue', 3, 'red', 1)
+    add_score(client, 'blue', 2, 'green', 2)
+    table = standings(client)
+    assert table['blue'] == {'team': 'blue', 'played': 2, 'won': 1, 'drawn': 1, 'lost': 0, 'goals_for': 5,
+                             'goals_against': 3, 'points': 4, 'goal_difference': 2}
+    assert (table['red']['lost'], table['green']['drawn']) == (1, 1)
+    assert list(table) == ['blue', 'green', 'red']
+
+
+def test_updated_score_moves_the_points(client):
+    score_id = add_score(client, 'blue', 3, 'red', 1)
+    client.patch('/update_score', query_string={'score_id': score_id}, json={'score_a': 0})
+    table = standings(client)
+    assert (table['blue']['points'], table['red']['points']) == (0, 3)
+    assert table['blue']['played'] == 1
+
+
+def test_invalid_update_changes_nothing(client):
+    score_id = add_score(client, 'blue', 3, 'red', 1)
+    before = standings(client)
+    for data in ({'score_a': -1}, {'score_b': 'two'}, {'score_a': 0, 'entered_date': 'someday'}):
+        response = client.patch('/update_score', query_string={'score_id': score_id}, json=data)
+        assert response.status_code == 400
+    assert standings(client) == before
+    assert db.session.query(Score.score_a).scalar() == 3
+
+
+def test_deleted_score_leaves_the_table(client):
+    kept = add_score(client, 'blue', 1, 'red', 0)
+    deleted = add_score(client, 'blue', 0, 'green', 4)
+    client.delete('/delete_score', query_string={'score_id': deleted})
+    table = standings(client)
+    assert 'green' not in table
+    assert table['blue']['played'] == 1
+    client.delete('/delete_score', query_string={'score_id': kept})
+    assert standings(client) == {}
+
+
+def test_filters_by_field(client):
+    add_score(client, 'blue', 1, 'red', 0)
+    add_score(client, 'blue', 1, 'red', 0, field='Field 2')
+    assert standings(client, field='Field 2')['blue']['played'] == 1
+    assert standings(client)['blue']['played'] == 2
+
+
+def test_deltas_match_a_rebuild(client):
+    add_score(client, 'blue', 3, 'red', 1)
+    changed = add_score(client, 'red', 2, 'green', 2)
+    add_score(client, 'green', 1, 'blue', 0, entered_date='2024-11-17')
+    client.patch('/update_score', query_string={'score_id': changed}, json={'score_b': 5})
+    applied = standings(client)
+    rebuild_standings()
+    assert standings(client) == applied
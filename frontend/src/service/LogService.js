@@ -3,9 +3,13 @@ import axios from "../api/axios";
 const GET_LOG = '/log';
 const POST_CLEAR_LOG = '/logs/clear'
 
+const authorization = () => ({
+    headers: {'Authorization': `Bearer ${localStorage.getItem('JWT')}`}
+})
+
 export const getSheetLog = async () => {
-    return await axios.get(GET_LOG)
+    return await axios.get(GET_LOG, authorization())
 }
 export const clearLog = async () => {
-    return await axios.post(POST_CLEAR_LOG)
-}
\ No newline at end of file
+    return await axios.post(POST_CLEAR_LOG, null, authorization())
+}